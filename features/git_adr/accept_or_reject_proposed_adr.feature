@@ -31,6 +31,20 @@ Feature: Accept or reject proposed ADR - Git included
         When I run "git adr accept docs/adr/XXXX-my-adr-title.md"
         Then it should pass
 
+    Scenario: Accepting should pass when the proposed ADR was committed before the last commit (code shared with rejected => no need to duplicate test)
+        Given a proposed adr file named "docs/adr/XXXX-my-adr-title.md"
+        And I stage the file "docs/adr/XXXX-my-adr-title.md"
+        And I commit the staged files with message "foo bar"
+        And a file named "other-file" with:
+            """
+            other content
+            """
+        And I stage the file "other-file"
+        And I commit the staged files with message "other commit"
+        When I run "git adr accept docs/adr/XXXX-my-adr-title.md"
+        Then it should pass
+        And the file "docs/adr/0002-my-adr-title.md" should be staged as renamed
+
     Scenario: An incremented ID number should be assigned to the accepted ADR (code shared with rejected => no need to duplicate test)
         Given a proposed adr file named "docs/adr/XXXX-my-adr-title.md"
         And I stage the file "docs/adr/XXXX-my-adr-title.md"
@@ -164,3 +178,62 @@ Feature: Accept or reject proposed ADR - Git included
             """
             docs(adr): [rejected] 0002-my-adr-title
             """
+
+    Scenario: Several proposed ADRs should be accepted at once, with consecutive IDs and a single commit
+        Given a proposed adr file named "docs/adr/XXXX-my-first-title.md"
+        And a proposed adr file named "docs/adr/XXXX-my-second-title.md"
+        And a proposed adr file named "docs/adr/XXXX-my-third-title.md"
+        And I stage the file "docs/adr/XXXX-my-first-title.md"
+        And I stage the file "docs/adr/XXXX-my-second-title.md"
+        And I stage the file "docs/adr/XXXX-my-third-title.md"
+        And I commit the staged files with message "dummy message"
+        When I run "git adr accept docs/adr/XXXX-my-third-title.md docs/adr/XXXX-my-f*.md docs/adr/XXXX-my-second-title.md --toc --commit"
+        Then it should pass
+        And the file "docs/adr/0002-my-third-title.md" should be committed in the last commit
+        And the file "docs/adr/0003-my-first-title.md" should be committed in the last commit
+        And the file "docs/adr/0004-my-second-title.md" should be committed in the last commit
+        And the file "docs/adr/index.md" should be committed in the last commit
+        And the head commit message should be
+            """
+            docs(adr): [accepted] 3 ADRs
+
+            * 0002-my-third-title
+            * 0003-my-first-title
+            * 0004-my-second-title
+            """
+
+    Scenario: Optionnaly, IDs should be given after the highest ID of all branches and reserved in git refs
+        Given I create the branch "adr-propose-other-decision"
+        And I switch to the branch "adr-propose-other-decision"
+        And an accepted adr file named "docs/adr/0002-other-decision.md"
+        And I stage the file "docs/adr/0002-other-decision.md"
+        And I commit the staged files with message "other decision"
+        And I switch to the branch "main"
+        And a proposed adr file named "docs/adr/XXXX-my-adr-title.md"
+        And I stage the file "docs/adr/XXXX-my-adr-title.md"
+        When I run "git adr accept docs/adr/XXXX-my-adr-title.md --reserve-ids"
+        Then it should pass
+        And the file "docs/adr/0003-my-adr-title.md" should be staged
+        And the command output should contain
+            """
+            Reserving ADR ids across branches...
+            """
+        When I run "git rev-parse --verify --quiet refs/adr/ids/0003"
+        Then it should pass
+
+    Scenario: Reservations of ids already given in a branch can be pruned
+        Given a proposed adr file named "docs/adr/XXXX-my-adr-title.md"
+        And I stage the file "docs/adr/XXXX-my-adr-title.md"
+        When I run "git adr accept docs/adr/XXXX-my-adr-title.md --reserve-ids --commit"
+        Then it should pass
+        When I run "git update-ref refs/adr/ids/0042 HEAD"
+        Then it should pass
+        When I run "git adr helper prune-id-reservations"
+        Then it should pass with:
+            """
+            1 id reservation(s) pruned, 1 kept.
+            """
+        When I run "git rev-parse --verify --quiet refs/adr/ids/0002"
+        Then it should fail
+        When I run "git rev-parse --verify --quiet refs/adr/ids/0042"
+        Then it should pass
@@ -4,3 +4,24 @@ Feature: Generate a table of content in markdown
         When I run "git adr"
         Then it should pass
         And the command output should contain "toc"
+
+    Scenario: Print the table of content of a git revision
+        Given a new working directory
+        And an initialised git adr repo
+        And an accepted adr file named "docs/adr/0002-not-committed-adr.md"
+        When I run "git adr toc --ref main"
+        Then it should pass with:
+            """
+            * [0000 - Record architecture decisions](0000-record-architecture-decisions.md)
+            """
+        And the command output should not contain "0002-not-committed-adr.md"
+        And the file named "docs/adr/index.md" should not exist
+
+    Scenario: Leave the worktree and the index untouched when printing the table of content of a git revision
+        Given a new working directory
+        And an initialised git adr repo
+        And a committed sharded table of content
+        When I run "git adr toc --ref main"
+        Then it should pass
+        And the file named "docs/adr/toc/manifest.json" should exist
+        And the git working tree should be clean
@@ -81,6 +81,29 @@ Feature: Helper for the various names and messages - Git included - Any repo typ
         Then it should pass
         And the file "0002-my-adr-title.md" should not be staged
 
+    Scenario: Sync the filenames of all ADRs with their titles
+        Given a file named "docs/adr/0002-my-adr-title.md" with:
+            """
+            # My ADR Updated Title
+
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        And a file named "docs/adr/0003-my-other-title.md" with:
+            """
+            # My Other Updated Title
+
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        And I stage the file "docs/adr/0002-my-adr-title.md"
+        And I commit the staged files with message "foo bar"
+        When I run "git adr helper sync-filename --all"
+        Then it should pass
+        And the file named "docs/adr/0002-my-adr-title.md" should not exist
+        And the file "docs/adr/0002-my-adr-updated-title.md" should be staged as renamed
+        And the file "docs/adr/0003-my-other-updated-title.md" should be staged
+
     Scenario: Return commit message fail on wrong filename format
         Given a proposed adr file named "XXXXX-my-adr-title.md"
         When I run "git adr helper commit-message XXXXX-my-adr-title.md"
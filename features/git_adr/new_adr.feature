@@ -44,6 +44,7 @@ Feature: Create a new ADR - Git included
             """
             No Git repository found in directory '{__WORKDIR__}/'. Please initialise a Git repository before running command.
             """
+        And the directory ".pyadr" should not exist
 
     Scenario: Fail when no main branch
         Given an empty git repo with "main" as initial branch
@@ -262,3 +262,16 @@ Feature: Git ADR - Check ADRs well formed before allowing to merge
             """
             All checks passed.
             """
+
+    Scenario: Check the ADRs of a git revision
+        Given a proposed adr file named "docs/adr/0002-a-proposed-adr.md"
+        When I run "git adr pre-merge-checks --ref main"
+        Then it should pass with:
+            """
+            All checks passed.
+            """
+        When I run "git adr pre-merge-checks"
+        Then it should fail with:
+            """
+            ADR(s) must not have their status set to 'proposed', but:
+            """
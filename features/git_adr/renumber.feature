@@ -0,0 +1,30 @@
+Feature: Renumber ADRs with canonical and unique ids - Git included
+
+    Scenario: Renumbered ADRs and updated links should be staged
+        Given a new working directory
+        And an initialised git adr repo
+        And a file named "docs/adr/002-my-adr-title.md" with:
+            """
+            # My ADR Title
+
+            * Status: accepted
+            * Date: 2020-03-26
+
+            ## Links
+
+            * Refines [Markdown ADRs](0001-use-markdown-architectural-decision-records.md)
+            * Refined by [Other ADR](0001-use-other-conventions.md)
+            """
+        And an accepted adr file named "docs/adr/0001-use-other-conventions.md"
+        And I stage the file "docs/adr/002-my-adr-title.md"
+        And I stage the file "docs/adr/0001-use-other-conventions.md"
+        And I commit the staged files with message "foo bar"
+        When I run "git adr renumber"
+        Then it should pass
+        And the file "docs/adr/0002-my-adr-title.md" should be staged as renamed
+        And the file "docs/adr/0003-use-other-conventions.md" should be staged as renamed
+        And the file "docs/adr/0002-my-adr-title.md" should contain:
+            """
+            * Refines [Markdown ADRs](0001-use-markdown-architectural-decision-records.md)
+            * Refined by [Other ADR](0003-use-other-conventions.md)
+            """
@@ -188,3 +188,37 @@ Feature: Accept or reject proposed ADR
             Markdown table of content generated in 'docs/adr/index.md'
             """
         And the file named "docs/adr/index.md" should exist
+
+    Scenario: Print the plan of the changes without making them
+        Given an accepted adr file named "docs/adr/0000-record-architecture-decisions.md"
+        Given a file named "docs/adr/XXXX-my-adr-title.md" with:
+            """
+            # My ADR Title
+
+            * Status: proposed
+            * Date: 2020-03-26
+
+            ## Context and Problem Statement
+
+            Context and problem statement.
+            """
+        When I run "pyadr accept docs/adr/XXXX-my-adr-title.md --toc --dry-run --plan json -q"
+        Then it should pass with:
+            """
+                  "operation": "rename",
+                  "path": "docs/adr/XXXX-my-adr-title.md",
+                  "renamed_path": "docs/adr/0001-my-adr-title.md"
+            """
+        And the command output should contain:
+            """
+            -* Status: proposed\n-* Date: 2020-03-26\n+* Status: accepted\n
+            """
+        And the command output should contain:
+            """
+                  "operation": "create",
+                  "path": "docs/adr/index.md",
+            """
+        And the file named "docs/adr/XXXX-my-adr-title.md" should exist
+        And the file named "docs/adr/0001-my-adr-title.md" should not exist
+        And the file named "docs/adr/index.md" should not exist
+        And the directory ".pyadr" should not exist
@@ -166,6 +166,22 @@ Feature: Check ADRs well formed
               => ['docs/adr/0003-more-adr.md', 'docs/adr/0003-yet-more-adr.md'].
             """
 
+    Scenario: Check ADR numbers are unique whatever the format of their id
+        Given an accepted adr file named "docs/adr/0012-an-adr.md"
+        And a file named "docs/adr/012-another-adr.md" with:
+            """
+            # Another ADR
+
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        When I run "pyadr check-adr-repo"
+        Then it should fail with:
+            """
+            ADRs must have a unique number, but the following files have the same number:
+              => ['docs/adr/0012-an-adr.md', 'docs/adr/012-another-adr.md'].
+            """
+
     Scenario: Check all ADR files have a title followed by a status and a date
         Given a file named "docs/adr/0002-an-adr.md" with:
             """
@@ -243,6 +259,21 @@ Feature: Check ADRs well formed
             All checks passed.
             """
 
+    Scenario: Read ADR files in parallel
+        Given an accepted adr file named "docs/adr/0002-an-adr.md"
+        And an accepted adr file named "docs/adr/0003-another-adr.md"
+        And a file named "docs/adr/0004-a-last-adr.md" with:
+            """
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        When I run "pyadr check-adr-repo --jobs 2"
+        Then it should fail with
+            """
+            but the following files where not:
+              => 'docs/adr/0004-a-last-adr.md'.
+            """
+
     Scenario: `no-proposed` option - Check all ADR files have a status other than 'proposed'
         Given a file named "docs/adr/0002-an-adr.md" with:
             """
@@ -193,3 +193,67 @@ Feature: Generate a table of content in markdown
 
             * None
             """
+
+    Scenario: Do not rewrite an up-to-date table of content
+        Given a new working directory
+        And an accepted adr file named "docs/adr/0001-an-adr.md"
+        When I run "pyadr toc --exit-code"
+        Then it should fail with:
+            """
+            Markdown table of content generated in 'docs/adr/index.md'
+            """
+        When I run "pyadr toc --exit-code"
+        Then it should pass with:
+            """
+            Markdown table of content already up-to-date in 'docs/adr/index.md'
+            """
+
+    Scenario: Generate a table of content in several formats
+        Given a new working directory
+        And an accepted adr file named "docs/adr/0001-an-adr.md"
+        When I run "pyadr toc --format md,jsonl,csv"
+        Then it should pass with:
+            """
+            Markdown table of content generated in 'docs/adr/index.md'
+            JSON Lines table of content generated in 'docs/adr/index.jsonl'
+            CSV table of content generated in 'docs/adr/index.csv'
+            """
+        And the file "docs/adr/index.csv" should contain:
+            """
+            id,title,status,status_phrase,date,path
+            """
+        And the file "docs/adr/index.jsonl" should contain:
+            """
+            "path": "0001-an-adr.md"
+            """
+
+    Scenario: Fail to generate a table of content in an unknown format
+        Given a new working directory
+        And an accepted adr file named "docs/adr/0001-an-adr.md"
+        When I run "pyadr toc --format md,xml"
+        Then it should fail with:
+            """
+            Option '--format' must be a comma-separated list of formats among 'md, json, jsonl, csv, html' (got 'md,xml').
+            """
+
+    Scenario: Generate a sharded table of content
+        Given a new working directory
+        And an accepted adr file named "docs/adr/0001-an-adr.md"
+        When I run "pyadr toc --sharded"
+        Then it should pass with:
+            """
+            Markdown table of content shard generated in 'docs/adr/toc/status-accepted.md'
+            """
+        And the file "docs/adr/index.md" should contain:
+            """
+            * [Accepted Records](toc/status-accepted.md) (1)
+            """
+        And the file "docs/adr/toc/ids-0000-0999.md" should contain:
+            """
+            * [0001 - An Adr](../0001-an-adr.md)
+            """
+        When I run "pyadr toc --sharded --exit-code"
+        Then it should pass with:
+            """
+            Markdown table of content already up-to-date in 'docs/adr/index.md'
+            """
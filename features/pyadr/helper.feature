@@ -83,3 +83,75 @@ Feature: Helper for the various names and messages
             """
             File name already up-to-date.
             """
+
+    Scenario: Sync the filenames of all ADRs with their titles
+        Given an accepted adr file named "docs/adr/0000-my-adr-title.md"
+        And a file named "docs/adr/0001-my-adr-title.md" with:
+            """
+            # My First Updated Title
+
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        And a file named "docs/adr/XXXX-my-adr-title.md" with:
+            """
+            # My Proposed Updated Title
+
+            * Status: proposed
+            * Date: 2020-03-26
+            """
+        When I run "pyadr helper sync-filename --all"
+        Then it should pass with
+            """
+            File 'docs/adr/0001-my-adr-title.md' renamed to 'docs/adr/0001-my-first-updated-title.md'.
+            File 'docs/adr/XXXX-my-adr-title.md' renamed to 'docs/adr/XXXX-my-proposed-updated-title.md'.
+            2 file(s) renamed.
+            """
+        And the file named "docs/adr/0000-my-adr-title.md" should exist
+        And the file named "docs/adr/0001-my-first-updated-title.md" should exist
+        And the file named "docs/adr/XXXX-my-proposed-updated-title.md" should exist
+
+    Scenario: Fail before syncing the filenames of all ADRs if some renames conflict
+        Given a file named "docs/adr/0001-my-adr-title.md" with:
+            """
+            # My Updated Title
+
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        And a file named "docs/adr/XXXX-first-proposal.md" with:
+            """
+            # Same Title
+
+            * Status: proposed
+            * Date: 2020-03-26
+            """
+        And a file named "docs/adr/XXXX-second-proposal.md" with:
+            """
+            # Same Title
+
+            * Status: proposed
+            * Date: 2020-03-26
+            """
+        When I run "pyadr helper sync-filename --all"
+        Then it should fail with
+            """
+              PyadrAdrRenameConflictError
+            """
+        And the command output should contain
+            """
+            Some ADRs cannot be renamed after their title:
+                => 'docs/adr/XXXX-same-title.md' <= 'docs/adr/XXXX-first-proposal.md', 'docs/adr/XXXX-second-proposal.md'
+            """
+        And the file named "docs/adr/0001-my-adr-title.md" should exist
+
+    Scenario: Fail to sync filenames if neither a file nor all files are given
+        When I run "pyadr helper sync-filename"
+        Then it should fail with
+            """
+              PyadrSyncFilenameArgumentsError
+            """
+        And the command output should contain
+            """
+            Either an ADR file or the option '--all' must be given.
+            """
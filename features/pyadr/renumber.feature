@@ -0,0 +1,55 @@
+Feature: Renumber ADRs with canonical and unique ids
+
+    Background:
+        Given a new working directory
+
+    Scenario: Pad ids, renumber duplicate ids and update links to renumbered ADRs
+        Given a file named "docs/adr/0001-first-adr.md" with:
+            """
+            # First ADR
+
+            * Status: accepted
+            * Date: 2020-03-26
+
+            ## Links
+
+            * Refined by [Second ADR](002-second-adr.md)
+            * Refined by [Third ADR](./0001-third-adr.md)
+            """
+        And a file named "docs/adr/002-second-adr.md" with:
+            """
+            # Second ADR
+
+            * Status: accepted
+            * Date: 2020-03-26
+            """
+        And an accepted adr file named "docs/adr/0001-third-adr.md"
+        When I run "pyadr renumber --toc"
+        Then it should pass with
+            """
+            File 'docs/adr/0001-third-adr.md' renamed to 'docs/adr/0003-third-adr.md'.
+            File 'docs/adr/002-second-adr.md' renamed to 'docs/adr/0002-second-adr.md'.
+            Links to renumbered ADRs updated in 'docs/adr/0001-first-adr.md'.
+            2 file(s) renumbered.
+            Markdown table of content generated in 'docs/adr/index.md'
+            """
+        And the file "docs/adr/0001-first-adr.md" should contain:
+            """
+            * Refined by [Second ADR](0002-second-adr.md)
+            * Refined by [Third ADR](./0003-third-adr.md)
+            """
+        And the file "docs/adr/index.md" should contain:
+            """
+            * [0001 - First ADR](0001-first-adr.md)
+            * [0002 - Second ADR](0002-second-adr.md)
+            * [0003 - Third Adr](0003-third-adr.md)
+            """
+
+    Scenario: No renumbering if ids are already canonical and unique
+        Given an accepted adr file named "docs/adr/0001-first-adr.md"
+        And an accepted adr file named "docs/adr/10000-second-adr.md"
+        When I run "pyadr renumber"
+        Then it should pass with
+            """
+            ADR ids already canonical and unique.
+            """
@@ -1,4 +1,4 @@
-from behave import given
+from behave import given, then
 from behave4cli.command_steps import step_i_successfully_run_command
 from behave4git.git_steps import step_a_starting_git_repo_with_initial_branch
 
@@ -17,3 +17,14 @@ def step_an_initialised_git_adr_only_repo(context):
     step_i_successfully_run_command(context, "git adr init --adr-only-repo")
     context.repo.heads.main.checkout()
     context.repo.git.merge("adr-init-repo")
+
+
+@given("a committed sharded table of content")
+def step_a_committed_sharded_table_of_content(context):
+    step_i_successfully_run_command(context, "git adr toc --sharded")
+    context.repo.index.commit("docs(adr): sharded table of content")
+
+
+@then("the git working tree should be clean")
+def step_the_git_working_tree_should_be_clean(context):
+    assert not context.repo.is_dirty(untracked_files=True), context.repo.git.status()
@@ -0,0 +1,268 @@
+"""Persistent on-disk cache of parsed ADR headers"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from loguru import logger
+
+from pyadr.const import CACHE_FORMAT_VERSION, CACHE_MAX_ENTRIES, CACHE_RACY_WINDOW_NS
+from pyadr.content_utils import AdrHeader, adr_header_from_file, parse_adrs
+from pyadr.exceptions import PyadrAdrFormatError
+from pyadr.file_utils import atomic_write
+
+StatKey = Tuple[int, int, int]
+
+
+def stat_key(stat: os.stat_result) -> StatKey:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class AdrHeaderCache(object):
+    """Cache of parsed ADR headers, persisted between runs.
+
+    Each entry is keyed by the path of the ADR file and validated against the
+    file's inode, mtime and size: a stale entry only triggers the re-parse of that
+    one file. Entries of files that have been deleted are evicted when the cache
+    is saved, and the number of entries is capped (least recently used entries are
+    dropped first).
+    """
+
+    def __init__(self, cache_path: Path, max_entries: int = CACHE_MAX_ENTRIES):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self._entries: Optional[Dict[str, Tuple[StatKey, AdrHeader]]] = None
+        self._used: Set[str] = set()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def entries(self) -> Dict[str, Tuple[StatKey, AdrHeader]]:
+        if self._entries is None:
+            self._entries = {}
+            self._load(self._entries)
+        return self._entries
+
+    def _load(self, entries: Dict[str, Tuple[StatKey, AdrHeader]]) -> None:
+        try:
+            with self.cache_path.open() as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.debug(f"Ignoring unreadable ADR cache '{self.cache_path}'.")
+            self._dirty = True
+            return
+
+        if not isinstance(raw, dict) or raw.get("version") != CACHE_FORMAT_VERSION:
+            logger.debug(f"Ignoring ADR cache '{self.cache_path}' of other version.")
+            self._dirty = True
+            return
+
+        try:
+            for key, (stat, values) in raw["entries"].items():
+                entries[key] = (tuple(stat), AdrHeader.from_tuple(values))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            logger.debug(f"Ignoring malformed ADR cache '{self.cache_path}'.")
+            entries.clear()
+            self._dirty = True
+
+    def get(self, path: Path) -> Optional[AdrHeader]:
+        key = str(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            current_stat = stat_key(os.stat(path))
+        except OSError:
+            return None
+        if entry[0] != current_stat:
+            return None
+
+        self._touch(key)
+        return entry[1]
+
+    def _touch(self, key: str) -> None:
+        # move to the end to keep entries in least recently used order
+        self.entries[key] = self.entries.pop(key)
+        self._used.add(key)
+
+    def put(self, header: AdrHeader, stat: os.stat_result) -> None:
+        key = str(header.path)
+        self.entries.pop(key, None)
+        self.entries[key] = (stat_key(stat), header)
+        self._used.add(key)
+        self._dirty = True
+
+    def adr_header_from_file(self, path: Path) -> AdrHeader:
+        header = self.get(path)
+        if header is None:
+            # stat before reading, so that a change made while reading is caught
+            # at next run
+            stat = os.stat(path)
+            header = adr_header_from_file(path)
+            self.put(header, stat)
+        return header
+
+    def adr_headers_from_files(
+        self, paths: Sequence[Path], workers: int = 1
+    ) -> List[Union[AdrHeader, PyadrAdrFormatError]]:
+        """
+        Get the headers of ADR files from the cache, parsing the ones missing or stale.
+
+        Stats and reads are spread over `workers` threads (see `parse_adrs`); the
+        cache itself is only updated from the calling thread.
+        """
+
+        def lookup(path: Path) -> Tuple[bool, AdrHeader, os.stat_result]:
+            stat = os.stat(path)
+            entry = entries.get(str(path))
+            if entry is not None and entry[0] == stat_key(stat):
+                return True, entry[1], stat
+            return False, adr_header_from_file(path), stat
+
+        entries = self.entries
+        results: List[Union[AdrHeader, PyadrAdrFormatError]] = []
+        for result in parse_adrs(paths, workers, parser=lookup):
+            if isinstance(result, PyadrAdrFormatError):
+                results.append(result)
+                continue
+            hit, header, stat = result
+            if hit:
+                self._touch(str(header.path))
+            else:
+                self.put(header, stat)
+            results.append(header)
+        return results
+
+    def evict_missing(self) -> None:
+        for key in [key for key in self.entries if key not in self._used]:
+            if not os.path.exists(key):
+                del self.entries[key]
+                self._dirty = True
+
+    def save(self) -> None:
+        if self._entries is None:
+            # nothing loaded: nothing to persist
+            return
+        self.evict_missing()
+        if not self._dirty:
+            return
+
+        racy_limit = time.time_ns() - CACHE_RACY_WINDOW_NS
+        entries: Dict[str, List[Any]] = {}
+        for key, (stat, header) in self.entries.items():
+            if stat[1] < racy_limit:
+                entries[key] = [list(stat), header.as_tuple()]
+        if len(entries) > self.max_entries:
+            keys = list(entries.keys())
+            for key in keys[: len(keys) - self.max_entries]:
+                del entries[key]
+
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # the cache can always be rebuilt: no need to pay for an fsync
+            with atomic_write(self.cache_path, fsync=False) as f:
+                json.dump({"version": CACHE_FORMAT_VERSION, "entries": entries}, f)
+        except OSError as e:
+            logger.debug(f"Could not save ADR cache '{self.cache_path}': {e}")
+        else:
+            self._dirty = False
+
+
+class AdrIdCache(object):
+    """High-water mark of the ADR ids of records directories, persisted between runs.
+
+    The highest number of the ADRs of each directory is kept with the directory's
+    inode, mtime and size: creating, renaming or deleting a file in the directory
+    changes its mtime, which invalidates the mark. Checking it thus costs a single
+    stat, whatever the number of ADRs. Marks of directories changed within the racy
+    window (see `CACHE_RACY_WINDOW_NS`) are not persisted.
+    """
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self._marks: Optional[Dict[str, Tuple[StatKey, int]]] = None
+        self._dirty = False
+
+    @property
+    def marks(self) -> Dict[str, Tuple[StatKey, int]]:
+        if self._marks is None:
+            self._marks = {}
+            self._load(self._marks)
+        return self._marks
+
+    def _load(self, marks: Dict[str, Tuple[StatKey, int]]) -> None:
+        try:
+            with self.cache_path.open() as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.debug(f"Ignoring unreadable ADR id cache '{self.cache_path}'.")
+            self._dirty = True
+            return
+
+        if not isinstance(raw, dict) or raw.get("version") != CACHE_FORMAT_VERSION:
+            logger.debug(f"Ignoring ADR id cache '{self.cache_path}' of other version.")
+            self._dirty = True
+            return
+
+        try:
+            for key, (stat, number) in raw["marks"].items():
+                if not isinstance(number, int) or not all(
+                    isinstance(value, int) for value in stat
+                ):
+                    raise ValueError(f"Malformed mark of '{key}'")
+                marks[key] = (tuple(stat), number)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            logger.debug(f"Ignoring malformed ADR id cache '{self.cache_path}'.")
+            marks.clear()
+            self._dirty = True
+
+    def get(self, directory: Path) -> Optional[int]:
+        mark = self.marks.get(str(directory))
+        if mark is None:
+            return None
+        try:
+            current_stat = stat_key(os.stat(directory))
+        except OSError:
+            return None
+        if mark[0] != current_stat:
+            return None
+        return mark[1]
+
+    def put(self, directory: Path, number: int, stat: os.stat_result) -> None:
+        """
+        Record the highest number of the ADRs of a directory.
+
+        `stat` must be taken before the directory is scanned or, after changes made
+        by the caller, once they are all made, so that any other change is caught.
+        """
+        mark = (stat_key(stat), number)
+        if self.marks.get(str(directory)) != mark:
+            self.marks[str(directory)] = mark
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        racy_limit = time.time_ns() - CACHE_RACY_WINDOW_NS
+        marks = {
+            key: [list(stat), number]
+            for key, (stat, number) in self.marks.items()
+            if stat[1] < racy_limit
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # the cache can always be rebuilt: no need to pay for an fsync
+            with atomic_write(self.cache_path, fsync=False) as f:
+                json.dump({"version": CACHE_FORMAT_VERSION, "marks": marks}, f)
+        except OSError as e:
+            logger.debug(f"Could not save ADR id cache '{self.cache_path}': {e}")
+        else:
+            self._dirty = False
@@ -11,6 +11,7 @@ from pyadr.cli.commands import (
     NewCommand,
     ProposeCommand,
     RejectCommand,
+    RenumberCommand,
 )
 from pyadr.cli.config import LoggingAppConfig
 
@@ -28,5 +29,6 @@ class App(cleo.Application):
         self.add(AcceptCommand())
         self.add(RejectCommand())
         self.add(GenerateTocCommand())
+        self.add(RenumberCommand())
         self.add(CheckAdrRepoCommand())
         self.add(HelperCommand())
@@ -1,18 +1,153 @@
 """Console script for pyadr."""
-from typing import List
+import functools
+import sys
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    ContextManager,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    TypeVar,
+)
 
 import cleo
+from loguru import logger
 
-from pyadr.const import STATUS_ACCEPTED, STATUS_REJECTED
+from pyadr.const import PLAN_FORMATS, STATUS_ACCEPTED, STATUS_REJECTED, TOC_FORMATS
 from pyadr.core import AdrCore
-from pyadr.exceptions import PyadrAdrRepoChecksFailedError
+from pyadr.exceptions import (
+    PyadrAdrRepoChecksFailedError,
+    PyadrInvalidJobsOptionError,
+    PyadrInvalidPlanFormatError,
+    PyadrInvalidTocFormatError,
+    PyadrSyncFilenameArgumentsError,
+)
+
+
+def jobs_option(command: cleo.Command) -> int:
+    """Number of jobs given with the `--jobs` option of the command."""
+    try:
+        jobs = int(command.option("jobs"))
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        logger.error(
+            f"Option '--jobs' must be a positive integer "
+            f"(got '{command.option('jobs')}')."
+        )
+        raise PyadrInvalidJobsOptionError(command.option("jobs"))
+    return jobs
+
+
+def toc_formats_option(command: cleo.Command) -> List[str]:
+    """Formats of table of content given with the `--format` option of the command."""
+    formats = [
+        toc_format.strip()
+        for toc_format in command.option("format").split(",")
+        if toc_format.strip()
+    ]
+    unknown_formats = [
+        toc_format for toc_format in formats if toc_format not in TOC_FORMATS
+    ]
+    if unknown_formats or not formats:
+        logger.error(
+            f"Option '--format' must be a comma-separated list of formats among "
+            f"'{', '.join(TOC_FORMATS)}' (got '{command.option('format')}')."
+        )
+        raise PyadrInvalidTocFormatError(command.option("format"))
+    return list(dict.fromkeys(formats))
+
+
+def sync_filename_all_option(command: cleo.Command) -> bool:
+    """Whether the `--all` option is given, and not along with a file."""
+    if bool(command.option("all")) == bool(command.argument("file")):
+        logger.error("Either an ADR file or the option '--all' must be given.")
+        raise PyadrSyncFilenameArgumentsError()
+    return bool(command.option("all"))
+
+
+def dry_run_option(command: cleo.Command) -> bool:
+    """Whether the `--dry-run` option is given (for commands having one)."""
+    return bool(command.option().get("dry-run"))
+
+
+def plan_format_option(command: cleo.Command) -> str:
+    """Format of the plan of changes given with the `--plan` option of the command."""
+    plan_format: str = command.option("plan")
+    if plan_format not in PLAN_FORMATS:
+        logger.error(
+            f"Option '--plan' must be one of '{', '.join(PLAN_FORMATS)}' "
+            f"(got '{plan_format}')."
+        )
+        raise PyadrInvalidPlanFormatError(plan_format)
+    return plan_format
+
+
+@contextmanager
+def dry_run(command: cleo.Command, adr_core: AdrCore) -> Iterator[None]:
+    """
+    Plan the changes made within the context by `adr_core` instead of making them,
+    if the `--dry-run` option is given, and print the plan on the standard output.
+    """
+    if not dry_run_option(command):
+        yield
+        return
+
+    plan_format = plan_format_option(command)
+    with adr_core.plan_changes() as plan:
+        yield
+    sys.stdout.write(plan.render(plan_format))
+    sys.stdout.flush()
+
+
+class LockingCommand(Protocol):
+    """Command holding the lock of the repository while it runs (see `locked()`)."""
+
+    def lock_repository(self) -> ContextManager[None]:
+        ...
+
+
+LockingCommandT = TypeVar("LockingCommandT", bound=LockingCommand)
+
+
+def locked(
+    handle: Callable[[LockingCommandT], Optional[int]]
+) -> Callable[[LockingCommandT], Optional[int]]:
+    """Run the `handle()` of a command holding the lock of the repository."""
+
+    @functools.wraps(handle)
+    def locked_handle(command: LockingCommandT) -> Optional[int]:
+        with command.lock_repository():
+            return handle(command)
+
+    return locked_handle
 
 
 class BaseCommand(cleo.Command):
+    # commands changing the repository hold its lock exclusively (and first roll back
+    # the changes of an interrupted command), the others share it (see
+    # `AdrCore.lock()`)
+    exclusive_lock = False
+
     def __init__(self):
         super().__init__()
         self.adr_core = AdrCore()
 
+    def lock_exclusively(self) -> bool:
+        # a dry run changes nothing
+        return self.exclusive_lock and not dry_run_option(self)
+
+    @contextmanager
+    def lock_repository(self) -> Iterator[None]:
+        """Hold the lock of the repository (see `AdrCore.lock()` and `locked()`)."""
+        exclusive = self.lock_exclusively()
+        with self.adr_core.lock(exclusive, create=not dry_run_option(self)):
+            if exclusive:
+                self.adr_core.rollback_interrupted_changes()
+            yield
+
 
 class ConfigCommand(BaseCommand):
     """
@@ -25,6 +160,10 @@ class ConfigCommand(BaseCommand):
         {--u|unset : Unset configuration setting.}
     """
 
+    def lock_exclusively(self) -> bool:
+        return bool(self.option("unset") or self.argument("value"))
+
+    @locked
     def handle(self):
         if self.option("list"):
             self.adr_core.list_config()
@@ -47,10 +186,16 @@ class InitCommand(BaseCommand):
 
     init
         {--f|force : If set, will erase existing repository.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.adr_core.init_adr_repo(force=self.option("force"))
+        with dry_run(self, self.adr_core):
+            self.adr_core.init_adr_repo(force=self.option("force"))
 
 
 class NewCommand(BaseCommand):
@@ -61,6 +206,9 @@ class NewCommand(BaseCommand):
         {words* : Words in the title.}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
         self.adr_core.new_adr(title=" ".join(self.argument("words")))
 
@@ -76,32 +224,59 @@ class ProposeCommand(NewCommand):
 
 class AcceptCommand(BaseCommand):
     """
-    Accept a proposed ADR by assigning an ID, updating filename, status and date
+    Accept proposed ADRs by assigning an ID, updating filename, status and date
 
     accept
-        {file : ADR file.}
+        {files* : ADR files (or glob patterns), given consecutive ids in that order.}
         {--t|toc : If set, generates also the table of content.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.adr_core.accept_or_reject(
-            self.argument("file"), STATUS_ACCEPTED, self.option("toc")
-        )
+        with dry_run(self, self.adr_core):
+            self.adr_core.accept_or_reject_many(
+                self.argument("files"), STATUS_ACCEPTED, self.option("toc")
+            )
 
 
 class RejectCommand(BaseCommand):
     """
-    Reject a proposed ADR by assigning an ID, updating filename, status and date
+    Reject proposed ADRs by assigning an ID, updating filename, status and date
 
     reject
-        {file : ADR file.}
+        {files* : ADR files (or glob patterns), given consecutive ids in that order.}
         {--t|toc : If set, generates also the table of content.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.adr_core.accept_or_reject(
-            self.argument("file"), STATUS_REJECTED, self.option("toc")
-        )
+        with dry_run(self, self.adr_core):
+            self.adr_core.accept_or_reject_many(
+                self.argument("files"), STATUS_REJECTED, self.option("toc")
+            )
+
+
+class RenumberCommand(BaseCommand):
+    """
+    Give canonical (4 digits padded) and unique ids to ADRs, updating links to them
+
+    renumber
+        {--t|toc : If set, generates also the table of content.}
+    """
+
+    exclusive_lock = True
+
+    @locked
+    def handle(self) -> None:
+        self.adr_core.renumber_adrs(self.option("toc"))
 
 
 class GenerateTocCommand(BaseCommand):
@@ -109,10 +284,29 @@ class GenerateTocCommand(BaseCommand):
     Generate a table of content of the ADRs
 
     toc
+        {--j|jobs=1 : Number of ADR files read in parallel.}
+        {--f|format=md : Comma-separated formats of the table of content
+                         (md, json, jsonl, csv, html).}
+        {--s|sharded : If set, the markdown table of content links to one page per
+                       status and per range of ids, only regenerated if changed.}
+        {--e|exit-code : If set, exits with code 1 when the table of content was
+                         updated (e.g. for pre-commit hooks).}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.adr_core.generate_toc()
+        with dry_run(self, self.adr_core):
+            toc_paths = self.adr_core.generate_toc(
+                jobs=jobs_option(self),
+                formats=toc_formats_option(self),
+                sharded=self.option("sharded"),
+            )
+        if toc_paths and self.option("exit-code"):
+            return 1
 
 
 class CheckAdrRepoCommand(BaseCommand):
@@ -121,11 +315,15 @@ class CheckAdrRepoCommand(BaseCommand):
 
     check-adr-repo
         {--p|no-proposed : If set, will also check that there are no proposed ADR.}
+        {--j|jobs=1 : Number of parallel jobs reading and checking ADR files.}
     """
 
+    @locked
     def handle(self):
         try:
-            self.adr_core.check_adr_repo(self.option("no-proposed"))
+            self.adr_core.check_adr_repo(
+                self.option("no-proposed"), jobs=jobs_option(self)
+            )
         except PyadrAdrRepoChecksFailedError:
             return 1
 
@@ -138,6 +336,7 @@ class HelperSlugCommand(BaseCommand):
         {file : ADR file.}
     """
 
+    @locked
     def handle(self):
         self.adr_core.print_title_slug(self.argument("file"))
 
@@ -150,6 +349,7 @@ class HelperLowercaseCommand(BaseCommand):
         {file : ADR file.}
     """
 
+    @locked
     def handle(self):
         self.adr_core.print_title_lowercase(self.argument("file"))
 
@@ -159,11 +359,21 @@ class HelperSyncFilenameCommand(BaseCommand):
     Sync the ADR's filename with its actual title
 
     sync-filename
-        {file : ADR file.}
+        {file? : ADR file.}
+        {--a|all : If set, syncs the filenames of all the ADRs at once.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.adr_core.sync_filename(self.argument("file"))
+        with dry_run(self, self.adr_core):
+            if sync_filename_all_option(self):
+                self.adr_core.sync_all_filenames()
+            else:
+                self.adr_core.sync_filename(self.argument("file"))
 
 
 class HelperCommand(BaseCommand):
@@ -7,6 +7,7 @@ from pyadr.exceptions import (
     PyadrConfigFileSettingsNotSupported,
     PyadrConfigSettingNotSupported,
 )
+from pyadr.file_utils import atomic_write
 
 
 class AdrConfig(ConfigParser):
@@ -89,10 +90,10 @@ class AdrConfig(ConfigParser):
             tmp_config = ConfigParser()
             tmp_config.read(self.config_file_path)
             tmp_config["adr"] = self["adr"]
-            with self.config_file_path.open("w") as f:
+            with atomic_write(self.config_file_path) as f:
                 tmp_config.write(f)
         else:
-            with self.config_file_path.open("w") as f:
+            with atomic_write(self.config_file_path) as f:
                 self.write(f)
 
         self[self.default_section] = defaults  # type: ignore
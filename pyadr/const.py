@@ -52,6 +52,102 @@ DEFAULT_ADR_PATH = Path("docs", "adr")
 
 ADR_DEFAULT_SETTINGS = {"records-dir": str(DEFAULT_ADR_PATH)}
 
+TEMPLATE_FILE_NAME = "template.md"
+TOC_FILE_STEM = "index"
+TOC_FILE_NAME = TOC_FILE_STEM + ".md"
+NON_ADR_FILE_NAMES = [TEMPLATE_FILE_NAME, TOC_FILE_NAME]
+
+###############################
+# TABLE OF CONTENT FORMATS
+###############################
+
+TOC_FORMAT_MARKDOWN = "md"
+TOC_FORMATS = {
+    TOC_FORMAT_MARKDOWN: "Markdown",
+    "json": "JSON",
+    "jsonl": "JSON Lines",
+    "csv": "CSV",
+    "html": "HTML",
+}
+TOC_RECORD_FIELDS = ["id", "title", "status", "status_phrase", "date", "path"]
+
+###############################
+# SHARDED TABLE OF CONTENT
+###############################
+
+TOC_SHARDS_DIR_NAME = "toc"
+TOC_SHARDS_MANIFEST_FILE_NAME = "manifest.json"
+TOC_SHARDS_FORMAT_VERSION = 1
+TOC_SHARD_ID_RANGE = 1000
+
+###############################
+# RUNTIME FILES
+###############################
+
+# lock, caches and journal of a repository, kept in this directory of its git
+# directory, or next to the config file outside of a git repository
+RUNTIME_DIR_NAME = "pyadr"
+DEFAULT_RUNTIME_DIR_NAME = ".pyadr"
+
+###############################
+# HEADER CACHE
+###############################
+
+DEFAULT_CACHE_FILE_NAME = "header-cache"
+CACHE_FORMAT_VERSION = 1
+CACHE_MAX_ENTRIES = 100_000
+# entries for files (and id marks for directories) modified less than this many
+# nanoseconds before the cache is persisted are not stored, as a later change within
+# the same mtime tick and with the same size would go unnoticed
+CACHE_RACY_WINDOW_NS = 2_000_000_000
+# highest ADR number of records directories, kept separately from the headers so
+# that allocating an id does not load the whole header cache
+DEFAULT_ID_CACHE_FILE_NAME = "id-cache"
+
+###############################
+# REPOSITORY LOCK
+###############################
+
+DEFAULT_LOCK_FILE_NAME = "lock"
+LOCK_TIMEOUT_ENV_VAR = "PYADR_LOCK_TIMEOUT"
+DEFAULT_LOCK_TIMEOUT = 60.0
+LOCK_POLL_INTERVAL = 0.05
+
+###############################
+# FILE TRANSACTIONS
+###############################
+
+DEFAULT_JOURNAL_FILE_NAME = "journal"
+FILE_TRANSACTION_FORMAT_VERSION = 1
+
+###############################
+# DRY RUN
+###############################
+
+PLAN_FORMAT_TEXT = "text"
+PLAN_FORMAT_JSON = "json"
+PLAN_FORMATS = [PLAN_FORMAT_TEXT, PLAN_FORMAT_JSON]
+
+###############################
+# FILES
+###############################
+
+COPY_BUFFER_SIZE = 1024 * 1024
+# entries of a status of the table of content are kept in memory up to this size,
+# then spooled to a temporary file
+TOC_SPOOL_MAX_SIZE = 1024 * 1024
+# headers streamed to the writer of a table of content are parsed by batches of
+# this number of ADRs
+TOC_HEADERS_BATCH_SIZE = 256
+
+###############################
+# PARALLEL PROCESSING
+###############################
+
+# below this number of ADRs, spawning processes costs more than it saves
+PARALLEL_CHECKS_MIN_ADRS = 512
+PARALLEL_CHECKS_SHARDS_PER_JOB = 4
+
 ###############################
 # CONTENT FORMAT
 ###############################
@@ -71,11 +167,16 @@ VALID_ADR_CONTENT_FORMAT = """>>>>>
 ###############################
 
 ADR_ID_NOT_SET_REGEX = r"XXXX"
-ADR_ID_REGEX = r"[0-9][0-9][0-9][0-9]"
+# ids are padded to 4 digits, and take more digits (without padding) above 9999
+ADR_ID_MIN_DIGITS = 4
+ADR_ID_REGEX = r"(?:[0-9]{4}|[1-9][0-9]{4,})"
+# format of ids shown in error messages
+ADR_ID_FORMAT = r"[0-9][0-9][0-9][0-9]"
 ADR_TITLE_SLUG_REGEX = r"[a-z0-9-]*"
 
 ADR_ID_NOT_SET_REGEX_WITH_SEPARATOR = ADR_ID_NOT_SET_REGEX + "-"
 ADR_ID_REGEX_WITH_SEPARATOR = ADR_ID_REGEX + "-"
+ADR_ID_FORMAT_WITH_SEPARATOR = ADR_ID_FORMAT + "-"
 
 VALID_ADR_FILENAME_REGEX = (
     r"^("
@@ -149,7 +250,7 @@ REGEX_ERROR_MESSAGE_ADR_FILENAME = "".join(
         REGEX_ERROR_MESSAGE_PREFIX,
         ADR_ID_NOT_SET_REGEX,
         "-<adr-title-in-slug-format>.md' or '",
-        ADR_ID_REGEX,
+        ADR_ID_FORMAT,
         "-<adr-title-in-slug-format>.md'",
     ]
 )
@@ -161,7 +262,7 @@ REGEX_ERROR_MESSAGE_ADR_FILENAME_WITHOUT_ID = "".join(
     ]
 )
 REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID = "".join(
-    [REGEX_ERROR_MESSAGE_PREFIX, ADR_ID_REGEX, "-<adr-title-in-slug-format>.md'"]
+    [REGEX_ERROR_MESSAGE_PREFIX, ADR_ID_FORMAT, "-<adr-title-in-slug-format>.md'"]
 )
 
 REGEX_ERROR_MESSAGE_ADR_FILENAME_SKIP_TITLE = "".join(
@@ -169,7 +270,7 @@ REGEX_ERROR_MESSAGE_ADR_FILENAME_SKIP_TITLE = "".join(
         REGEX_ERROR_MESSAGE_PREFIX,
         ADR_ID_NOT_SET_REGEX,
         "-*.md' or '",
-        ADR_ID_REGEX,
+        ADR_ID_FORMAT,
         "-*.md'",
     ]
 )
@@ -177,7 +278,7 @@ REGEX_ERROR_MESSAGE_ADR_FILENAME_WITHOUT_ID_SKIP_TITLE = "".join(
     [REGEX_ERROR_MESSAGE_PREFIX, ADR_ID_NOT_SET_REGEX, "-*.md'"]
 )
 REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID_SKIP_TITLE = "".join(
-    [REGEX_ERROR_MESSAGE_PREFIX, ADR_ID_REGEX, "-*.md'"]
+    [REGEX_ERROR_MESSAGE_PREFIX, ADR_ID_FORMAT, "-*.md'"]
 )
 
 REGEX_ERROR_MESSAGES = {
@@ -187,7 +288,7 @@ REGEX_ERROR_MESSAGES = {
             status=STATUS_ANY
         ),
         "id_prefix": "' or '".join(
-            [ADR_ID_REGEX_WITH_SEPARATOR, ADR_ID_NOT_SET_REGEX_WITH_SEPARATOR]
+            [ADR_ID_FORMAT_WITH_SEPARATOR, ADR_ID_NOT_SET_REGEX_WITH_SEPARATOR]
         ),
     },
     STATUS_ANY_WITHOUT_ID: {
@@ -206,7 +307,7 @@ REGEX_ERROR_MESSAGES = {
         "skip_title": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID_SKIP_TITLE.format(
             status=STATUS_ANY_WITH_ID
         ),
-        "id_prefix": ADR_ID_REGEX_WITH_SEPARATOR,
+        "id_prefix": ADR_ID_FORMAT_WITH_SEPARATOR,
     },
     STATUS_PROPOSED: {
         "full": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITHOUT_ID.format(
@@ -222,14 +323,14 @@ REGEX_ERROR_MESSAGES = {
         "skip_title": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID_SKIP_TITLE.format(
             status=STATUS_ACCEPTED
         ),
-        "id_prefix": ADR_ID_REGEX,
+        "id_prefix": ADR_ID_FORMAT,
     },
     STATUS_REJECTED: {
         "full": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID.format(status=STATUS_REJECTED),
         "skip_title": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID_SKIP_TITLE.format(
             status=STATUS_REJECTED
         ),
-        "id_prefix": ADR_ID_REGEX_WITH_SEPARATOR,
+        "id_prefix": ADR_ID_FORMAT_WITH_SEPARATOR,
     },
     STATUS_DEPRECATED: {
         "full": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID.format(
@@ -238,7 +339,7 @@ REGEX_ERROR_MESSAGES = {
         "skip_title": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID_SKIP_TITLE.format(
             status=STATUS_DEPRECATED
         ),
-        "id_prefix": ADR_ID_REGEX_WITH_SEPARATOR,
+        "id_prefix": ADR_ID_FORMAT_WITH_SEPARATOR,
     },
     STATUS_SUPERSEDING: {
         "full": REGEX_ERROR_MESSAGE_ADR_FILENAME_WITH_ID.format(
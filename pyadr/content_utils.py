@@ -1,17 +1,60 @@
+import bisect
 import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TextIO, Tuple, Union
+from typing import (
+    IO,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from slugify import slugify
 
+from pyadr.const import ADR_ID_MIN_DIGITS, TOC_SPOOL_MAX_SIZE
 from pyadr.exceptions import (
     PyadrAdrDateNotFoundError,
+    PyadrAdrFormatError,
     PyadrAdrStatusNotFoundError,
     PyadrAdrTitleNotFoundError,
     PyadrNoLineWithSuffixError,
 )
 
+STANDARD_TOC_STATUSES = ["accepted", "rejected", "superseded", "deprecated"]
+
+NUMBER_PREFIX_REGEX = re.compile(r"^([0-9]+)-")
+
+
+def format_adr_id(number: int) -> str:
+    """Canonical id of an ADR: padded to 4 digits, unpadded above 9999."""
+    return f"{number:0{ADR_ID_MIN_DIGITS}d}"
+
+
+def adr_sort_key(name: Union[str, Path]) -> Tuple[int, int, str]:
+    """
+    Key sorting ADR files (given by name, path or link) by their number first.
+
+    Files whose name does not start with a number are sorted after, by name.
+    """
+    name = str(name)
+    match = NUMBER_PREFIX_REGEX.match(name.rsplit("/", 1)[-1])
+    if match:
+        return 0, int(match.group(1)), name
+    return 1, 0, name
+
 
 def update_adr_content_title(content: str, title: str) -> str:
     return update_adr_content_title_and_status(content, title=title, status=None)
@@ -43,56 +86,174 @@ def update_adr_content_title_and_status(
     return updated_content
 
 
+class AdrHeader(object):
+    """Header of an ADR file (title, status and date), parsed in a single read.
+
+    `header_end` is the byte offset right after the date line, i.e. where the body
+    of the ADR starts.
+    """
+
+    __slots__ = (
+        "path",
+        "id",
+        "title",
+        "status",
+        "status_phrase",
+        "date",
+        "header_end",
+        "_slug",
+    )
+
+    def __init__(
+        self,
+        path: Path,
+        title: str,
+        status: str,
+        status_phrase: Optional[str],
+        date: str,
+        header_end: int,
+        slug: Optional[str] = None,
+    ):
+        self.path = path
+        self.id = path.stem.split("-", 1)[0]
+        self.title = title
+        self.status = status
+        self.status_phrase = status_phrase
+        self.date = date
+        self.header_end = header_end
+        self._slug = slug
+
+    @property
+    def slug(self) -> str:
+        if self._slug is None:
+            self._slug = slugify(self.title)
+        return self._slug
+
+    @slug.setter
+    def slug(self, value: str) -> None:
+        self._slug = value
+
+    def as_tuple(self) -> Tuple[Any, ...]:
+        return (
+            str(self.path),
+            self.title,
+            self.status,
+            self.status_phrase,
+            self.date,
+            self.header_end,
+            self._slug,
+        )
+
+    @classmethod
+    def from_tuple(cls, values: Sequence[Any]) -> "AdrHeader":
+        path, title, status, status_phrase, date, header_end, slug = values
+        return cls(Path(path), title, status, status_phrase, date, header_end, slug)
+
+    def __repr__(self) -> str:
+        return (
+            f"AdrHeader(path={str(self.path)!r}, title={self.title!r}, "
+            f"status={self.status!r}, date={self.date!r})"
+        )
+
+
 def adr_title_slug_from_file(path: Path) -> str:
-    title, _, _ = adr_title_status_and_date_from_file(path)
-    return slugify(title)
+    return adr_header_from_file(path).slug
 
 
 def adr_title_lowercase_from_file(path: Path) -> str:
-    title, _, _ = adr_title_status_and_date_from_file(path)
-    return title.lower()
+    return adr_header_from_file(path).title.lower()
 
 
 def adr_status_from_file(path: Path) -> str:
-    _, (status, _), _ = adr_title_status_and_date_from_file(path)
-    return status
+    return adr_header_from_file(path).status
 
 
 def adr_title_status_and_date_from_file(
     path: Path,
 ) -> Tuple[str, Tuple[str, Optional[str]], str]:
-    with path.open() as f:
-        try:
-            title = extract_next_line_with_suffix_from_content_stream(
-                f, "# ", stream_source=str(path)
-            )
-        except PyadrNoLineWithSuffixError:
-            raise PyadrAdrTitleNotFoundError(source=str(path))
+    header = adr_header_from_file(path)
+    return header.title, (header.status, header.status_phrase), header.date
 
-        try:
-            full_status = extract_next_line_with_suffix_from_content_stream(
-                f, "* Status:", stream_source=str(path)
-            )
-        except PyadrNoLineWithSuffixError:
-            raise PyadrAdrStatusNotFoundError(source=str(path))
 
-        status_phrase: Optional[str]
-        try:
-            status, status_phrase = full_status.split(" ", 1)
-        except ValueError:
-            status = full_status
-            status_phrase = None
-        else:
-            status_phrase = status_phrase.strip()
+def adr_header_from_file(path: Path) -> AdrHeader:
+    with path.open("rb") as f:
+        return adr_header_from_stream(f, path)
 
+
+def adr_header_from_stream(
+    stream: BinaryIO, path: Path, stream_source: Optional[str] = None
+) -> AdrHeader:
+    source = stream_source or str(path)
+    header_end = 0
+
+    def next_line_with_prefix(prefix: bytes) -> Optional[str]:
+        nonlocal header_end
+        line = stream.readline()
+        header_end += len(line)
+        while len(line) != 0 and not line.startswith(prefix):
+            line = stream.readline()
+            header_end += len(line)
+        if len(line) == 0:
+            return None
+        return line[len(prefix) :].decode("utf-8").strip()
+
+    title = next_line_with_prefix(b"# ")
+    if title is None:
+        raise PyadrAdrTitleNotFoundError(source=source)
+
+    full_status = next_line_with_prefix(b"* Status:")
+    if full_status is None:
+        raise PyadrAdrStatusNotFoundError(source=source)
+
+    status_phrase: Optional[str]
+    try:
+        status, status_phrase = full_status.split(" ", 1)
+    except ValueError:
+        status = full_status
+        status_phrase = None
+    else:
+        status_phrase = status_phrase.strip()
+
+    date = next_line_with_prefix(b"* Date:")
+    if date is None:
+        raise PyadrAdrDateNotFoundError(source=source)
+
+    return AdrHeader(path, title, status, status_phrase, date, header_end)
+
+
+T = TypeVar("T")
+
+
+def parse_adrs(
+    paths: Sequence[Path],
+    workers: int = 1,
+    parser: Callable[[Path], T] = adr_header_from_file,  # type: ignore
+) -> List[Union[T, PyadrAdrFormatError]]:
+    """
+    Parse the header of each ADR file, overlapping file I/O on a pool of threads.
+
+    Args:
+        paths: ADR files to parse
+        workers: number of threads reading files concurrently ; files are read
+                 one after the other if `1`
+        parser: function parsing one file
+
+    Returns: the parsed headers, in the order of `paths` ; the format error of a
+             file is returned in place of its header instead of being raised
+
+    """
+
+    def parse_collecting_format_error(path: Path) -> Union[T, PyadrAdrFormatError]:
         try:
-            date = extract_next_line_with_suffix_from_content_stream(
-                f, "* Date:", stream_source=str(path)
-            )
-        except PyadrNoLineWithSuffixError:
-            raise PyadrAdrDateNotFoundError(source=str(path))
+            return parser(path)
+        except PyadrAdrFormatError as e:
+            return e
+
+    if workers <= 1 or len(paths) <= 1:
+        return [parse_collecting_format_error(path) for path in paths]
 
-    return title, (status, status_phrase), date
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        return list(executor.map(parse_collecting_format_error, paths))
 
 
 def extract_next_line_with_suffix_from_content_stream(
@@ -113,39 +274,122 @@ def extract_next_line_with_suffix_from_content_stream(
 def build_toc_content_from_adrs_by_status(
     adrs_by_status: Dict[str, Dict[str, Any]]
 ) -> List[str]:
-    toc_content = [
-        "<!-- This file has been generated by `pyadr`. Manual changes will be "
-        "erased at next generation. -->\n",
-        "# Architecture Decision Records\n",
-    ]
-    for status in ["accepted", "rejected", "superseded", "deprecated"]:
-        toc_content.append("\n")
-        toc_content.append(f"## {adrs_by_status[status]['status-title']}\n")
-        toc_content.append("\n")
-        if adrs_by_status[status]["adrs"]:
-            toc_content.extend(adrs_by_status[status]["adrs"])
-        else:
-            toc_content.append("* None\n")
-
-    status = "non-standard"
-    toc_content.append("\n")
-    toc_content.append(f"## {adrs_by_status[status]['status-title']}\n")
-    if adrs_by_status[status]["adrs-by-status"]:
-        for value in adrs_by_status[status]["adrs-by-status"].values():
-            toc_content.append("\n")
-            toc_content.append(f"### {value['status-title']}\n")
-            toc_content.append("\n")
-            toc_content.extend(value["adrs"])
-    else:
-        toc_content.append("\n")
-        toc_content.append("* None\n")
-    return toc_content
+    return list(
+        _iter_toc_content(
+            [
+                (adrs_by_status[status]["status-title"], adrs_by_status[status]["adrs"])
+                for status in STANDARD_TOC_STATUSES
+            ],
+            adrs_by_status["non-standard"]["status-title"],
+            [
+                (value["status-title"], value["adrs"])
+                for value in adrs_by_status["non-standard"]["adrs-by-status"].values()
+            ],
+        )
+    )
 
 
-def extract_adrs_by_status(
-    records_path: Path, adr_paths: List[Path]
-) -> Dict[str, Dict[str, Any]]:
-    adrs_by_status: Dict[str, Dict[str, Any]] = {
+TocSections = List[Tuple[str, Iterable[str]]]
+
+
+@contextmanager
+def spooled_toc_sections(
+    adr_headers: Iterable[AdrHeader], build_entry: Callable[[AdrHeader], str]
+) -> Iterator[Tuple[TocSections, TocSections]]:
+    """
+    Sort the entries of ADRs by status, in a single pass over them.
+
+    The entries of each status are spooled to their own temporary file (kept in
+    memory up to `TOC_SPOOL_MAX_SIZE`), so that memory use is bounded by the number
+    of statuses rather than by the number of ADRs.
+
+    Returns: the sections of the standard statuses, as (title, entries), and the
+        ones of non-standard statuses, as (status, entries)
+
+    """
+    titles = new_adrs_by_status()
+    with ExitStack() as stack:
+        buckets: Dict[str, IO[str]] = {}
+        for header in adr_headers:
+            bucket = buckets.get(header.status)
+            if bucket is None:
+                bucket = buckets[header.status] = stack.enter_context(
+                    tempfile.SpooledTemporaryFile(  # type: ignore
+                        max_size=TOC_SPOOL_MAX_SIZE,
+                        mode="w+",
+                        encoding="utf-8",
+                        newline="",
+                    )
+                )
+            bucket.write(build_entry(header))
+
+        for bucket in buckets.values():
+            bucket.seek(0)
+        yield (
+            [
+                (titles[status]["status-title"], buckets.pop(status, []))
+                for status in STANDARD_TOC_STATUSES
+            ],
+            list(buckets.items()),
+        )
+
+
+def iter_toc_content_from_adr_headers(
+    records_path: Path, adr_headers: Iterable[AdrHeader]
+) -> Iterator[str]:
+    """
+    Generate the lines of the markdown table of content of ADRs.
+
+    Entries are sorted by status in a single pass (see `spooled_toc_sections()`).
+    """
+    with spooled_toc_sections(
+        adr_headers,
+        lambda header: build_toc_entry(
+            header, str(header.path.relative_to(records_path))
+        ),
+    ) as (sections, non_standard_sections):
+        yield from _iter_toc_content(
+            sections,
+            new_adrs_by_status()["non-standard"]["status-title"],
+            [(f"Status `{status}`", adrs) for status, adrs in non_standard_sections],
+        )
+
+
+def _iter_toc_content(
+    sections: TocSections,
+    non_standard_title: str,
+    non_standard_sections: TocSections,
+) -> Iterator[str]:
+    yield (
+        "<!-- This file has been generated by `pyadr`. Manual changes will be "
+        "erased at next generation. -->\n"
+    )
+    yield "# Architecture Decision Records\n"
+    for title, adrs in sections:
+        yield "\n"
+        yield f"## {title}\n"
+        yield "\n"
+        empty = True
+        for adr in adrs:
+            empty = False
+            yield adr
+        if empty:
+            yield "* None\n"
+
+    yield "\n"
+    yield f"## {non_standard_title}\n"
+    for title, adrs in non_standard_sections:
+        yield "\n"
+        yield f"### {title}\n"
+        yield "\n"
+        yield from adrs
+    if not non_standard_sections:
+        yield "\n"
+        yield "* None\n"
+
+
+def new_adrs_by_status() -> Dict[str, Dict[str, Any]]:
+    return {
         "accepted": {"status-title": "Accepted Records", "adrs": []},
         "rejected": {"status-title": "Rejected Records", "adrs": []},
         "superseded": {"status-title": "Superseded Records", "adrs": []},
@@ -156,32 +400,148 @@ def extract_adrs_by_status(
         },
     }
 
-    for adr in adr_paths:
-        (
-            title,
-            (status, status_phrase),
-            date,
-        ) = adr_title_status_and_date_from_file(adr)
-        id = adr.stem.split("-")[0]
-
-        if status_phrase:
-            status_supplement = f": {status} {status_phrase}"
-        else:
-            status_supplement = ""
-
-        adr_statement = (
-            f"* [{id} - {title}]({adr.relative_to(records_path)}){status_supplement}\n"
+
+def build_toc_entry(header: AdrHeader, link: str) -> str:
+    if header.status_phrase:
+        status_supplement = f": {header.status} {header.status_phrase}"
+    else:
+        status_supplement = ""
+
+    return f"* [{header.id} - {header.title}]({link}){status_supplement}\n"
+
+
+def extract_adrs_by_status(
+    records_path: Path, adr_headers: List[AdrHeader]
+) -> Dict[str, Dict[str, Any]]:
+    adrs_by_status = new_adrs_by_status()
+
+    for header in adr_headers:
+        add_toc_entry(
+            adrs_by_status,
+            header.status,
+            build_toc_entry(header, str(header.path.relative_to(records_path))),
         )
-        try:
-            adrs_by_status[status]["adrs"].append(adr_statement)
-        except KeyError:
-            if status not in adrs_by_status["non-standard"]["adrs-by-status"].keys():
-                adrs_by_status["non-standard"]["adrs-by-status"][status] = {
-                    "status-title": f"Status `{status}`",
-                    "adrs": [],
-                }
-
-            adrs_by_status["non-standard"]["adrs-by-status"][status]["adrs"].append(
-                adr_statement
+    return adrs_by_status
+
+
+TOC_ENTRY_LINK_REGEX = re.compile(r"^\* \[[0-9]+ - .*?\]\((?P<link>[^()\s]+)\)")
+
+
+def toc_entry_link(entry: str) -> str:
+    match = TOC_ENTRY_LINK_REGEX.match(entry)
+    if not match:
+        raise ValueError(f"Not a table of content entry: {entry!r}")
+    return match.group("link")
+
+
+def _status_bucket(
+    adrs_by_status: Dict[str, Dict[str, Any]], status: str, create: bool = False
+) -> Optional[Dict[str, Any]]:
+    if status in adrs_by_status and status != "non-standard":
+        return adrs_by_status[status]
+
+    non_standard: Dict[str, Dict[str, Any]] = adrs_by_status["non-standard"][
+        "adrs-by-status"
+    ]
+    if status not in non_standard and create:
+        non_standard[status] = {"status-title": f"Status `{status}`", "adrs": []}
+    return non_standard.get(status)
+
+
+def add_toc_entry(
+    adrs_by_status: Dict[str, Dict[str, Any]], status: str, entry: str
+) -> None:
+    bucket = _status_bucket(adrs_by_status, status, create=True)
+    bucket["adrs"].append(entry)  # type: ignore
+
+
+def insert_toc_entry(
+    adrs_by_status: Dict[str, Dict[str, Any]], status: str, entry: str
+) -> None:
+    """Insert an entry in its status section, keeping the entries sorted by number.
+
+    Sections of non-standard statuses are kept ordered by their first entry, as when
+    the table of content is generated from scratch.
+    """
+    link_key = adr_sort_key(toc_entry_link(entry))
+    bucket = _status_bucket(adrs_by_status, status, create=True)
+    link_keys = [
+        adr_sort_key(toc_entry_link(adr)) for adr in bucket["adrs"]  # type: ignore
+    ]
+    bucket["adrs"].insert(bisect.bisect(link_keys, link_key), entry)  # type: ignore
+
+    non_standard = adrs_by_status["non-standard"]["adrs-by-status"]
+    if status in non_standard:
+        adrs_by_status["non-standard"]["adrs-by-status"] = dict(
+            sorted(
+                non_standard.items(),
+                key=lambda item: adr_sort_key(toc_entry_link(item[1]["adrs"][0])),
             )
+        )
+
+
+def remove_toc_entry(adrs_by_status: Dict[str, Dict[str, Any]], link: str) -> bool:
+    """Remove the entry pointing to ``link`` from whichever section holds it.
+
+    Returns: True if an entry was removed
+
+    """
+    for bucket in _toc_buckets(adrs_by_status):
+        links = [toc_entry_link(entry) for entry in bucket["adrs"]]
+        if link in links:
+            del bucket["adrs"][links.index(link)]
+            break
+    else:
+        return False
+
+    adrs_by_status["non-standard"]["adrs-by-status"] = {
+        status: value
+        for status, value in adrs_by_status["non-standard"]["adrs-by-status"].items()
+        if value["adrs"]
+    }
+    return True
+
+
+def _toc_buckets(adrs_by_status: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [adrs_by_status[status] for status in STANDARD_TOC_STATUSES] + list(
+        adrs_by_status["non-standard"]["adrs-by-status"].values()
+    )
+
+
+def parse_toc_content(toc_content: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Parse a table of content generated by `pyadr` back into its ADRs by status.
+
+    Returns: `None` if the content was not generated by `pyadr` or was edited by hand
+        since (i.e. generating it again from its entries would not give it back)
+
+    """
+    adrs_by_status = new_adrs_by_status()
+    status_by_title = {
+        value["status-title"]: status for status, value in adrs_by_status.items()
+    }
+    bucket: Optional[Dict[str, Any]] = None
+    in_non_standard = False
+
+    for line in toc_content.splitlines(keepends=True):
+        if line.startswith("## "):
+            status = status_by_title.get(line[3:].rstrip("\n"))
+            if status is None:
+                return None
+            in_non_standard = status == "non-standard"
+            bucket = None if in_non_standard else adrs_by_status[status]
+        elif line.startswith("### Status `") and in_non_standard:
+            status = line[len("### Status `") :].rstrip("\n")[:-1]
+            bucket = _status_bucket(adrs_by_status, status, create=True)
+        elif line.startswith("* ") and line != "* None\n":
+            if bucket is None or not TOC_ENTRY_LINK_REGEX.match(line):
+                return None
+            bucket["adrs"].append(line)
+
+    for value in _toc_buckets(adrs_by_status):
+        link_keys = [adr_sort_key(toc_entry_link(entry)) for entry in value["adrs"]]
+        if link_keys != sorted(link_keys):
+            return None
+
+    if "".join(build_toc_content_from_adrs_by_status(adrs_by_status)) != toc_content:
+        return None
     return adrs_by_status
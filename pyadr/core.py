@@ -1,29 +1,54 @@
+import glob
 import re
-import shutil
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
 
 from loguru import logger
 from slugify import slugify
 
 from pyadr import assets
+from pyadr.cache import AdrHeaderCache, AdrIdCache
 from pyadr.config import AdrConfig
 from pyadr.const import (
+    DEFAULT_CACHE_FILE_NAME,
+    DEFAULT_ID_CACHE_FILE_NAME,
+    DEFAULT_JOURNAL_FILE_NAME,
+    DEFAULT_LOCK_FILE_NAME,
     FILENAME_REGEXES,
+    PARALLEL_CHECKS_MIN_ADRS,
+    PARALLEL_CHECKS_SHARDS_PER_JOB,
     REGEX_ERROR_MESSAGES,
     STATUS_ACCEPTED,
     STATUS_ANY_WITH_ID,
     STATUS_PROPOSED,
+    TOC_FILE_STEM,
+    TOC_FORMAT_MARKDOWN,
+    TOC_FORMATS,
+    TOC_SHARDS_DIR_NAME,
+    TOC_SHARDS_MANIFEST_FILE_NAME,
     VALID_ADR_CONTENT_FORMAT,
-    VALID_ADR_FILENAME_WITH_ID_REGEX,
 )
 from pyadr.content_utils import (
-    adr_status_from_file,
-    adr_title_lowercase_from_file,
-    adr_title_slug_from_file,
-    adr_title_status_and_date_from_file,
+    AdrHeader,
     build_toc_content_from_adrs_by_status,
-    extract_adrs_by_status,
+    build_toc_entry,
+    format_adr_id,
+    insert_toc_entry,
+    parse_toc_content,
+    remove_toc_entry,
 )
 from pyadr.exceptions import (
     PyadrAdrDirectoryAlreadyExistsError,
@@ -31,6 +56,7 @@ from pyadr.exceptions import (
     PyadrAdrFilenameFormatError,
     PyadrAdrFilenameIncorrectError,
     PyadrAdrFormatError,
+    PyadrAdrRenameConflictError,
     PyadrAdrRepoChecksFailedError,
     PyadrNoNumberedAdrError,
     PyadrNoProposedAdrError,
@@ -39,7 +65,38 @@ from pyadr.exceptions import (
     PyadrSomeAdrStatusesAreProposedError,
     PyadrTooManyProposedAdrError,
 )
-from pyadr.file_utils import calculate_next_adr_id, update_adr
+from pyadr.file_utils import (
+    adr_links_regex,
+    atomic_write,
+    atomic_write_batch,
+    file_transaction,
+    protect_files,
+    rollback_interrupted_transaction,
+    runtime_dir,
+    update_adr,
+    update_adr_links,
+    write_lines_if_changed,
+)
+from pyadr.lock import lock_timeout, repository_lock
+from pyadr.plan import (
+    ChangePlan,
+    file_exists,
+    make_directory,
+    open_file,
+    planned_changes,
+    remove_empty_directory,
+    remove_file,
+    remove_tree,
+    rename_file,
+)
+from pyadr.repository import AdrRepository, PlannedAdrRepository
+from pyadr.toc_formats import TOC_RENDERERS
+from pyadr.toc_shards import (
+    iter_sharded_toc_index,
+    iter_shards_manifest,
+    load_shards_manifest,
+    shard_adr_headers,
+)
 
 try:
     import importlib.resources as pkg_resources
@@ -48,9 +105,140 @@ except ImportError:
     import importlib_resources as pkg_resources  # type: ignore
 
 
+FILENAME_ERROR_FORMAT_NOT_VALID = "format_not_valid"
+FILENAME_ERROR_INCORRECT_TITLE_SLUG = "incorrect_title_slug"
+
+
+def _filename_errors(
+    records: Sequence[Tuple[Any, ...]], filename_regex: str
+) -> Tuple[List[Tuple[str, str, str]], List[str]]:
+    """
+    Check the filenames of ADRs given as `AdrHeader.as_tuple()` records.
+
+    Module level function, so that it can be run in a worker process.
+
+    Returns: the errors found, as compact `(path, error, title_slug)` tuples, and the
+             title slug of each ADR (in the order of `records`)
+
+    """
+    rex = re.compile(filename_regex)
+    errors = []
+    slugs = []
+    for record in records:
+        header = AdrHeader.from_tuple(record)
+        path = header.path
+        if not rex.match(path.name):
+            errors.append((str(path), FILENAME_ERROR_FORMAT_NOT_VALID, header.slug))
+        try:
+            title_in_filename = path.stem.split("-", 1)[1]
+        except IndexError:
+            title_in_filename = ""
+        if title_in_filename != header.slug:
+            errors.append((str(path), FILENAME_ERROR_INCORRECT_TITLE_SLUG, header.slug))
+        slugs.append(header.slug)
+    return errors, slugs
+
+
 class AdrCore(object):
-    def __init__(self):
-        self.config = AdrConfig()
+    def __init__(self, config: Optional[AdrConfig] = None):
+        self.config = config or AdrConfig()
+        self._header_cache: Optional[AdrHeaderCache] = None
+        self._id_cache: Optional[AdrIdCache] = None
+        self._adr_repository: Optional[AdrRepository] = None
+
+    ###########################################
+    # PROPERTIES
+    ###########################################
+    @property
+    def runtime_path(self) -> Path:
+        """Directory of the lock, caches and journal (see `runtime_dir()`)."""
+        return runtime_dir(self.config.config_file_path.parent)
+
+    @property
+    def header_cache(self) -> AdrHeaderCache:
+        if self._header_cache is None:
+            self._header_cache = AdrHeaderCache(
+                self.runtime_path / DEFAULT_CACHE_FILE_NAME
+            )
+        return self._header_cache
+
+    @property
+    def id_cache(self) -> AdrIdCache:
+        if self._id_cache is None:
+            self._id_cache = AdrIdCache(self.runtime_path / DEFAULT_ID_CACHE_FILE_NAME)
+        return self._id_cache
+
+    @property
+    def adr_repository(self) -> AdrRepository:
+        if self._adr_repository is None:
+            self._adr_repository = AdrRepository(
+                Path(self.config["adr"]["records-dir"]),
+                header_cache=self.header_cache,
+                id_cache=self.id_cache,
+            )
+        return self._adr_repository
+
+    ###########################################
+    # LOCK
+    ###########################################
+    def lock(self, exclusive: bool, create: bool = True) -> ContextManager[None]:
+        """
+        Advisory lock of the repository, held by commands while they run.
+
+        Commands changing the repository hold it exclusively, the others share it.
+        Commands changing nothing at all (e.g. dry runs) do not create the lock file
+        (see `repository_lock()`).
+        """
+        return repository_lock(
+            self.runtime_path / DEFAULT_LOCK_FILE_NAME,
+            exclusive,
+            lock_timeout(),
+            create,
+        )
+
+    ###########################################
+    # DRY RUN
+    ###########################################
+    @contextmanager
+    def plan_changes(self) -> Iterator[ChangePlan]:
+        """
+        Plan the changes made within the context instead of making them (see
+        `planned_changes()`).
+
+        ADRs are listed and read as changed by the plan, from a repository of its
+        own (see `PlannedAdrRepository`), restored at the end of the dry run.
+        """
+        adr_repository = self._adr_repository
+        with planned_changes() as plan:
+            self._adr_repository = PlannedAdrRepository(
+                Path(self.config["adr"]["records-dir"]), plan
+            )
+            try:
+                yield plan
+            finally:
+                self._adr_repository = adr_repository
+
+    ###########################################
+    # FILE TRANSACTIONS
+    ###########################################
+    @property
+    def _journal_path(self) -> Path:
+        return self.runtime_path / DEFAULT_JOURNAL_FILE_NAME
+
+    def _file_transaction(self, paths: Iterable[Path] = ()) -> ContextManager[None]:
+        """
+        Apply the file changes made within the context all at once, or not at all.
+
+        Args:
+            paths: files known beforehand to be changed, created or removed (other
+                   files are recorded as they change, see `file_transaction()`)
+
+        """
+        return file_transaction(self._journal_path, paths)
+
+    def rollback_interrupted_changes(self) -> bool:
+        """Restore the files changed by a command that was killed while changing them."""
+        return rollback_interrupted_transaction(self._journal_path)
 
     ###########################################
     # CONFIGURE ADR
@@ -78,11 +266,12 @@ class AdrCore(object):
     def init_adr_repo(self, force: bool = False) -> List[Path]:
         self.verify_and_prepare_pre_init(force)
         self.create_adr_repo_dir()
-        created_files = [
-            self._init_adr_template(),
-            self._init_adr_0000(),
-            self._init_adr_0001(),
-        ]
+        with atomic_write_batch():
+            created_files = [
+                self._init_adr_template(),
+                self._init_adr_0000(),
+                self._init_adr_0001(),
+            ]
         logger.info(
             f"ADR repository successfully created at "
             f"'{Path(self.config['adr']['records-dir']).resolve()}/'."
@@ -92,16 +281,16 @@ class AdrCore(object):
     def verify_and_prepare_pre_init(self, force: bool = False) -> None:
         adr_repo_abs_path = Path(self.config["adr"]["records-dir"]).resolve()
         if force:
-            if adr_repo_abs_path.exists():
+            if file_exists(adr_repo_abs_path):
                 logger.warning(
                     f"Directory '{adr_repo_abs_path}/' already exists. "
                     f"Used '--force' option => Erasing..."
                 )
-                shutil.rmtree(adr_repo_abs_path)
+                remove_tree(adr_repo_abs_path)
                 logger.warning("... erased.")
 
         else:
-            if adr_repo_abs_path.exists():
+            if file_exists(adr_repo_abs_path):
                 logger.error(
                     f"Directory '{adr_repo_abs_path}/' already exists. "
                     "You can use '--force' option to erase."
@@ -111,14 +300,14 @@ class AdrCore(object):
     def create_adr_repo_dir(self):
         adr_repo_path = Path(self.config["adr"]["records-dir"])
         logger.info(f"Creating ADR repo directory '{adr_repo_path}'.")
-        adr_repo_path.mkdir(parents=True)
+        make_directory(adr_repo_path, parents=True)
         logger.log("VERBOSE", "... done.")
 
     def _init_adr_template(self) -> Path:
         template_path = Path(self.config["adr"]["records-dir"], "template.md")
 
         logger.info(f"Copying MADR template to '{template_path}'...")
-        with template_path.open("w") as f:
+        with atomic_write(template_path) as f:
             f.write(pkg_resources.read_text(assets, "madr-template.md"))  # type: ignore
 
         logger.log("VERBOSE", "... done.")
@@ -136,9 +325,10 @@ class AdrCore(object):
         path = Path(self.config["adr"]["records-dir"], filename)
 
         logger.info(f"Creating ADR '{path}'...")
-        with path.open("w") as f:
+        with atomic_write(path) as f:
             f.write(pkg_resources.read_text(assets, filename))  # type: ignore
         update_adr(path, status=STATUS_ACCEPTED)
+        self.adr_repository.record_change(path)
 
         logger.log("VERBOSE", "... done.")
         return path
@@ -155,13 +345,17 @@ class AdrCore(object):
         logger.info(f"Creating ADR '{adr_path}'...")
 
         template = Path(self.config["adr"]["records-dir"], "template.md")
-        with adr_path.open("w") as f:
-            if template.exists():
-                with template.open("r") as t:
-                    f.write(t.read())
-            else:
-                f.write(pkg_resources.read_text(assets, "madr-template.md"))  # type: ignore
-        update_adr(adr_path, title=title, status=STATUS_PROPOSED)
+        with atomic_write_batch():
+            with atomic_write(adr_path) as f:
+                if template.exists():
+                    with template.open("r") as t:
+                        f.write(t.read())
+                else:
+                    f.write(
+                        pkg_resources.read_text(assets, "madr-template.md")  # type: ignore
+                    )
+            update_adr(adr_path, title=title, status=STATUS_PROPOSED)
+        self.adr_repository.record_change(adr_path)
         logger.log("VERBOSE", "... done.")
 
         return adr_path
@@ -170,12 +364,57 @@ class AdrCore(object):
     # ACCEPT / REJECT
     ###########################################
     def accept_or_reject(self, file: str, status: str, toc: bool = False) -> Path:
-        processed_adr = self._apply_accept_or_reject_to_proposed_adr(Path(file), status)
+        return self.accept_or_reject_many([file], status, toc)[0]
+
+    def accept_or_reject_many(
+        self, files: Sequence[str], status: str, toc: bool = False
+    ) -> List[Path]:
+        """
+        Accept or reject proposed ADRs, given as files or glob patterns.
+
+        Consecutive ids are assigned to the ADRs in the order they are given, from
+        the highest id of the records directory (see `AdrRepository.max_number()`),
+        and the table of content is updated once for all of them. All the changes
+        are made in a single file transaction: if one fails, none is kept.
 
+        Returns: the processed ADRs
+
+        """
+        proposed_adrs = self._expand_adr_files(files)
+        adr_ids = self._get_next_adr_ids(len(proposed_adrs))
+        planned_paths = [
+            path
+            for proposed_adr, adr_id in zip(proposed_adrs, adr_ids)
+            for path in [proposed_adr, self._build_adr_filename(proposed_adr, adr_id)]
+        ]
         if toc:
-            self.generate_toc()
+            planned_paths.extend(self._toc_planned_paths())
+        with self._file_transaction(planned_paths):
+            processed_adrs = [
+                self._apply_accept_or_reject_to_proposed_adr(
+                    proposed_adr, status, adr_id
+                )
+                for proposed_adr, adr_id in zip(proposed_adrs, adr_ids)
+            ]
 
-        return processed_adr
+            if toc:
+                self.update_toc_entries(list(zip(proposed_adrs, processed_adrs)))
+
+        self.adr_repository.save_id_cache()
+        return processed_adrs
+
+    def _expand_adr_files(self, files: Sequence[str]) -> List[Path]:
+        paths: List[Path] = []
+        for file in files:
+            if glob.escape(file) == file or Path(file).exists():
+                matches = [Path(file)]
+            else:
+                matches = sorted(Path(match) for match in glob.glob(file))
+                if not matches:
+                    logger.error(f"Could not find a proposed ADR matching '{file}'.")
+                    raise PyadrNoProposedAdrError(file)
+            paths.extend(path for path in matches if path not in paths)
+        return paths
 
     def _adr_filename_format_correct(
         self, path: Path, status: str = None, check_title_format: bool = True
@@ -189,7 +428,7 @@ class AdrCore(object):
 
     def _resolve_status(self, path: Path, status: str = None) -> str:
         if status is None:
-            status = adr_status_from_file(path)
+            status = self.adr_repository.header(path).status
         return status
 
     def _resolve_regex_type(self, check_title_format: bool = True) -> str:
@@ -227,8 +466,11 @@ class AdrCore(object):
             raise PyadrTooManyProposedAdrError()
 
     def _get_next_adr_id(self) -> str:
+        return self._get_next_adr_ids(1)[0]
+
+    def _get_next_adr_ids(self, count: int) -> List[str]:
         try:
-            next_adr_id = calculate_next_adr_id(Path(self.config["adr"]["records-dir"]))
+            next_adr_ids = self.adr_repository.next_ids(count)
         except PyadrNoNumberedAdrError as e:
             logger.error(
                 "There should be at least one initial accepted/rejected ADR "
@@ -236,144 +478,465 @@ class AdrCore(object):
             )
             raise PyadrNoNumberedAdrError(e)
         else:
-            return next_adr_id
+            return next_adr_ids
 
     def _apply_accept_or_reject_to_proposed_adr(
-        self, proposed_adr: Path, status: str
+        self, proposed_adr: Path, status: str, adr_id: Optional[str] = None
     ) -> Path:
-        next_adr_id = self._get_next_adr_id()
-        processed_adr = self._sync_adr_filename(proposed_adr, next_adr_id)
+        if adr_id is None:
+            adr_id = self._get_next_adr_id()
+        processed_adr = self._sync_adr_filename(proposed_adr, adr_id)
         logger.info(f"Renamed ADR to: {processed_adr}")
 
         update_adr(processed_adr, status=status)
+        self.adr_repository.record_change(processed_adr)
         logger.info(f"Changed ADR status to: {status}")
 
         return processed_adr
 
-    def _sync_adr_filename(self, adr_path: Path, adr_id: str) -> Path:
-        renamed_path = self._build_adr_filename(adr_path, adr_id)
+    def _sync_adr_filename(
+        self, adr_path: Path, adr_id: str, header: Optional[AdrHeader] = None
+    ) -> Path:
+        if header is None:
+            header = self.adr_repository.header(adr_path)
+        renamed_path = self._build_adr_filename(adr_path, adr_id, header.slug)
         if adr_path != renamed_path:
             self._apply_filepath_update(adr_path, renamed_path)
+            self.adr_repository.record_rename(adr_path, renamed_path)
 
         return renamed_path
 
-    def _build_adr_filename(self, adr_path: Path, adr_id: str) -> Path:
-        title_slug = adr_title_slug_from_file(adr_path)
+    def _build_adr_filename(
+        self, adr_path: Path, adr_id: str, title_slug: Optional[str] = None
+    ) -> Path:
+        if title_slug is None:
+            title_slug = self.adr_repository.header(adr_path).slug
         renamed_path = adr_path.with_name(
             "-".join([adr_id, title_slug]) + adr_path.suffix
         )
         return renamed_path
 
     def _apply_filepath_update(self, path: Path, renamed_path: Path) -> None:
-        path.rename(renamed_path)
+        protect_files([path, renamed_path])
+        rename_file(path, renamed_path)
 
     ###########################################
     # GENERATE TOC
     ###########################################
-    def generate_toc(self, pre_checks: bool = True) -> Path:
+    def generate_toc(
+        self,
+        pre_checks: bool = True,
+        jobs: int = 1,
+        formats: Sequence[str] = (TOC_FORMAT_MARKDOWN,),
+        sharded: bool = False,
+    ) -> List[Path]:
+        """
+        Generate the table of content of the ADRs (`index.md`, `index.json`...).
+
+        The ADRs are parsed once, whatever the number of formats. A table of content
+        is not rewritten if its content is already up-to-date.
+
+        With a single format, the table of content is written as the ADRs are
+        parsed, by batches of `TOC_HEADERS_BATCH_SIZE`: besides the header cache,
+        memory use is then bounded by the batch size (and by the number of ADRs if
+        it is sharded, shards being built before being written). With several
+        formats, all the headers are held in memory to be rendered in each one.
+
+        Args:
+            pre_checks: if True, checks that the ADR directory exists
+            jobs: number of ADR files read in parallel
+            formats: formats of the tables of content to generate (see `TOC_FORMATS`)
+            sharded: if True, the markdown table of content links to one page per
+                     status and per range of ids (see `pyadr.toc_shards`)
+
+        Returns: the table of content files that were (re)written
+
+        """
         if pre_checks:
             self.verify_adr_dir_exists()
 
-        adr_paths = sorted(
-            Path(self.config["adr"]["records-dir"]).glob("[0-9][0-9][0-9][0-9]-*")
+        numbered_files = self.adr_repository.numbered_files
+        adr_headers: Iterable[AdrHeader]
+        if len(formats) == 1:
+            # a single pass over the headers: parse them as they are written
+            adr_headers = self.adr_repository.iter_headers(numbered_files, jobs)
+        else:
+            adr_headers = self.adr_repository.headers(numbered_files, jobs)
+
+        records_path = Path(self.config["adr"]["records-dir"])
+        toc_paths = []
+        for toc_format in formats:
+            if toc_format == TOC_FORMAT_MARKDOWN:
+                if sharded:
+                    toc_paths.extend(self._write_sharded_toc(adr_headers))
+                    continue
+            toc_paths.extend(
+                self._write_toc(
+                    TOC_RENDERERS[toc_format](records_path, adr_headers),
+                    self._toc_path(toc_format),
+                    f"{TOC_FORMATS[toc_format]} table of content",
+                )
+            )
+            if toc_format == TOC_FORMAT_MARKDOWN:
+                # only once written: ADRs of invalid format are found while writing
+                self._remove_toc_shards(load_shards_manifest(self._toc_manifest_path))
+        self.adr_repository.save_header_cache()
+        return toc_paths
+
+    def update_toc_entry(self, previous_path: Path, adr_path: Path) -> List[Path]:
+        """Same as `update_toc_entries()`, for a single ADR."""
+        return self.update_toc_entries([(previous_path, adr_path)])
+
+    def update_toc_entries(self, changes: Sequence[Tuple[Path, Path]]) -> List[Path]:
+        """
+        Update the entries of some ADRs in the table of content (`index.md`).
+
+        For each `(previous_path, adr_path)` change, the entry of `previous_path` (if
+        any) is removed and the one of `adr_path` inserted in its sorted position,
+        without reading the other ADRs. The table of content is fully generated
+        instead if it is missing or was edited by hand (and only its changed shards
+        if it is sharded).
+
+        Returns: the table of content files that were (re)written
+
+        """
+        toc_path = self._toc_path(TOC_FORMAT_MARKDOWN)
+        if file_exists(self._toc_manifest_path):
+            return self.generate_toc(sharded=True)
+
+        try:
+            with open_file(toc_path) as f:
+                adrs_by_status = parse_toc_content(f.read().decode("utf-8"))
+        except FileNotFoundError:
+            adrs_by_status = None
+
+        if adrs_by_status is None:
+            logger.log(
+                "VERBOSE",
+                f"Table of content '{toc_path}' missing or edited by hand, "
+                "generating it from scratch.",
+            )
+            return self.generate_toc()
+
+        for previous_path, adr_path in changes:
+            header = self.adr_repository.header(adr_path)
+            remove_toc_entry(adrs_by_status, previous_path.name)
+            remove_toc_entry(adrs_by_status, adr_path.name)
+            if self.adr_repository.is_numbered(adr_path):
+                insert_toc_entry(
+                    adrs_by_status,
+                    header.status,
+                    build_toc_entry(header, adr_path.name),
+                )
+
+        return self._write_toc(
+            build_toc_content_from_adrs_by_status(adrs_by_status),
+            toc_path,
+            "Markdown table of content",
+        )
+
+    def _write_sharded_toc(self, adr_headers: Iterable[AdrHeader]) -> List[Path]:
+        records_path = Path(self.config["adr"]["records-dir"])
+        manifest_path = self._toc_manifest_path
+        previous_digests = load_shards_manifest(manifest_path)
+        shards = shard_adr_headers(adr_headers)
+        make_directory(manifest_path.parent, exist_ok=True)
+
+        toc_paths = []
+        digests = {}
+        for name, shard in shards.items():
+            digests[name] = shard.digest(records_path)
+            shard_path = manifest_path.with_name(name)
+            if previous_digests.get(name) == digests[name] and file_exists(shard_path):
+                continue
+            toc_paths.extend(
+                self._write_toc(
+                    shard.iter_content(records_path),
+                    shard_path,
+                    "Markdown table of content shard",
+                )
+            )
+        self._remove_toc_shards(
+            [name for name in previous_digests if name not in shards],
+            keep_manifest=True,
+        )
+
+        toc_paths.extend(
+            self._write_toc(
+                iter_sharded_toc_index(shards.values()),
+                self._toc_path(TOC_FORMAT_MARKDOWN),
+                "Markdown table of content",
+            )
         )
+        toc_paths.extend(
+            self._write_toc(
+                iter_shards_manifest(digests),
+                manifest_path,
+                "Manifest of the table of content shards",
+            )
+        )
+        return toc_paths
+
+    def _remove_toc_shards(
+        self, shard_names: Iterable[str], keep_manifest: bool = False
+    ) -> None:
+        shard_paths = [self._toc_manifest_path.with_name(name) for name in shard_names]
+        if not keep_manifest:
+            shard_paths.append(self._toc_manifest_path)
+        for shard_path in shard_paths:
+            if file_exists(shard_path):
+                self._remove_toc_file(shard_path)
+                logger.info(f"Removed table of content shard '{shard_path}'")
+        if not keep_manifest:
+            try:
+                remove_empty_directory(self._toc_manifest_path.parent)
+            except OSError:
+                # not existing or not empty
+                pass
+
+    def _remove_toc_file(self, toc_path: Path) -> None:
+        protect_files([toc_path])
+        remove_file(toc_path)
+
+    def _toc_planned_paths(self) -> List[Path]:
+        """Files of the markdown table of content, as known before updating it."""
+        manifest_path = self._toc_manifest_path
+        return [
+            self._toc_path(TOC_FORMAT_MARKDOWN),
+            manifest_path,
+            *(
+                manifest_path.with_name(name)
+                for name in load_shards_manifest(manifest_path)
+            ),
+        ]
 
-        adrs_by_status = extract_adrs_by_status(
-            Path(self.config["adr"]["records-dir"]), adr_paths
+    @property
+    def _toc_manifest_path(self) -> Path:
+        return Path(
+            self.config["adr"]["records-dir"],
+            TOC_SHARDS_DIR_NAME,
+            TOC_SHARDS_MANIFEST_FILE_NAME,
         )
 
-        toc_content = build_toc_content_from_adrs_by_status(adrs_by_status)
+    def _toc_path(self, toc_format: str) -> Path:
+        return Path(self.config["adr"]["records-dir"], f"{TOC_FILE_STEM}.{toc_format}")
 
-        toc_path = Path(self.config["adr"]["records-dir"], "index.md")
-        with toc_path.open("w") as f:
-            f.writelines(toc_content)
+    def _write_toc(
+        self, toc_content: Iterable[str], toc_path: Path, description: str
+    ) -> List[Path]:
+        if not write_lines_if_changed(toc_path, toc_content):
+            logger.info(f"{description} already up-to-date in '{toc_path}'")
+            return []
 
-        logger.info(f"Markdown table of content generated in '{toc_path}'")
+        logger.info(f"{description} generated in '{toc_path}'")
 
-        return toc_path
+        return [toc_path]
 
     ###########################################
     # HELPER FUNCTIONS
     ###########################################
     def print_title_slug(self, file: str) -> None:
-        logger.info(adr_title_slug_from_file(Path(file)))
+        logger.info(self.adr_repository.header(Path(file)).slug)
 
     def print_title_lowercase(self, file: str) -> None:
-        logger.info(adr_title_lowercase_from_file(Path(file)))
+        logger.info(self.adr_repository.header(Path(file)).title.lower())
 
     def sync_filename(self, file: str) -> None:
         path = Path(file)
+        header = self.adr_repository.header(path)
 
-        self._verify_adr_filename_format(path, check_title_format=False)
+        self._verify_adr_filename_format(path, header.status, check_title_format=False)
 
-        renamed_path = self._sync_adr_filename(path, path.stem.split("-", 1)[0])
+        renamed_path = self._sync_adr_filename(path, header.id, header)
 
         if path != renamed_path:
             logger.info(f"File renamed to '{str(renamed_path)}'.")
         else:
             logger.info("File name already up-to-date.")
 
+    def sync_all_filenames(self) -> List[Path]:
+        """
+        Sync the filenames of all the ADRs of the records directory with their titles.
+
+        All the renames are computed from a single scan of the records directory, and
+        checked for conflicts (two ADRs renamed to the same filename, or to the one
+        of an existing file) before any file is renamed.
+
+        Returns: the renamed ADRs
+
+        """
+        self.verify_adr_dir_exists()
+
+        adr_files = self.adr_repository.adr_files
+        renames = []
+        for path, header in zip(adr_files, self.adr_repository.headers(adr_files)):
+            self._verify_adr_filename_format(
+                path, header.status, check_title_format=False
+            )
+            renamed_path = self._build_adr_filename(path, header.id, header.slug)
+            if path != renamed_path:
+                renames.append((path, renamed_path))
+
+        self._verify_no_rename_conflict(renames, "after their title")
+
+        with self._file_transaction([p for rename in renames for p in rename]):
+            for path, renamed_path in renames:
+                self._apply_filepath_update(path, renamed_path)
+                self.adr_repository.record_rename(path, renamed_path)
+                logger.info(f"File '{path}' renamed to '{renamed_path}'.")
+
+        if renames:
+            logger.info(f"{len(renames)} file(s) renamed.")
+        else:
+            logger.info("File names already up-to-date.")
+
+        return [renamed_path for _, renamed_path in renames]
+
+    def renumber_adrs(self, toc: bool = False) -> List[Path]:
+        """
+        Give canonical and unique ids to the numbered ADRs of the records directory.
+
+        Ids are padded to 4 digits (e.g. `012-` and `00012-` become `0012-`). When
+        several ADRs have the same number, the one whose id is already canonical
+        (else the first one) keeps it, and the others get new ids following the
+        highest one. The links to the renamed ADRs are then updated in all the ADRs.
+
+        Returns: the renamed ADRs
+
+        """
+        self.verify_adr_dir_exists()
+
+        by_number = self.adr_repository.by_number
+        next_number = max(by_number, default=-1) + 1
+        renames = []
+        for number, paths in sorted(by_number.items()):
+            paths = sorted(paths, key=lambda p: (not self._has_canonical_id(p), p.name))
+            adr_numbers = [number] + list(
+                range(next_number, next_number + len(paths) - 1)
+            )
+            next_number += len(paths) - 1
+            for path, adr_number in zip(paths, adr_numbers):
+                renamed_path = path.with_name(
+                    "-".join([format_adr_id(adr_number), path.name.split("-", 1)[1]])
+                )
+                if renamed_path != path:
+                    renames.append((path, renamed_path))
+
+        self._verify_no_rename_conflict(renames, "to canonical and unique ids")
+
+        planned_paths = [p for rename in renames for p in rename]
+        if toc:
+            planned_paths.extend(self._toc_planned_paths())
+        with self._file_transaction(planned_paths):
+            for path, renamed_path in renames:
+                self._apply_filepath_update(path, renamed_path)
+                self.adr_repository.record_rename(path, renamed_path)
+                logger.info(f"File '{path}' renamed to '{renamed_path}'.")
+
+            if renames:
+                renamed_files = {path.name: renamed.name for path, renamed in renames}
+                links_regex = adr_links_regex(renamed_files)
+                for path in self.adr_repository.adr_files:
+                    if self._update_adr_links(path, links_regex, renamed_files):
+                        logger.info(f"Links to renumbered ADRs updated in '{path}'.")
+                logger.info(f"{len(renames)} file(s) renumbered.")
+            else:
+                logger.info("ADR ids already canonical and unique.")
+
+            if toc:
+                self.generate_toc(pre_checks=False)
+
+        return [renamed_path for _, renamed_path in renames]
+
+    @staticmethod
+    def _has_canonical_id(path: Path) -> bool:
+        adr_id = path.name.split("-", 1)[0]
+        return adr_id == format_adr_id(int(adr_id))
+
+    def _update_adr_links(
+        self, path: Path, links_regex: Pattern[str], renamed_files: Dict[str, str]
+    ) -> bool:
+        if not update_adr_links(path, links_regex, renamed_files):
+            return False
+        self.adr_repository.record_change(path)
+        return True
+
+    def _verify_no_rename_conflict(
+        self, renames: Sequence[Tuple[Path, Path]], description: str
+    ) -> None:
+        existing_paths = set(self.adr_repository.paths)
+        renamed_paths: Dict[Path, List[Path]] = {}
+        for path, renamed_path in renames:
+            renamed_paths.setdefault(renamed_path, []).append(path)
+
+        conflicts = [
+            (renamed_path, paths)
+            for renamed_path, paths in renamed_paths.items()
+            if len(paths) > 1 or renamed_path in existing_paths
+        ]
+        if conflicts:
+            logger.error(f"Some ADRs cannot be renamed {description}:")
+            for renamed_path, paths in conflicts:
+                sources = ", ".join(f"'{path}'" for path in paths)
+                if renamed_path in existing_paths:
+                    sources += " (file already exists)"
+                logger.error(f"    => '{renamed_path}' <= {sources}")
+            raise PyadrAdrRenameConflictError(
+                [str(renamed_path) for renamed_path, _ in conflicts]
+            )
+
     ###########################################
     # CHECK ADR REPO
     ###########################################
-    def check_adr_repo(self, check_no_proposed: bool = True) -> None:
-        at_least_one_check_failed = self._check_adr_repo(check_no_proposed)
+    def check_adr_repo(self, check_no_proposed: bool = True, jobs: int = 1) -> None:
+        at_least_one_check_failed = self._check_adr_repo(check_no_proposed, jobs)
 
         if at_least_one_check_failed:
             raise PyadrAdrRepoChecksFailedError
         else:
             logger.info("All checks passed.")
 
-    def _check_adr_repo(self, check_no_proposed: bool = False) -> bool:
+    def _check_adr_repo(self, check_no_proposed: bool = False, jobs: int = 1) -> bool:
         at_least_one_check_failed = False
 
-        adr_files = self._list_adr_files()
+        adr_files = self.adr_repository.adr_files
 
         try:
-            self._check_adr_numbers_unique(adr_files)
+            self._check_adr_numbers_unique()
         except PyadrSomeAdrIdsNotUniqueError:
             at_least_one_check_failed = True
 
-        adrs_with_invalid_content_format = (
-            self._filter_adrs_with_invalid_content_format(adr_files)  # noqa
-        )
+        (
+            adr_headers,
+            adrs_with_invalid_content_format,
+        ) = self._parse_adrs_checking_content_format(adr_files, jobs)
         if adrs_with_invalid_content_format:
             at_least_one_check_failed = True
 
-        adr_files_checked_for_content_format = [
-            file for file in adr_files if file not in adrs_with_invalid_content_format
-        ]
-
         try:
             self._verify_adr_filenames(
-                adr_files_checked_for_content_format,
+                adr_headers,
                 status=STATUS_ANY_WITH_ID,
                 check_title_format=True,
+                jobs=jobs,
             )
         except PyadrSomeAdrFilenamesIncorrectError:
             at_least_one_check_failed = True
 
         if check_no_proposed:
             try:
-                self._check_no_adr_is_proposed(adr_files_checked_for_content_format)
+                self._check_no_adr_is_proposed()
             except PyadrSomeAdrStatusesAreProposedError:
                 at_least_one_check_failed = True
 
+        self.adr_repository.save_header_cache()
+
         return at_least_one_check_failed
 
-    def _check_adr_numbers_unique(self, adr_files: List[Path]) -> None:
-        rex = re.compile(VALID_ADR_FILENAME_WITH_ID_REGEX)
-        adrs_with_valid_filenames = [file for file in adr_files if rex.match(file.name)]
-        unique_numbers = {
-            file.stem.split("-", 1)[0] for file in adrs_with_valid_filenames
-        }
-        adrs_aggregated_by_number = [
-            [file for file in adrs_with_valid_filenames if file.stem.startswith(number)]
-            for number in unique_numbers
+    def _check_adr_numbers_unique(self) -> None:
+        adrs_with_duplicate_number = [
+            files for files in self.adr_repository.by_number.values() if len(files) > 1
         ]
-        adrs_with_duplicate_number = list(
-            filter(lambda x: len(x) > 1, adrs_aggregated_by_number)
-        )
         if adrs_with_duplicate_number:
             logger.error(
                 "ADRs must have a unique number, "
@@ -383,15 +946,17 @@ class AdrCore(object):
                 logger.error(f"  => {[str(file) for file in sorted(files)]}.")
             raise PyadrSomeAdrIdsNotUniqueError
 
-    def _filter_adrs_with_invalid_content_format(
-        self, adr_files: List[Path]
-    ) -> List[Path]:
+    def _parse_adrs_checking_content_format(
+        self, adr_files: List[Path], jobs: int = 1
+    ) -> Tuple[List[AdrHeader], List[Path]]:
+        adr_headers = []
         adr_files_with_invalid_content_format = []
-        for adr in adr_files:
-            try:
-                adr_title_status_and_date_from_file(adr)
-            except PyadrAdrFormatError:
+        results = self.adr_repository.parse(adr_files, jobs)
+        for adr, result in zip(adr_files, results):
+            if isinstance(result, PyadrAdrFormatError):
                 adr_files_with_invalid_content_format.append(adr)
+            else:
+                adr_headers.append(result)
 
         if adr_files_with_invalid_content_format:
             logger.error(
@@ -401,20 +966,12 @@ class AdrCore(object):
             )
             for file in sorted(adr_files_with_invalid_content_format):
                 logger.error(f"  => '{str(file)}'.")
-        return adr_files_with_invalid_content_format
-
-    def _check_no_adr_is_proposed(self, adr_files: List[Path]) -> None:
-        def adr_has_status(adr_path: Path, target_status: str) -> bool:
-            (
-                _,
-                (status, _),
-                _,
-            ) = adr_title_status_and_date_from_file(adr_path)
-
-            return status == target_status
+        return adr_headers, adr_files_with_invalid_content_format
 
+    def _check_no_adr_is_proposed(self) -> None:
         adrs_with_status_proposed = [
-            file for file in adr_files if adr_has_status(file, STATUS_PROPOSED)
+            header.path
+            for header in self.adr_repository.by_status.get(STATUS_PROPOSED, [])
         ]
 
         if adrs_with_status_proposed:
@@ -425,21 +982,24 @@ class AdrCore(object):
 
     def _verify_adr_filename(
         self, adr_path: Path, status: str = None, check_title_format: bool = True
-    ) -> None:
+    ) -> AdrHeader:
+        header = self.adr_repository.header(adr_path)
         error_messages = self._verify_adr_filenames(
-            [adr_path], status, check_title_format, log_and_raise=False
+            [header], status, check_title_format, log_and_raise=False
         )
         if error_messages:
             for message in error_messages:
                 logger.error(message)
             raise PyadrAdrFilenameIncorrectError(adr_path)
+        return header
 
     def _verify_adr_filenames(
         self,
-        adr_files: List[Path],
+        adr_headers: List[AdrHeader],
         status: str = None,
         check_title_format: bool = True,
         log_and_raise: bool = True,
+        jobs: int = 1,
     ) -> Optional[List[str]]:
         """
         Verify a list of ADR filenames to make sur that:
@@ -448,62 +1008,69 @@ class AdrCore(object):
         * the title portion of the filename is synched with the title of the ADR
 
         Args:
-            adr_files: list of ADR files
+            adr_headers: list of parsed headers of the ADR files
             status: either `None` or a valid status ;
                     if `None` and the list contains only one file, then status will be
-                    fetched from the file content ;
+                    taken from its header ;
                     if `None` and the list contains more than one file, then status will
                     be set to `STATUS_ANY_WITH_ID`
             check_title_format: if True, will check the format of the title portion of
                                 the ADR file
             log_and_raise: if True, will log errors found on filenames and will raise
                            an error
+            jobs: number of processes the checks are sharded across (if there are
+                  enough ADRs to make it worth it)
 
         Returns: an optional list of error messages
 
         """
-
-        def title_slug_correct_and_title_slug(file: Path) -> Tuple[bool, str]:
-            title_slug = adr_title_slug_from_file(file)
-
-            try:
-                title_in_filename = file.stem.split("-", 1)[1]
-            except IndexError:
-                title_in_filename = ""
-
-            return title_in_filename != title_slug, title_slug
-
-        if len(adr_files) == 1:
-            status = self._resolve_status(adr_files[0], status)
-        else:
-            if status is None:
+        if status is None:
+            if len(adr_headers) == 1:
+                status = adr_headers[0].status
+            else:
                 status = STATUS_ANY_WITH_ID
         full_or_skip_title = self._resolve_regex_type(check_title_format)
 
-        filenames_correctness_status = {}
-        for file in sorted(adr_files):
-            filenames_correctness_status[file] = {
-                "format_not_valid": not self._adr_filename_format_correct(
-                    file, status, check_title_format
-                ),
-                "with_incorrect_title_slug": title_slug_correct_and_title_slug(file),
-            }
+        records = [header.as_tuple() for header in adr_headers]
+        filename_regex = FILENAME_REGEXES[status][full_or_skip_title]
+        if jobs > 1 and len(records) >= PARALLEL_CHECKS_MIN_ADRS:
+            shard_size = -(-len(records) // (jobs * PARALLEL_CHECKS_SHARDS_PER_JOB))
+            shards = [
+                records[i : i + shard_size] for i in range(0, len(records), shard_size)
+            ]
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(
+                    executor.map(
+                        _filename_errors, shards, [filename_regex] * len(shards)
+                    )
+                )
+        else:
+            results = [_filename_errors(records, filename_regex)]
+
+        errors = []
+        slugs = []
+        for shard_errors, shard_slugs in results:
+            errors.extend(shard_errors)
+            slugs.extend(shard_slugs)
+        # keep the slugs computed by the workers, so that they get cached
+        for header, slug in zip(adr_headers, slugs):
+            header.slug = slug
 
         error_messages = []
-        for file, error_status in filenames_correctness_status.items():
-            if error_status["format_not_valid"]:
+        for file, error, title_slug in errors:
+            if error == FILENAME_ERROR_FORMAT_NOT_VALID:
                 error_messages.append(
-                    f"  => '{str(file)}' does not start with "
+                    f"  => '{file}' does not start with "
                     f"'{REGEX_ERROR_MESSAGES[status]['id_prefix']}'."
                 )
-            if error_status["with_incorrect_title_slug"][0]:  # type: ignore
+            else:
                 error_messages.append(
-                    f"  => '{str(file)}' does not have the correct title slug "  # type: ignore  # noqa
-                    f"('{error_status['with_incorrect_title_slug'][1]}')."
-                    # type: ignore  # noqa
+                    f"  => '{file}' does not have the correct title slug "
+                    f"('{title_slug}')."
                 )
 
         if error_messages:
+            # sorted, whatever the order of the headers and of the shards
             error_messages.sort()
             error_messages.insert(
                 0, REGEX_ERROR_MESSAGES[status][full_or_skip_title] + ", but:"
@@ -517,14 +1084,6 @@ class AdrCore(object):
         else:
             return None
 
-    def _list_adr_files(self) -> List[Path]:
-        adr_files = [
-            file
-            for file in Path(self.config["adr"]["records-dir"]).glob("*.md")
-            if file.name not in ["template.md", "index.md"]
-        ]
-        return adr_files
-
     ###########################################
     # SHARED FUNC
     ###########################################
@@ -532,7 +1091,7 @@ class AdrCore(object):
         adr_repo_path = Path(self.config["adr"]["records-dir"])
 
         logger.info(f"Verifying adr repo directory '{adr_repo_path}' exists... ")
-        if not adr_repo_path.exists():
+        if not self.adr_repository.exists():
             logger.error(
                 f"Directory '{adr_repo_path}/' does not exist. "
                 "Initialise your ADR repo first."
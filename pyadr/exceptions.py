@@ -103,3 +103,31 @@ class PyadrAdrFilenameFormatError(PyadrError):
 
 class PyadrStatusIncompatibleWithReviewRequestError(PyadrError):
     """Cannot create a review request branch with status of the given ADR"""
+
+
+class PyadrInvalidJobsOptionError(PyadrError):
+    """Number of jobs must be a positive integer"""
+
+
+class PyadrInvalidTocFormatError(PyadrError):
+    """Table of content format not supported"""
+
+
+class PyadrSyncFilenameArgumentsError(PyadrError):
+    """Either an ADR file or the option to sync all ADRs must be given"""
+
+
+class PyadrAdrRenameConflictError(PyadrError):
+    """Some ADRs cannot be renamed without overwriting a file or each other"""
+
+
+class PyadrInvalidLockTimeoutError(PyadrError):
+    """Repository lock timeout must be a non-negative number of seconds"""
+
+
+class PyadrRepositoryLockTimeoutError(PyadrError):
+    """Repository lock held by another process for too long"""
+
+
+class PyadrInvalidPlanFormatError(PyadrError):
+    """Format of the plan of changes not supported"""
@@ -1,23 +1,536 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import (
+    IO,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Pattern,
+    Set,
+    Union,
+)
 
-from pyadr.content_utils import update_adr_content_title_and_status
-from pyadr.exceptions import PyadrNoNumberedAdrError
+from loguru import logger
 
+from pyadr.const import (
+    ADR_ID_REGEX_WITH_SEPARATOR,
+    COPY_BUFFER_SIZE,
+    DEFAULT_RUNTIME_DIR_NAME,
+    FILE_TRANSACTION_FORMAT_VERSION,
+    RUNTIME_DIR_NAME,
+)
+from pyadr.content_utils import (
+    adr_header_from_stream,
+    format_adr_id,
+    update_adr_content_title_and_status,
+)
+from pyadr.exceptions import PyadrAdrFormatError, PyadrNoNumberedAdrError
+from pyadr.plan import current_plan, open_file
 
-def update_adr(file: Path, title: str = None, status: str = None) -> None:
-    with file.open() as f:
-        updated_content = update_adr_content_title_and_status(
-            f.read(), title=title, status=status
+
+class _AtomicWriteBatch(object):
+    def __init__(self, fsync: bool):
+        self.fsync = fsync
+        self.files: Set[Path] = set()
+        self.directories: Set[Path] = set()
+
+
+_current_batch: Optional[_AtomicWriteBatch] = None
+
+
+@contextmanager
+def atomic_write_batch(fsync: bool = True) -> Iterator[None]:
+    """
+    Group the atomic writes of a command, so that they are synced to disk only once.
+
+    Within the batch, each file is still replaced atomically as soon as it is
+    written (so that it can be read back), but nothing is fsynced until the end of
+    the batch, where each file written (and each of their directories) is fsynced
+    once, however many times it was written. Nested batches join the outermost one.
+    """
+    global _current_batch
+    if _current_batch is not None:
+        yield
+        return
+
+    batch = _current_batch = _AtomicWriteBatch(fsync)
+    try:
+        yield
+    finally:
+        _current_batch = None
+        if batch.fsync:
+            for path in batch.files:
+                _fsync_file(path)
+            for directory in batch.directories:
+                _fsync_directory(directory)
+
+
+class _FileTransaction(object):
+    """Undo journal of the files changed within a `file_transaction()`."""
+
+    def __init__(self, journal_path: Path):
+        self.journal_path = journal_path
+        self.backup_dir = _transaction_backup_dir(journal_path)
+        self.backups: Dict[str, Optional[str]] = {}
+        self.journal: Optional[IO[str]] = None
+
+    def protect(self, paths: Iterable[Path]) -> None:
+        entries = []
+        for path in paths:
+            key = os.path.abspath(path)
+            if key in self.backups or os.path.isdir(key):
+                continue
+            if self.journal is None:
+                self._start()
+            backup = None
+            if os.path.lexists(key):
+                backup = str(len(self.backups))
+                _link_or_copy(key, self.backup_dir / backup)
+            self.backups[key] = backup
+            entries.append([key, backup])
+        if not entries:
+            return
+
+        # backups and journal entries must be on disk before any file is changed
+        _fsync_directory(self.backup_dir)
+        for entry in entries:
+            self.journal.write(json.dumps(entry) + "\n")  # type: ignore[union-attr]
+        self.journal.flush()  # type: ignore[union-attr]
+        os.fsync(self.journal.fileno())  # type: ignore[union-attr]
+
+    def _start(self) -> None:
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.journal = self.journal_path.open("w")
+        self.journal.write(
+            json.dumps({"version": FILE_TRANSACTION_FORMAT_VERSION}) + "\n"
         )
-    with file.open("w") as f:
-        f.write(updated_content)
+        _fsync_directory(self.journal_path.parent)
+
+    def commit(self) -> None:
+        if self.journal is None:
+            return
+        # files written are already synced by the batch of the transaction, but not
+        # the renames, removals or files changed by other means (e.g. the git index)
+        _fsync_changed_paths(self.backups)
+        self.journal.close()
+        shutil.rmtree(self.backup_dir, ignore_errors=True)
+        self.journal_path.unlink()
+        _fsync_directory(self.journal_path.parent)
+
+    def rollback(self) -> None:
+        if self.journal is None:
+            return
+        self.journal.close()
+        _rollback_files(self.journal_path, self.backups)
+
+
+_current_transaction: Optional[_FileTransaction] = None
+
+
+@contextmanager
+def file_transaction(journal_path: Path, paths: Iterable[Path] = ()) -> Iterator[None]:
+    """
+    Apply the file changes of a multi-file operation all at once, or not at all.
+
+    Before a file is first written, renamed, created or removed within the
+    transaction (see `protect_files()`), its original state is recorded in an undo
+    journal: a hard link to the file (a copy where hard links are not supported), or
+    its absence. As files are only ever replaced (see `atomic_write()`) or renamed,
+    the original content stays in the linked inode. The files known beforehand are
+    given as `paths`, so that the journal is synced once for all of them.
+
+    If the operation fails, all the recorded files are restored. If the process is
+    killed, the journal is left behind, to be rolled back by
+    `rollback_interrupted_transaction()`. The transaction is a batch of atomic
+    writes (see `atomic_write_batch()`): changes are synced to disk at once, before
+    the journal is removed. Nested transactions join the outermost one.
+
+    In dry-run mode (see `planned_changes()`), nothing is written to disk: there is
+    nothing to protect.
+    """
+    global _current_transaction
+    if current_plan() is not None:
+        yield
+        return
+    if _current_transaction is not None:
+        _current_transaction.protect(paths)
+        yield
+        return
+
+    rollback_interrupted_transaction(journal_path)
+    transaction = _current_transaction = _FileTransaction(journal_path)
+    try:
+        with atomic_write_batch():
+            transaction.protect(paths)
+            yield
+    except BaseException:
+        _current_transaction = None
+        transaction.rollback()
+        raise
+    _current_transaction = None
+    transaction.commit()
+
+
+def protect_files(paths: Iterable[Path]) -> None:
+    """Record the original state of files about to change in the current transaction."""
+    if _current_transaction is not None:
+        _current_transaction.protect(paths)
+
+
+def rollback_interrupted_transaction(journal_path: Path) -> bool:
+    """
+    Restore the files changed by a transaction whose process was killed.
+
+    Returns: True if there was a transaction to roll back
+
+    """
+    try:
+        with journal_path.open() as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        # backups taken before the journal was created, if any, are of no use
+        shutil.rmtree(_transaction_backup_dir(journal_path), ignore_errors=True)
+        return False
+
+    logger.warning(
+        f"Rolling back the changes of an interrupted command "
+        f"(journal '{journal_path}')..."
+    )
+    backups: Dict[str, Optional[str]] = {}
+    for line in lines[1:]:
+        try:
+            path, backup = json.loads(line)
+        except ValueError:
+            # entry partially written when the process was killed: the change it
+            # was recorded for was not made
+            break
+        backups[path] = backup
+    _rollback_files(journal_path, backups)
+    logger.log("VERBOSE", "... done.")
+    return True
+
+
+def _rollback_files(journal_path: Path, backups: Dict[str, Optional[str]]) -> None:
+    # each file is restored independently: an interrupted rollback can be resumed
+    backup_dir = _transaction_backup_dir(journal_path)
+    for path, backup in backups.items():
+        if backup is None:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        elif os.path.lexists(backup_dir / backup):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(backup_dir / backup, path)
+    _fsync_changed_paths(backups)
+    shutil.rmtree(backup_dir, ignore_errors=True)
+    journal_path.unlink()
+    _fsync_directory(journal_path.parent)
+
+
+def _transaction_backup_dir(journal_path: Path) -> Path:
+    return journal_path.with_name(journal_path.name + ".d")
+
+
+def _link_or_copy(path: str, backup_path: Path) -> None:
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        # no hard links on this file system (or across file systems)
+        shutil.copy2(path, backup_path)
+        with backup_path.open("rb") as f:
+            os.fsync(f.fileno())
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "w", fsync: bool = True) -> Iterator[IO]:
+    """
+    Write a file atomically.
+
+    Content is written to a temporary file in the same directory, which replaces
+    `path` (keeping its mode) only once fully written: `path` is never left
+    truncated, even if the process is killed while writing.
+
+    Args:
+        path: file to write
+        mode: `"w"` or `"wb"`
+        fsync: if True, the content is synced to disk before replacing `path` (or at
+               the end of the current `atomic_write_batch()`)
+
+    In dry-run mode (see `planned_changes()`), content is written to a buffer, and
+    recorded in the plan instead of replacing `path`.
+    """
+    plan = current_plan()
+    if plan is not None:
+        buffer = io.BytesIO()
+        if "b" in mode:
+            yield buffer
+        else:
+            text = io.TextIOWrapper(buffer, encoding="utf-8")
+            yield text
+            text.detach()
+        plan.write(path, buffer.getvalue())
+        return
+
+    protect_files([path])
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            if fsync and _current_batch is None:
+                os.fsync(f.fileno())
+        try:
+            shutil.copymode(path, tmp_name)
+        except FileNotFoundError:
+            os.chmod(tmp_name, 0o666 & ~_umask())
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+    if fsync:
+        if _current_batch is None:
+            _fsync_directory(path.parent)
+        else:
+            _current_batch.files.add(path)
+            _current_batch.directories.add(path.parent)
+
+
+class _UnchangedContentError(Exception):
+    """Aborts an `atomic_write()` whose content is the same as the existing file."""
+
+
+def write_lines_if_changed(
+    path: Path, lines: Iterable[str], fsync: bool = True
+) -> bool:
+    """
+    Stream lines to a file atomically, unless it already has the exact same content.
+
+    Lines are encoded and written (through a buffer) to the temporary file of
+    `atomic_write()` as they come, so that the content is never held in memory as a
+    whole. The temporary file is discarded if the content did not change.
+
+    Returns: True if the file was written
+
+    """
+    try:
+        with open_file(path) as f:
+            existing_digest: Optional[bytes] = _digest(f)
+    except FileNotFoundError:
+        existing_digest = None
+
+    digest = hashlib.sha256()
+    try:
+        with atomic_write(path, "wb", fsync=fsync) as f:
+            for line in lines:
+                data = line.encode("utf-8")
+                digest.update(data)
+                f.write(data)
+            if digest.digest() == existing_digest:
+                raise _UnchangedContentError()
+    except _UnchangedContentError:
+        return False
+    return True
+
+
+def _digest(stream: BinaryIO) -> bytes:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(COPY_BUFFER_SIZE), b""):
+        digest.update(chunk)
+    return digest.digest()
+
+
+def _umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def _fsync_changed_paths(paths: Iterable[str]) -> None:
+    """Sync changed files, and the directories listing them, to disk."""
+    directories = set()
+    for path in paths:
+        if os.path.isfile(path):
+            _fsync_file(path)
+        directories.add(os.path.dirname(path))
+    for directory in directories:
+        _fsync_directory(Path(directory))
+
+
+def _fsync_file(path: Union[str, Path]) -> None:
+    try:
+        # a descriptor opened for writing is needed to sync a file on Windows
+        fd = os.open(path, os.O_RDWR if os.name == "nt" else os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # not supported on this platform/file system
+        pass
+    finally:
+        os.close(fd)
+
+
+def runtime_dir(repo_path: Path) -> Path:
+    """
+    Directory of the runtime files of a repository (lock, caches, journal).
+
+    In a git repository, it is kept in the git directory (`.git/pyadr`), out of the
+    worktree. Otherwise, it is kept next to the config file (`.pyadr`), see
+    `make_runtime_dir()`.
+    """
+    git_path = repo_path / ".git"
+    if git_path.is_file():
+        # linked worktree or submodule: file pointing to the git directory
+        try:
+            content = git_path.read_text()
+        except OSError:
+            content = ""
+        if content.startswith("gitdir:"):
+            git_path = repo_path / content[len("gitdir:") :].strip()
+    if git_path.is_dir():
+        return git_path / RUNTIME_DIR_NAME
+    return repo_path / DEFAULT_RUNTIME_DIR_NAME
+
+
+def make_runtime_dir(path: Path) -> None:
+    """Create the directory of runtime files, ignored by git wherever it is."""
+    path.mkdir(parents=True, exist_ok=True)
+    gitignore_path = path / ".gitignore"
+    if not gitignore_path.exists():
+        gitignore_path.write_text("*\n")
+
+
+def update_adr(file: Path, title: str = None, status: str = None) -> None:
+    """
+    Update the title and/or status (and the date) of an ADR.
+
+    Only the header of the ADR is parsed and rewritten: the body is streamed as is
+    into a temporary file, which then replaces the ADR (see `atomic_write()`).
+    Memory use does not depend on the size of the ADR.
+    """
+    with open_file(file) as f:
+        try:
+            header = adr_header_from_stream(f, file)
+        except PyadrAdrFormatError:
+            # no complete header to delimit: update the whole content
+            f.seek(0)
+            content = f.read().decode("utf-8")
+            header_end = len(content.encode("utf-8"))
+            updated_header = update_adr_content_title_and_status(
+                content, title=title, status=status
+            )
+        else:
+            header_end = header.header_end
+            f.seek(0)
+            updated_header = update_adr_content_title_and_status(
+                f.read(header_end).decode("utf-8"), title=title, status=status
+            )
+
+        with atomic_write(file, "wb") as tmp:
+            tmp.write(updated_header.encode("utf-8"))
+            tmp.flush()
+            _copy_from_offset(f, tmp, header_end)
+
+
+def _copy_from_offset(src: BinaryIO, dst: IO, offset: int) -> None:
+    """Copy `src` from `offset` to its end at the current position of `dst`."""
+    try:
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        while True:
+            sent = os.sendfile(dst_fd, src_fd, offset, COPY_BUFFER_SIZE)
+            if sent == 0:
+                return
+            offset += sent
+    except (AttributeError, OSError):
+        # no `sendfile` on this platform or for these files: buffered copy
+        src.seek(offset)
+        dst.seek(0, os.SEEK_END)
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+def adr_links_regex(file_names: Iterable[str]) -> Pattern[str]:
+    """
+    Regex matching the relative markdown links to some files of the same directory.
+
+    Links are matched with or without a leading `./` and an anchor (e.g.
+    `](0012-title.md)`, `](./0012-title.md#context)`). The linked file name is in the
+    `name` group.
+    """
+    names = sorted(file_names, key=len, reverse=True)
+    return re.compile(
+        r"(?<=\]\()(?P<prefix>\./)?(?P<name>"
+        + "|".join(re.escape(name) for name in names)
+        + r")(?=[)#])"
+    )
+
+
+def update_adr_links(
+    file: Path, links_regex: Pattern[str], renamed_files: Dict[str, str]
+) -> bool:
+    """
+    Replace the links to renamed files in an ADR.
+
+    Args:
+        file: ADR to update
+        links_regex: regex matching the links to update (see `adr_links_regex()`)
+        renamed_files: new name of each renamed file, by its previous name
+
+    Returns: True if the ADR was changed
+
+    """
+    with open_file(file) as f:
+        content = f.read().decode("utf-8")
+    updated_content = links_regex.sub(
+        lambda match: (match.group("prefix") or "")
+        + renamed_files[match.group("name")],
+        content,
+    )
+    if updated_content == content:
+        return False
+
+    with atomic_write(file, "wb") as f:
+        f.write(updated_content.encode("utf-8"))
+    return True
+
+
+def max_adr_number(adr_path: Path) -> Optional[int]:
+    """Highest number of the numbered ADRs of a directory, in one unsorted scan."""
+    numbered_adr_regex = re.compile(r"^" + ADR_ID_REGEX_WITH_SEPARATOR)
+    max_number = None
+    with os.scandir(adr_path) as entries:
+        for entry in entries:
+            if entry.is_file() and numbered_adr_regex.match(entry.name):
+                number = int(entry.name.split("-", 1)[0])
+                if max_number is None or number > max_number:
+                    max_number = number
+    return max_number
 
 
 def calculate_next_adr_id(adr_path: Path) -> str:
-    numbered_adrs = sorted(adr_path.glob("[0-9][0-9][0-9][0-9]-*"))
-    if not len(numbered_adrs):
+    max_number = max_adr_number(adr_path)
+    if max_number is None:
         raise PyadrNoNumberedAdrError()
-    most_recent_adr = numbered_adrs.pop()
-    most_recent_id = most_recent_adr.stem.split("-")[0]
-    next_id = f"{int(most_recent_id) + 1:04d}"
-    return next_id
+    return format_adr_id(max_number + 1)
@@ -13,6 +13,7 @@ from pyadr.git.cli.commands import (
     GitPreMergeChecksCommand,
     GitProposeCommand,
     GitRejectCommand,
+    GitRenumberCommand,
 )
 
 
@@ -29,6 +30,7 @@ class App(cleo.Application):
         self.add(GitAcceptCommand())
         self.add(GitRejectCommand())
         self.add(GitCommitCommand())
+        self.add(GitRenumberCommand())
         self.add(GitHelperCommand())
         self.add(GitPreMergeChecksCommand())
         self.add(GitGenerateTocCommand())
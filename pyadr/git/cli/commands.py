@@ -1,19 +1,52 @@
 """Console script for git adr."""
 # flake8: noqa: B950
-from typing import Callable, List
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
 
 import cleo
 
+from pyadr.cli.commands import (
+    dry_run,
+    dry_run_option,
+    jobs_option,
+    locked,
+    sync_filename_all_option,
+    toc_formats_option,
+)
 from pyadr.const import STATUS_ACCEPTED, STATUS_REJECTED
 from pyadr.git.core import GitAdrCore
 from pyadr.git.exceptions import PyadrGitError, PyadrGitPreMergeChecksFailedError
 
 
 class BaseGitCommand(cleo.Command):
+    # commands changing the repository hold its lock exclusively (and first roll back
+    # the changes of an interrupted command), the others share it (see
+    # `AdrCore.lock()`)
+    exclusive_lock = False
+
     def __init__(self):
         super().__init__()
         self.git_adr_core = GitAdrCore()
 
+    def locks_repository(self) -> bool:
+        return True
+
+    def lock_exclusively(self) -> bool:
+        # a dry run changes nothing
+        return self.exclusive_lock and not dry_run_option(self)
+
+    @contextmanager
+    def lock_repository(self) -> Iterator[None]:
+        """Hold the lock of the repository (see `AdrCore.lock()` and `locked()`)."""
+        if not self.locks_repository():
+            yield
+            return
+        exclusive = self.lock_exclusively()
+        with self.git_adr_core.lock(exclusive, create=not dry_run_option(self)):
+            if exclusive:
+                self.git_adr_core.rollback_interrupted_changes()
+            yield
+
 
 class GitConfigCommand(BaseGitCommand):
     """
@@ -26,6 +59,10 @@ class GitConfigCommand(BaseGitCommand):
         {--u|unset : Unset configuration setting.}
     """
 
+    def lock_exclusively(self) -> bool:
+        return bool(self.option("unset") or self.argument("value"))
+
+    @locked
     def handle(self):
         if self.option("list"):
             self.git_adr_core.list_config()
@@ -50,14 +87,20 @@ class GitInitCommand(BaseGitCommand):
         {--f|force : If set, will erase existing ADR directory.}
         {--a|adr-only-repo : ADR only repo. This will affect the prefixes of
                              commit messages.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
         if self.option("adr-only-repo"):
             self.git_adr_core.config["git"]["adr-only-repo"] = "true"
 
         try:
-            self.git_adr_core.git_init_adr_repo(force=self.option("force"))
+            with dry_run(self, self.git_adr_core):
+                self.git_adr_core.git_init_adr_repo(force=self.option("force"))
         except PyadrGitError:
             return 1
 
@@ -70,6 +113,9 @@ class GitNewCommand(BaseGitCommand):
         {words* : Words in the title}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
         try:
             self.git_adr_core.git_new_adr(title=" ".join(self.argument("words")))
@@ -88,42 +134,76 @@ class GitProposeCommand(GitNewCommand):
 
 class GitAcceptCommand(BaseGitCommand):
     """
-    Accept a proposed ADR by assigning an ID, updating filename, status and date, and stage to the current branch
+    Accept proposed ADRs by assigning an ID, updating filename, status and date, and stage to the current branch
 
     accept
-        {file : ADR file.}
-        {--t|toc : If set, generates and stages the table of content after the ADR's
+        {files* : ADR files (or glob patterns), given consecutive ids in that order.}
+        {--t|toc : If set, generates and stages the table of content after the ADRs'
                    update.}
-        {--c|commit : If set, commits the updated ADR.}
+        {--c|commit : If set, commits the updated ADRs (in a single commit).}
+        {--r|reserve-ids : If set, gives ids following the highest id of all branches
+                           and reserves them in 'refs/adr/ids/'.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.git_adr_core.git_accept_or_reject(
-            self.argument("file"),
-            STATUS_ACCEPTED,
-            self.option("toc"),
-            self.option("commit"),
-        )
+        with dry_run(self, self.git_adr_core):
+            self.git_adr_core.git_accept_or_reject_many(
+                self.argument("files"),
+                STATUS_ACCEPTED,
+                self.option("toc"),
+                self.option("commit"),
+                self.option("reserve-ids"),
+            )
 
 
 class GitRejectCommand(BaseGitCommand):  # noqa
     """
-    Reject a proposed ADR by assigning an ID, updating filename, status and date, and stage to the current branch
+    Reject proposed ADRs by assigning an ID, updating filename, status and date, and stage to the current branch
 
     reject
-        {file : ADR file.}
-        {--t|toc : If set, generates and stages the table of content after the ADR's
+        {files* : ADR files (or glob patterns), given consecutive ids in that order.}
+        {--t|toc : If set, generates and stages the table of content after the ADRs'
                    update.}
-        {--c|commit : If set, commits the updated ADR.}
+        {--c|commit : If set, commits the updated ADRs (in a single commit).}
+        {--r|reserve-ids : If set, gives ids following the highest id of all branches
+                           and reserves them in 'refs/adr/ids/'.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.git_adr_core.git_accept_or_reject(
-            self.argument("file"),
-            STATUS_REJECTED,
-            self.option("toc"),
-            self.option("commit"),
-        )
+        with dry_run(self, self.git_adr_core):
+            self.git_adr_core.git_accept_or_reject_many(
+                self.argument("files"),
+                STATUS_REJECTED,
+                self.option("toc"),
+                self.option("commit"),
+                self.option("reserve-ids"),
+            )
+
+
+class GitRenumberCommand(BaseGitCommand):
+    """
+    Give canonical (4 digits padded) and unique ids to ADRs, updating links to them, and stage the changes
+
+    renumber
+        {--t|toc : If set, generates and stages the table of content after the ADRs'
+                   update.}
+    """
+
+    exclusive_lock = True
+
+    @locked
+    def handle(self) -> None:
+        self.git_adr_core.renumber_adrs(self.option("toc"))
 
 
 class GitCommitCommand(BaseGitCommand):
@@ -134,6 +214,9 @@ class GitCommitCommand(BaseGitCommand):
         {file : ADR file.}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
         self.git_adr_core.commit_adr(self.argument("file"))
 
@@ -143,11 +226,21 @@ class GitPreMergeChecksCommand(BaseGitCommand):
     Perform sanity checks typically required on ADR files before merging a Pull Request
 
     pre-merge-checks
+        {--j|jobs=1 : Number of parallel jobs reading and checking ADR files.}
+        {--r|ref= : Git revision to check the ADRs of, read from the git object
+                    database instead of the worktree.}
     """
 
+    def locks_repository(self) -> bool:
+        # the ADRs of a revision are read from the git object database only
+        return not self.option("ref")
+
+    @locked
     def handle(self):
         try:
-            self.git_adr_core.git_pre_merge_checks()
+            self.git_adr_core.git_pre_merge_checks(
+                jobs=jobs_option(self), ref=self.option("ref")
+            )
         except PyadrGitPreMergeChecksFailedError:
             return 1
 
@@ -160,6 +253,7 @@ class GitHelperSlugCommand(BaseGitCommand):
         {file : ADR file.}
     """
 
+    @locked
     def handle(self):
         self.git_adr_core.print_title_slug(self.argument("file"))
 
@@ -172,6 +266,7 @@ class GitHelperLowercaseCommand(BaseGitCommand):
         {file : ADR file.}
     """
 
+    @locked
     def handle(self):
         self.git_adr_core.print_title_lowercase(self.argument("file"))
 
@@ -181,11 +276,21 @@ class GitHelperSyncFilenameCommand(BaseGitCommand):
     Sync the ADR's filename with its actual title
 
     sync-filename
-        {file : ADR file.}
+        {file? : ADR file.}
+        {--a|all : If set, syncs the filenames of all the ADRs at once.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    @locked
     def handle(self):
-        self.git_adr_core.sync_filename(self.argument("file"))
+        with dry_run(self, self.git_adr_core):
+            if sync_filename_all_option(self):
+                self.git_adr_core.sync_all_filenames()
+            else:
+                self.git_adr_core.sync_filename(self.argument("file"))
 
 
 class GitHelperCommitMessageCommand(BaseGitCommand):
@@ -196,6 +301,7 @@ class GitHelperCommitMessageCommand(BaseGitCommand):
         {file : ADR file.}
     """
 
+    @locked
     def handle(self):
         self.git_adr_core.print_commit_message(self.argument("file"))
 
@@ -208,10 +314,28 @@ class GitHelperBranchTitleCommand(BaseGitCommand):
         {file : ADR file.}
     """
 
+    @locked
     def handle(self):
         self.git_adr_core.print_branch_title(self.argument("file"))
 
 
+class GitHelperPruneIdReservationsCommand(BaseGitCommand):
+    """
+    Delete the id reservations of ids already given to ADRs committed in a branch
+
+    prune-id-reservations
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
+    """
+
+    exclusive_lock = True
+
+    @locked
+    def handle(self) -> None:
+        with dry_run(self, self.git_adr_core):
+            self.git_adr_core.prune_id_reservations()
+
+
 class GitHelperCommand(BaseGitCommand):
     """
     Helper command generating and syncing various useful things
@@ -229,6 +353,7 @@ class GitHelperCommand(BaseGitCommand):
                 GitHelperSyncFilenameCommand(),
                 GitHelperCommitMessageCommand(),
                 GitHelperBranchTitleCommand(),
+                GitHelperPruneIdReservationsCommand(),
             ]
         )
         super().__init__()
@@ -242,7 +367,33 @@ class GitGenerateTocCommand(BaseGitCommand):
     Generate a table of content of the ADRs
 
     toc
+        {--j|jobs=1 : Number of ADR files read in parallel.}
+        {--f|format=md : Comma-separated formats of the table of content
+                         (md, json, jsonl, csv, html).}
+        {--s|sharded : If set, the markdown table of content links to one page per
+                       status and per range of ids, only regenerated if changed.}
+        {--e|exit-code : If set, exits with code 1 when the table of content was
+                         updated (e.g. for pre-commit hooks).}
+        {--r|ref= : Git revision to generate the table of content of, read from the
+                    git object database and printed instead of written.}
+        {--dry-run : If set, prints the plan of the changes instead of making them.}
+        {--plan=text : Format of the plan printed by '--dry-run' (text, json).}
     """
 
+    exclusive_lock = True
+
+    def locks_repository(self) -> bool:
+        # the ADRs of a revision are read from the git object database only
+        return not self.option("ref")
+
+    @locked
     def handle(self):
-        self.git_adr_core.generate_toc()
+        with dry_run(self, self.git_adr_core):
+            toc_paths = self.git_adr_core.generate_toc(
+                jobs=jobs_option(self),
+                formats=toc_formats_option(self),
+                sharded=self.option("sharded"),
+                ref=self.option("ref"),
+            )
+        if toc_paths and self.option("exit-code"):
+            return 1
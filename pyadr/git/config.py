@@ -2,6 +2,7 @@ from copy import deepcopy
 
 from pyadr.config import AdrConfig
 from pyadr.const import ADR_DEFAULT_SETTINGS, DEFAULT_CONFIG_FILE_PATH
+from pyadr.file_utils import atomic_write
 from pyadr.git.const import GIT_ADR_DEFAULT_SETTINGS
 
 
@@ -32,7 +33,7 @@ class GitAdrConfig(AdrConfig):
         defaults = deepcopy(self.defaults())
         self[self.default_section] = {}  # type: ignore
 
-        with self.config_file_path.open("w") as f:
+        with atomic_write(self.config_file_path) as f:
             self.write(f)
 
         self[self.default_section] = defaults  # type: ignore
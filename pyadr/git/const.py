@@ -10,3 +10,15 @@ VALID_REQUESTS = [
     DEPRECATION_REQUEST,
     SUPERSEDING_REQUEST,
 ]
+
+# number of parsed ADR headers kept by the `git cat-file --batch` reader
+GIT_HEADER_CACHE_SIZE = 1024
+
+# tracked state of a file in a git repository
+TRACKED_STATE_COMMITTED = "committed"
+TRACKED_STATE_STAGED = "staged"
+TRACKED_STATE_UNTRACKED = "untracked"
+
+# refs under which ADR ids are reserved (e.g. `refs/adr/ids/0012`), so that ids are
+# not given twice across branches
+ADR_ID_RESERVATION_REFS = "refs/adr/ids"
@@ -1,33 +1,70 @@
+import sys
+from contextlib import contextmanager
 from pathlib import Path
+from typing import (
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
 
 from git import Repo
 from loguru import logger
 from slugify import slugify
 
-from pyadr.const import REVIEW_REQUESTS
-from pyadr.content_utils import adr_status_from_file
+from pyadr.const import REVIEW_REQUESTS, TOC_FORMAT_MARKDOWN
+from pyadr.content_utils import format_adr_id
 from pyadr.core import AdrCore
-from pyadr.exceptions import PyadrStatusIncompatibleWithReviewRequestError
+from pyadr.exceptions import (
+    PyadrAdrDirectoryDoesNotExistsError,
+    PyadrStatusIncompatibleWithReviewRequestError,
+)
+from pyadr.file_utils import protect_files
 from pyadr.git.config import GitAdrConfig
-from pyadr.git.const import PROPOSAL_REQUEST
+from pyadr.git.const import (
+    ADR_ID_RESERVATION_REFS,
+    PROPOSAL_REQUEST,
+    TRACKED_STATE_COMMITTED,
+    TRACKED_STATE_UNTRACKED,
+)
 from pyadr.git.exceptions import (
     PyadrGitAdrNotStagedError,
     PyadrGitAdrNotStagedOrCommittedError,
     PyadrGitPreMergeChecksFailedError,
+    PyadrGitRefTocOptionsError,
 )
+from pyadr.git.repository import GitTreeAdrRepository
 from pyadr.git.utils import (
+    GitStagedChanges,
+    GitTrackedFiles,
     create_feature_branch_and_checkout,
+    create_ref,
+    delete_refs,
     get_verified_repo_client,
+    git_cat_file_batch,
+    ref_tips,
+    repo_relative_path,
     verify_branch_does_not_exist,
     verify_index_empty,
     verify_main_branch_exists,
 )
+from pyadr.plan import current_plan
 
 
 class GitAdrCore(AdrCore):
     def __init__(self):
-        self.config = GitAdrConfig()
+        super().__init__(config=GitAdrConfig())
         self._repo = None
+        self._ref: Optional[str] = None
+        self._tracked_files: Optional[GitTrackedFiles] = None
+        self._staged_changes: Optional[GitStagedChanges] = None
+        self._index_batch: Optional[List[Path]] = None
+        self._reserving_adr_ids = False
 
     ###########################################
     # PROPERTIES
@@ -45,6 +82,86 @@ class GitAdrCore(AdrCore):
             self._repo = get_verified_repo_client(Path.cwd())
         return self._repo
 
+    @property
+    def tracked_files(self) -> GitTrackedFiles:
+        """Snapshot of the tracked files, taken again after the index is changed."""
+        if self._tracked_files is None:
+            self._tracked_files = GitTrackedFiles(self.repo)
+        return self._tracked_files
+
+    @property
+    def staged_changes(self) -> GitStagedChanges:
+        """Snapshot of the staged changes, taken again after the index is changed."""
+        if self._staged_changes is None:
+            self._staged_changes = GitStagedChanges(self.repo)
+        return self._staged_changes
+
+    ###########################################
+    # INDEX
+    ###########################################
+    def _stage(self, paths: Iterable[Path]) -> None:
+        if self._index_batch is not None:
+            self._index_batch.extend(paths)
+            return
+        plan = current_plan()
+        if plan is not None:
+            plan.record("stage", paths=[str(path) for path in paths])
+            return
+        self.repo.index.add([str(path) for path in paths])
+        self._invalidate_git_snapshots()
+
+    @contextmanager
+    def _batched_index_update(self) -> Iterator[None]:
+        """
+        Stage the files added, modified, renamed or removed within the context at once.
+
+        The changes are applied to the index with a single `git update-index` (`git
+        mv` can only move several files to a directory) when the context exits. Nothing
+        is staged if the context fails.
+        """
+        paths: List[Path] = []
+        self._index_batch = paths
+        try:
+            yield
+        finally:
+            self._index_batch = None
+        plan = current_plan()
+        if paths and plan is not None:
+            plan.record("stage", paths=list(dict.fromkeys(str(p) for p in paths)))
+        elif paths:
+            self.repo.git.update_index(
+                "--add", "--remove", "--", *dict.fromkeys(str(p) for p in paths)
+            )
+            self._invalidate_git_snapshots()
+
+    def _invalidate_git_snapshots(self) -> None:
+        self._tracked_files = None
+        self._staged_changes = None
+
+    def _commit(self, message: str) -> None:
+        plan = current_plan()
+        if plan is not None:
+            plan.record("commit", message=message)
+            return
+        self.repo.index.commit(message)
+        self._invalidate_git_snapshots()
+
+    def _file_transaction(self, paths: Iterable[Path] = ()) -> ContextManager[None]:
+        # the index is restored along with the files if the transaction fails
+        return super()._file_transaction([Path(self.repo.git_dir, "index"), *paths])
+
+    ###########################################
+    # LOCK
+    ###########################################
+    def lock(self, exclusive: bool, create: bool = True) -> ContextManager[None]:
+        """
+        Same as `AdrCore.lock()`, without creating the lock file outside of a git
+        repository, where commands fail before changing anything (but the config
+        ones, whose changes are atomic).
+        """
+        in_git_repository = (self.config.config_file_path.parent / ".git").exists()
+        return super().lock(exclusive, create and in_git_repository)
+
     ###########################################
     # CONFIGURE ADR
     ###########################################
@@ -67,18 +184,24 @@ class GitAdrCore(AdrCore):
 
         created_files = self.init_adr_repo(force=force)
 
+        plan = current_plan()
         if "main" not in self.repo.heads:
             logger.info("Git repo empty. Will commit files to 'main'.")
+            branch_name = self.repo.head.ref.name
+        elif plan is not None:
+            plan.record("create-branch", branch=init_branch_name)
+            branch_name = init_branch_name
         else:
             create_feature_branch_and_checkout(self.repo, init_branch_name)
+            branch_name = init_branch_name
 
-        self.repo.index.add([str(p) for p in created_files])
+        self._stage(created_files)
 
         message = f"{self.commit_message_default_prefix} initialise adr repository"
-        self.repo.index.commit(message)
+        self._commit(message)
 
         logger.info(
-            f"Files committed to branch '{self.repo.head.ref.name}' "
+            f"Files committed to branch '{branch_name}' "
             f"with commit message '{message}'."
         )
         logger.info("ADR Git repo initialised.")
@@ -110,7 +233,7 @@ class GitAdrCore(AdrCore):
         create_feature_branch_and_checkout(self.repo, adr_branch_name)
 
         logger.info(f"Staging '{new_adr_path}'...")
-        self.repo.index.add([str(new_adr_path)])
+        self._stage([new_adr_path])
         logger.log("VERBOSE", "... done.")
 
         logger.info("New ADR added to Git repo.")
@@ -119,25 +242,178 @@ class GitAdrCore(AdrCore):
     # ACCEPT / REJECT
     ###########################################
     def git_accept_or_reject(
-        self, file: str, status: str, toc: bool = False, commit: bool = False
+        self,
+        file: str,
+        status: str,
+        toc: bool = False,
+        commit: bool = False,
+        reserve_ids: bool = False,
+    ) -> None:
+        self.git_accept_or_reject_many([file], status, toc, commit, reserve_ids)
+
+    def git_accept_or_reject_many(
+        self,
+        files: Sequence[str],
+        status: str,
+        toc: bool = False,
+        commit: bool = False,
+        reserve_ids: bool = False,
     ) -> None:
-        self._verify_adr_staged_or_committed(Path(file))
+        proposed_adrs = self._expand_adr_files(files)
+        for proposed_adr in proposed_adrs:
+            self._verify_adr_staged_or_committed(proposed_adr)
 
-        processed_adr = self.accept_or_reject(file, status, toc)
+        self._reserving_adr_ids = reserve_ids
+        try:
+            with self._file_transaction(), self._batched_index_update():
+                processed_adrs = self.accept_or_reject_many(
+                    [str(path) for path in proposed_adrs], status, toc
+                )
+        finally:
+            self._reserving_adr_ids = False
 
         if commit:
-            self._commit_adr(processed_adr)
+            self._commit_adrs(processed_adrs)
+
+    def _get_next_adr_ids(self, count: int) -> List[str]:
+        adr_ids = super()._get_next_adr_ids(count)
+        if not self._reserving_adr_ids:
+            return adr_ids
+        return self._reserve_adr_ids(int(adr_ids[0]) - 1, count)
+
+    def _reserve_adr_ids(self, max_number: int, count: int) -> List[str]:
+        """
+        Reserve ids following the highest id of all branches, in git refs.
+
+        The highest id is taken from the records directory of the worktree
+        (`max_number`), of all local and remote-tracking branch tips (read from their
+        trees, without checkout) and from the ids already reserved. Each id is then
+        reserved by creating its ref (e.g. `refs/adr/ids/0012`) atomically: an id
+        reserved meanwhile by another process is skipped.
+
+        Reservations are refs of the local repository: they only guard against the
+        ids reserved in other clones if they are pushed to and fetched from a
+        remote. See `prune_id_reservations()` to delete the ones of no use anymore.
+        """
+        logger.info("Reserving ADR ids across branches...")
+        reservation_prefix = f"{ADR_ID_RESERVATION_REFS}/"
+        reservations, branches_max_number = self._id_reservations_and_branches_max()
+        max_number = max(
+            [max_number, branches_max_number or 0]
+            + [int(ref[len(reservation_prefix) :]) for ref in reservations]
+        )
 
-    def _commit_adr(self, adr_path):
-        logger.info(f"Committing ADR '{adr_path}'...")
-        commit_message = self._commit_message_for_adr(adr_path)
-        self.repo.index.commit(commit_message)
-        logger.success(f"Committed ADR '{adr_path}' with message '{commit_message}'.")
+        head_sha = self.repo.head.commit.hexsha
+        plan = current_plan()
+        adr_ids: List[str] = []
+        while len(adr_ids) < count:
+            max_number += 1
+            adr_id = format_adr_id(max_number)
+            ref = f"{reservation_prefix}{adr_id}"
+            if plan is not None:
+                plan.record("reserve-id", ref=ref)
+                adr_ids.append(adr_id)
+            elif create_ref(self.repo, ref, head_sha):
+                adr_ids.append(adr_id)
+            else:
+                logger.log("VERBOSE", f"... id '{adr_id}' already reserved.")
+        logger.log("VERBOSE", f"... ids {', '.join(adr_ids)} reserved.")
+        return adr_ids
+
+    def _id_reservations_and_branches_max(
+        self,
+    ) -> Tuple[Dict[str, str], Optional[int]]:
+        """
+        Id reservations and highest id of all local and remote-tracking branch tips.
+
+        Returns: the object names of the reservation refs, by ref name, and the
+            highest id of the records directory in the trees of the branch tips
+            (`None` if there is none)
+
+        """
+        reservation_prefix = f"{ADR_ID_RESERVATION_REFS}/"
+        reservations = {}
+        commits = []
+        for refname, sha in ref_tips(
+            self.repo, ["refs/heads", "refs/remotes", ADR_ID_RESERVATION_REFS]
+        ).items():
+            if not refname.startswith(reservation_prefix):
+                commits.append(sha)
+            elif refname[len(reservation_prefix) :].isdigit():
+                reservations[refname] = sha
+
+        records_path = repo_relative_path(
+            Path(self.repo.working_tree_dir).resolve(),  # type: ignore[arg-type]
+            self.adr_repository.records_path,
+        )
+        if records_path is None:
+            return reservations, None
+        return reservations, git_cat_file_batch(self.repo).max_adr_number_in_trees(
+            commits, records_path
+        )
 
-    def _commit_message_for_adr(self, adr_path: Path) -> str:
-        self._verify_adr_filename(adr_path)
+    def prune_id_reservations(self) -> List[str]:
+        """
+        Delete the reservations of the ids already given in a branch.
+
+        An id up to the highest id of the ADRs committed in local and remote-tracking
+        branches is never given again (see `_reserve_adr_ids()`): its reservation is
+        of no use anymore. Reservations are local refs: those shared through a remote
+        are only deleted from the local repository.
+
+        Returns: the reservation refs deleted
+
+        """
+        reservation_prefix = f"{ADR_ID_RESERVATION_REFS}/"
+        reservations, branches_max_number = self._id_reservations_and_branches_max()
+        pruned = {
+            ref: sha
+            for ref, sha in reservations.items()
+            if branches_max_number is not None
+            and int(ref[len(reservation_prefix) :]) <= branches_max_number
+        }
+        plan = current_plan()
+        if plan is not None:
+            for ref in pruned:
+                plan.record("unreserve-id", ref=ref)
+        else:
+            delete_refs(self.repo, pruned)
+        logger.info(
+            f"{len(pruned)} id reservation(s) pruned, {len(reservations) - len(pruned)} "
+            "kept."
+        )
+        return sorted(pruned)
+
+    def _commit_adr(self, adr_path: Path) -> None:
+        self._commit_adrs([adr_path])
+
+    def _commit_adrs(self, adr_paths: Sequence[Path]) -> None:
+        adrs_description = ("ADR " if len(adr_paths) == 1 else "ADRs ") + ", ".join(
+            f"'{path}'" for path in adr_paths
+        )
+        logger.info(f"Committing {adrs_description}...")
+        commit_message = self._commit_message_for_adrs(adr_paths)
+        self._commit(commit_message)
+        logger.success(f"Committed {adrs_description} with message '{commit_message}'.")
+
+    def _commit_message_for_adrs(self, adr_paths: Sequence[Path]) -> str:
+        if len(adr_paths) == 1:
+            return self._commit_message_for_adr(adr_paths[0])
+
+        adr_statuses = sorted(
+            {self._verify_adr_filename(adr_path).status for adr_path in adr_paths}
+        )
+        if len(adr_statuses) == 1:
+            prefix = self._commit_message_prefix_for_status(adr_statuses[0])
+        else:
+            prefix = self.commit_message_default_prefix
+        return "\n".join(
+            [f"{prefix} [{', '.join(adr_statuses)}] {len(adr_paths)} ADRs", ""]
+            + [f"* {adr_path.stem}" for adr_path in adr_paths]
+        )
 
-        adr_status = adr_status_from_file(adr_path)
+    def _commit_message_for_adr(self, adr_path: Path) -> str:
+        adr_status = self._verify_adr_filename(adr_path).status
         return (
             f"{self._commit_message_prefix_for_status(adr_status)} "
             f"[{adr_status}] "
@@ -153,44 +429,54 @@ class GitAdrCore(AdrCore):
     def _verify_adr_staged_or_committed(
         self, path: Path, print_error_message: bool = True
     ) -> None:
-        if not (self._file_staged(path) or self._file_committed(path)):
+        if not self._file_tracked(path):
             if print_error_message:
                 logger.error(f"ADR '{path}' should be staged or committed first.")
             raise PyadrGitAdrNotStagedOrCommittedError(path)
 
     def _verify_adr_staged(self, path: Path, print_error_message: bool = True) -> None:
-        if not (self._file_staged(path) or self._file_committed(path)):
+        if not (self._file_committed(path) or self._file_staged(path)):
             if print_error_message:
                 logger.error(f"ADR '{path}' should be staged first.")
             raise PyadrGitAdrNotStagedError(path)
 
     def _file_staged(self, path):
-        return str(path) in [d.a_path for d in self.repo.index.diff("HEAD")]
+        return path in self.staged_changes
 
     def _file_committed(self, path):
-        return str(path) in list(self.repo.head.commit.stats.files.keys())
+        return self.tracked_files.state(path) == TRACKED_STATE_COMMITTED
+
+    def _file_tracked(self, path: Path) -> bool:
+        return self.tracked_files.state(path) != TRACKED_STATE_UNTRACKED
 
     def _apply_accept_or_reject_to_proposed_adr(
-        self, proposed_adr: Path, status: str
+        self, proposed_adr: Path, status: str, adr_id: Optional[str] = None
     ) -> Path:
         processed_adr = super()._apply_accept_or_reject_to_proposed_adr(
-            proposed_adr, status
+            proposed_adr, status, adr_id
         )
 
-        self.repo.index.add([str(processed_adr)])
+        self._stage([processed_adr])
 
         return processed_adr
 
     def _apply_filepath_update(self, path: Path, renamed_path: Path) -> None:
+        protect_files([path, renamed_path])
+        if self._index_batch is not None or current_plan() is not None:
+            super()._apply_filepath_update(path, renamed_path)
+            self._stage([path, renamed_path])
+            return
+
         try:
             self._verify_adr_staged_or_committed(path, print_error_message=False)
         except PyadrGitAdrNotStagedOrCommittedError:
             logger.debug("not staged or committed")
             super()._apply_filepath_update(path, renamed_path)
-            self.repo.index.add([str(renamed_path)])
+            self._stage([renamed_path])
         else:
             logger.debug("staged or committed")
             self.repo.git.mv(str(path), str(renamed_path))
+            self._invalidate_git_snapshots()
 
     ###########################################
     # COMMIT ADR
@@ -200,17 +486,113 @@ class GitAdrCore(AdrCore):
         self._verify_adr_staged(adr_path)
         self._commit_adr(adr_path)
 
+    ###########################################
+    # READ AT REF
+    ###########################################
+    def read_adrs_at_ref(self, ref: str) -> None:
+        """
+        Read the ADRs from the tree of a git revision instead of the worktree.
+
+        Files and their content are read straight from the git object database, so
+        that no checkout is needed (e.g. in a bare repository).
+        """
+        self._ref = ref
+        self._adr_repository = GitTreeAdrRepository(
+            git_cat_file_batch(self.repo), ref, Path(self.config["adr"]["records-dir"])
+        )
+
+    def verify_adr_dir_exists(self) -> None:
+        if self._ref is None:
+            super().verify_adr_dir_exists()
+            return
+
+        adr_repo_path = Path(self.config["adr"]["records-dir"])
+        if not self.adr_repository.exists():
+            logger.error(
+                f"Directory '{adr_repo_path}/' does not exist "
+                f"at git revision '{self._ref}'."
+            )
+            raise PyadrAdrDirectoryDoesNotExistsError()
+
     ###########################################
     # GENERATE TOC
     ###########################################
-    def generate_toc(self, pre_checks: bool = True) -> Path:
-        toc_path = super().generate_toc()
-        self.repo.index.add([str(toc_path)])
-        return toc_path
+    def generate_toc(
+        self,
+        pre_checks: bool = True,
+        jobs: int = 1,
+        formats: Sequence[str] = (TOC_FORMAT_MARKDOWN,),
+        sharded: bool = False,
+        ref: Optional[str] = None,
+    ) -> List[Path]:
+        """
+        Same as `AdrCore.generate_toc()`, with the generated files staged.
+
+        If `ref` is given, the table of content of the ADRs at that git revision is
+        printed on the standard output instead (see `read_adrs_at_ref()`).
+        """
+        if ref is not None:
+            if sharded or len(formats) != 1:
+                logger.error(
+                    "The table of content of a git revision can only be printed "
+                    "in a single format, and not sharded."
+                )
+                raise PyadrGitRefTocOptionsError(ref)
+            self.read_adrs_at_ref(ref)
+
+        return super().generate_toc(pre_checks, jobs, formats, sharded)
+
+    def _write_toc(
+        self, toc_content: Iterable[str], toc_path: Path, description: str
+    ) -> List[Path]:
+        if self._ref is not None:
+            sys.stdout.writelines(toc_content)
+            sys.stdout.flush()
+            return []
+
+        toc_paths = super()._write_toc(toc_content, toc_path, description)
+        if toc_paths:
+            self._stage(toc_paths)
+        return toc_paths
+
+    def _remove_toc_shards(
+        self, shard_names: Iterable[str], keep_manifest: bool = False
+    ) -> None:
+        if self._ref is not None:
+            # only printing the table of content of a revision: the worktree and the
+            # index are left untouched
+            return
+        super()._remove_toc_shards(shard_names, keep_manifest)
+
+    def _remove_toc_file(self, toc_path: Path) -> None:
+        super()._remove_toc_file(toc_path)
+        if current_plan() is not None:
+            self._stage([toc_path])
+            return
+        self.repo.git.rm("--cached", "--ignore-unmatch", "--quiet", str(toc_path))
+        self._invalidate_git_snapshots()
 
     ###########################################
     # HELPER FUNCTIONS
     ###########################################
+    def sync_all_filenames(self) -> List[Path]:
+        """Same as `AdrCore.sync_all_filenames()`, with the renames staged at once."""
+        with self._file_transaction(), self._batched_index_update():
+            return super().sync_all_filenames()
+
+    def renumber_adrs(self, toc: bool = False) -> List[Path]:
+        """Same as `AdrCore.renumber_adrs()`, with the changes staged at once."""
+        with self._file_transaction(), self._batched_index_update():
+            return super().renumber_adrs(toc)
+
+    def _update_adr_links(
+        self, path: Path, links_regex: Pattern[str], renamed_files: Dict[str, str]
+    ) -> bool:
+        if not super()._update_adr_links(path, links_regex, renamed_files):
+            return False
+        self._stage([path])
+        return True
+
     def print_commit_message(self, file: str) -> None:
         logger.info(self._commit_message_for_adr(Path(file)))
 
@@ -218,9 +600,7 @@ class GitAdrCore(AdrCore):
         logger.info(self._branch_title_from_file(Path(file)))
 
     def _branch_title_from_file(self, adr_path: Path) -> str:
-        self._verify_adr_filename(adr_path)
-
-        adr_status = adr_status_from_file(adr_path)
+        adr_status = self._verify_adr_filename(adr_path).status
         if adr_status not in REVIEW_REQUESTS.keys():
             logger.error(
                 "Can only create review request branches for ADR statuses: "
@@ -235,8 +615,13 @@ class GitAdrCore(AdrCore):
     ###########################################
     # GIT PRE MERGE CHECKS
     ###########################################
-    def git_pre_merge_checks(self) -> None:
-        at_least_one_check_failed = self._check_adr_repo(check_no_proposed=True)
+    def git_pre_merge_checks(self, jobs: int = 1, ref: Optional[str] = None) -> None:
+        if ref is not None:
+            self.read_adrs_at_ref(ref)
+
+        at_least_one_check_failed = self._check_adr_repo(
+            check_no_proposed=True, jobs=jobs
+        )
 
         if at_least_one_check_failed:
             raise PyadrGitPreMergeChecksFailedError
@@ -35,3 +35,11 @@ class PyadrGitAdrNotStagedError(PyadrGitError):
 
 class PyadrGitAdrBadFilenameFormatOrTitleError(PyadrGitError):
     """ADR filename formot incorrect or title portion different from title in file"""
+
+
+class PyadrGitRevisionNotFoundError(PyadrGitError):
+    """Git revision (branch, tag, commit...) not found"""
+
+
+class PyadrGitRefTocOptionsError(PyadrGitError):
+    """Table of content of a git revision is printed in a single, unsharded format"""
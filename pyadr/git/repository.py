@@ -0,0 +1,73 @@
+"""Index of the ADRs of a records directory at a git revision, without checkout"""
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from loguru import logger
+
+from pyadr.content_utils import AdrHeader, adr_sort_key
+from pyadr.exceptions import PyadrAdrFormatError
+from pyadr.git.exceptions import PyadrGitRevisionNotFoundError
+from pyadr.git.utils import GitCatFileBatch
+from pyadr.repository import AdrRepository
+
+
+class GitTreeAdrRepository(AdrRepository):
+    """
+    Index of the ADRs of the records directory in the tree of a git revision.
+
+    Files are listed from the tree and their headers parsed from their blobs,
+    straight from the git object database through a `git cat-file --batch` reader:
+    no worktree is needed (e.g. in a bare repository). The header cache is not used,
+    as it is keyed by the stats of files in the worktree.
+    """
+
+    def __init__(self, cat_file: GitCatFileBatch, rev: str, records_path: Path):
+        super().__init__(records_path)
+        self.cat_file = cat_file
+        self.rev = rev
+        self._blobs: Optional[Dict[str, str]] = None
+        self._tree_exists = False
+
+    @property
+    def blobs(self) -> Dict[str, str]:
+        """Sha of the blobs of the records directory at the revision, by name."""
+        if self._blobs is None:
+            self._read_tree()
+        return self._blobs  # type: ignore[return-value]
+
+    def exists(self) -> bool:
+        if self._blobs is None:
+            self._read_tree()
+        return self._tree_exists
+
+    def _read_tree(self) -> None:
+        commit = self.cat_file.read_objects([f"{self.rev}^{{commit}}"])[0]
+        if commit is None:
+            logger.error(f"Git revision '{self.rev}' not found.")
+            raise PyadrGitRevisionNotFoundError(self.rev)
+
+        tree = self.cat_file.read_tree(f"{commit[0]}:{self.records_path.as_posix()}")
+        self._tree_exists = tree is not None
+        self._blobs = {
+            name: sha for mode, name, sha in tree or [] if mode.startswith("100")
+        }
+
+    def _scan(self) -> List[Path]:
+        return sorted(
+            (self.records_path / name for name in self.blobs), key=adr_sort_key
+        )
+
+    def _parse_file(self, path: Path) -> AdrHeader:
+        result = self._parse_files([path])[0]
+        if isinstance(result, PyadrAdrFormatError):
+            raise result
+        return result
+
+    def _parse_files(
+        self, paths: Sequence[Path], jobs: int = 1
+    ) -> List[Union[AdrHeader, PyadrAdrFormatError]]:
+        # all blobs are read in a single batch, whatever the number of jobs
+        return self.cat_file.read_adr_headers(
+            [(self.blobs.get(path.name, ""), path) for path in paths],
+            source_prefix=f"{self.rev}:",
+        )
@@ -1,10 +1,40 @@
+import atexit
+import io
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import (
+    IO,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from git import Commit, InvalidGitRepositoryError, Repo  # type: ignore[attr-defined]
-from gitdb.exc import BadName
+from git import (  # type: ignore[attr-defined]
+    GitCommandError,
+    InvalidGitRepositoryError,
+    Repo,
+)
 from loguru import logger
 
+from pyadr.const import ADR_ID_REGEX_WITH_SEPARATOR
+from pyadr.content_utils import AdrHeader, adr_header_from_stream
+from pyadr.exceptions import PyadrAdrFormatError
+from pyadr.git.const import (
+    GIT_HEADER_CACHE_SIZE,
+    TRACKED_STATE_COMMITTED,
+    TRACKED_STATE_STAGED,
+    TRACKED_STATE_UNTRACKED,
+)
 from pyadr.git.exceptions import (
     PyadrGitBranchAlreadyExistsError,
     PyadrGitIndexNotEmptyError,
@@ -12,16 +42,12 @@ from pyadr.git.exceptions import (
     PyadrInvalidGitRepositoryError,
 )
 
+NUMBERED_ADR_FILENAME_REGEX = re.compile(r"^" + ADR_ID_REGEX_WITH_SEPARATOR)
+
 
 def verify_index_empty(repo: Repo) -> None:
     logger.info("Verifying Git index is empty...")
-    try:
-        count_staged_files = len(repo.index.diff("HEAD"))
-    except BadName:
-        # HEAD does not exist => the repo is empty, so must verify index is too
-        count_staged_files = len(list(repo.index.iter_blobs()))
-
-    if count_staged_files > 0:
+    if not index_clean(repo):
         logger.error("... files staged in Git index. Clean before running command.")
         raise PyadrGitIndexNotEmptyError()
 
@@ -56,6 +82,20 @@ def verify_main_branch_exists(repo: Repo, branch: str = "main") -> None:
         raise PyadrGitMainBranchDoesNotExistError(branch)
 
 
+def index_clean(repo: Repo) -> bool:
+    """Whether nothing is staged, stopping at the first staged change found."""
+    if not repo.head.is_valid():
+        # HEAD does not exist => the repo is empty, so must verify index is too
+        return not repo.index.entries
+    try:
+        repo.git.diff_index("--cached", "--quiet", "HEAD")
+    except GitCommandError as e:
+        if e.status == 1:
+            return False
+        raise
+    return True
+
+
 def get_verified_repo_client(repo_workdir: Path) -> Repo:
     try:
         repo = Repo(repo_workdir)
@@ -79,5 +119,331 @@ def create_feature_branch_and_checkout(repo: Repo, branch_name: str) -> None:
     logger.log("VERBOSE", "... done.")
 
 
-def files_committed_in_commit(commit: Commit) -> List:
-    return list(commit.stats.files.keys())
+def ref_tips(repo: Repo, patterns: Sequence[str]) -> Dict[str, str]:
+    """Object names of the refs matching patterns (e.g. `refs/heads`), by ref name."""
+    output = repo.git.for_each_ref("--format=%(objectname) %(refname)", *patterns)
+    return {
+        refname: sha
+        for sha, refname in (line.split(" ", 1) for line in output.splitlines())
+    }
+
+
+def create_ref(repo: Repo, ref: str, sha: str) -> bool:
+    """
+    Create a ref atomically, only if it does not exist yet.
+
+    Returns: whether the ref was created
+
+    """
+    try:
+        # an empty old value makes `update-ref` fail if the ref already exists
+        repo.git.update_ref(ref, sha, "")
+    except GitCommandError:
+        if ref not in ref_tips(repo, [ref]):
+            raise
+        return False
+    return True
+
+
+def delete_refs(repo: Repo, refs: Dict[str, str]) -> None:
+    """
+    Delete refs in a single `git update-ref --stdin` transaction.
+
+    Each ref is only deleted if it still points to the given object name: if one of
+    them was updated meanwhile, none is deleted.
+    """
+    if not refs:
+        return
+    # git reads its standard input from a file descriptor: no in-memory stream
+    with tempfile.TemporaryFile() as commands:
+        for ref, sha in refs.items():
+            commands.write(f"delete {ref} {sha}\n".encode("utf-8"))
+        commands.seek(0)
+        repo.git.update_ref("--stdin", istream=commands)
+
+
+def repo_relative_path(working_dir: Path, path: Path) -> Optional[str]:
+    """
+    Path of a file relative to a (resolved) working tree, as listed by git.
+
+    Returns: the path, or `None` if the file is outside of the working tree
+
+    """
+    absolute_path = Path(os.path.abspath(path))
+    try:
+        return (
+            (absolute_path.parent.resolve() / absolute_path.name)
+            .relative_to(working_dir)
+            .as_posix()
+        )
+    except ValueError:
+        return None
+
+
+class GitTrackedFiles(object):
+    """
+    Snapshot of the files tracked by a git repository, taken once.
+
+    Files of the HEAD tree and of the index are listed once each (with `git ls-tree`
+    and from the index file), so that the tracked state of any number of files is
+    then known without running git again. The snapshot must be taken again after
+    the index is changed.
+    """
+
+    def __init__(self, repo: Repo):
+        self.working_dir = Path(repo.working_tree_dir).resolve()  # type: ignore
+        self.committed: FrozenSet[str] = frozenset()
+        if repo.head.is_valid():
+            names = repo.git.ls_tree("-r", "-z", "--name-only", "HEAD").split("\0")
+            self.committed = frozenset(name for name in names if name)
+        self.indexed: FrozenSet[str] = frozenset(
+            str(path) for path, _ in repo.index.entries
+        )
+
+    def state(self, path: Path) -> str:
+        """
+        Tracked state of a file.
+
+        Returns: `committed` if the file is in the index and at HEAD, `staged` if it
+            is only in the index (newly added), `untracked` otherwise
+
+        """
+        repo_path = repo_relative_path(self.working_dir, path)
+        if repo_path not in self.indexed:
+            return TRACKED_STATE_UNTRACKED
+        if repo_path in self.committed:
+            return TRACKED_STATE_COMMITTED
+        return TRACKED_STATE_STAGED
+
+
+class GitStagedChanges(object):
+    """
+    Snapshot of the changes staged in a git repository, taken once.
+
+    Files whose content in the index differs from HEAD (added, modified, deleted or
+    renamed) are listed once with `git diff-index --cached`, so that whether any
+    number of files is staged is then known without running git again. The snapshot
+    must be taken again after the index is changed.
+    """
+
+    def __init__(self, repo: Repo):
+        self.working_dir = Path(repo.working_tree_dir).resolve()  # type: ignore
+        if repo.head.is_valid():
+            names = repo.git.diff_index(
+                "--cached", "--name-only", "--no-renames", "-z", "HEAD"
+            ).split("\0")
+            self.paths: FrozenSet[str] = frozenset(name for name in names if name)
+        else:
+            # HEAD does not exist => the repo is empty, so all of the index is staged
+            self.paths = frozenset(str(path) for path, _ in repo.index.entries)
+
+    def __contains__(self, path: Path) -> bool:
+        return repo_relative_path(self.working_dir, path) in self.paths
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+
+GitObject = Tuple[str, str, bytes]
+GitTreeEntry = Tuple[str, str, str]
+
+
+class GitCatFileBatch(object):
+    """
+    Long-lived `git cat-file --batch` process reading objects of a git repository.
+
+    Objects are requested by name (sha, `<rev>:<path>`...). Requests are written to
+    the process by a thread while its answers are read, so that reading many objects
+    costs a single process and no round trip per object. Parsed ADR headers are kept
+    in a small LRU cache, keyed by the sha of their blob and their path.
+    """
+
+    def __init__(self, git_dir: Path, header_cache_size: int = GIT_HEADER_CACHE_SIZE):
+        self.git_dir = git_dir
+        self.header_cache_size = header_cache_size
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._headers: "OrderedDict[Tuple[str, str], AdrHeader]" = OrderedDict()
+
+    def _started_process(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "--git-dir", str(self.git_dir), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        return self._process
+
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.stdin.close()  # type: ignore[union-attr]
+            self._process.wait()
+            self._process.stdout.close()  # type: ignore[union-attr]
+            self._process = None
+
+    def read_objects(self, names: Sequence[str]) -> List[Optional[GitObject]]:
+        """
+        Read objects, in one batch.
+
+        Returns: the sha, type and content of each object (`None` if it does not
+            exist), in the order of `names`
+
+        """
+        with self._lock:
+            process = self._started_process()
+            writer = threading.Thread(
+                target=self._write_requests, args=(process.stdin, names), daemon=True
+            )
+            writer.start()
+            try:
+                return [self._read_object(process.stdout) for _ in names]  # type: ignore
+            finally:
+                writer.join()
+
+    @staticmethod
+    def _write_requests(stdin: IO[bytes], names: Sequence[str]) -> None:
+        for name in names:
+            stdin.write(name.encode("utf-8") + b"\n")
+        stdin.flush()
+
+    @staticmethod
+    def _read_object(stdout: IO[bytes]) -> Optional[GitObject]:
+        line = stdout.readline().rstrip(b"\n")
+        if line.endswith((b" missing", b" ambiguous")):
+            # checked first: the name may contain spaces
+            return None
+        sha, object_type, size = line.split(b" ")
+        content = stdout.read(int(size))
+        stdout.read(1)
+        return sha.decode(), object_type.decode(), content
+
+    def check_objects(self, names: Sequence[str]) -> List[Optional[Tuple[str, str]]]:
+        """
+        Resolve objects without reading them, in one `git cat-file --batch-check`.
+
+        Returns: the sha and type of each object (`None` if it does not exist), in
+            the order of `names`
+
+        """
+        if not names:
+            return []
+        output = subprocess.run(
+            ["git", "--git-dir", str(self.git_dir), "cat-file", "--batch-check"],
+            input="".join(f"{name}\n" for name in names).encode("utf-8"),
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout.decode("utf-8")
+        results: List[Optional[Tuple[str, str]]] = []
+        for line in output.splitlines():
+            if line.endswith((" missing", " ambiguous")):
+                results.append(None)
+            else:
+                sha, object_type, _ = line.split(" ")
+                results.append((sha, object_type))
+        return results
+
+    def read_tree(self, name: str) -> Optional[List[GitTreeEntry]]:
+        """Mode, name and sha of the entries of a tree (`None` if not a tree)."""
+        tree = self.read_objects([name])[0]
+        if tree is None or tree[1] != "tree":
+            return None
+        return self._parse_tree(tree[2])
+
+    @staticmethod
+    def _parse_tree(content: bytes) -> List[GitTreeEntry]:
+        entries = []
+        position = 0
+        while position < len(content):
+            name_end = content.index(b"\0", position)
+            mode, entry_name = content[position:name_end].split(b" ", 1)
+            sha = content[name_end + 1 : name_end + 21].hex()
+            entries.append((mode.decode(), entry_name.decode("utf-8"), sha))
+            position = name_end + 21
+        return entries
+
+    def max_adr_number_in_trees(
+        self, commits: Iterable[str], records_path: str
+    ) -> Optional[int]:
+        """
+        Highest number of the numbered ADRs of a records directory at any commit.
+
+        The records directory of each commit is resolved first, so that each
+        distinct tree is only read once, however many commits share it.
+
+        Returns: the number, or `None` if there is no numbered ADR at any commit
+        """
+        checks = self.check_objects(
+            [f"{commit}:{records_path}" for commit in sorted(set(commits))]
+        )
+        tree_shas = sorted(
+            {check[0] for check in checks if check is not None and check[1] == "tree"}
+        )
+        if not tree_shas:
+            return None
+
+        max_number = None
+        for tree in self.read_objects(tree_shas):
+            for _, name, _ in self._parse_tree(tree[2]):  # type: ignore[index]
+                if NUMBERED_ADR_FILENAME_REGEX.match(name):
+                    number = int(name.split("-", 1)[0])
+                    if max_number is None or number > max_number:
+                        max_number = number
+        return max_number
+
+    def read_adr_headers(
+        self, blobs: Sequence[Tuple[str, Path]], source_prefix: str = ""
+    ) -> List[Union[AdrHeader, PyadrAdrFormatError]]:
+        """
+        Parse the headers of ADRs from their blobs, given as (sha, path).
+
+        Returns: the header of each ADR, or its format error, in the order of `blobs`
+
+        """
+        results: Dict[Tuple[str, str], Union[AdrHeader, PyadrAdrFormatError]] = {}
+        for sha, path in blobs:
+            header = self._headers.get((sha, str(path)))
+            if header is not None:
+                self._headers.move_to_end((sha, str(path)))
+                results[(sha, str(path))] = header
+
+        missing = [
+            (sha, path) for sha, path in blobs if (sha, str(path)) not in results
+        ]
+        if not missing:
+            return [results[(sha, str(path))] for sha, path in blobs]
+
+        for (sha, path), blob in zip(
+            missing, self.read_objects([sha for sha, _ in missing])
+        ):
+            try:
+                header = adr_header_from_stream(
+                    io.BytesIO(blob[2] if blob else b""),
+                    path,
+                    stream_source=f"{source_prefix}{path.as_posix()}",
+                )
+            except PyadrAdrFormatError as e:
+                results[(sha, str(path))] = e
+            else:
+                results[(sha, str(path))] = header
+                self._headers[(sha, str(path))] = header
+                if len(self._headers) > self.header_cache_size:
+                    self._headers.popitem(last=False)
+
+        return [results[(sha, str(path))] for sha, path in blobs]
+
+
+_cat_file_batches: Dict[str, GitCatFileBatch] = {}
+
+
+def git_cat_file_batch(repo: Repo) -> GitCatFileBatch:
+    """`git cat-file --batch` reader of a repository, shared by all its users."""
+    git_dir = str(Path(repo.git_dir).resolve())
+    if git_dir not in _cat_file_batches:
+        _cat_file_batches[git_dir] = GitCatFileBatch(Path(git_dir))
+    return _cat_file_batches[git_dir]
+
+
+@atexit.register
+def _close_cat_file_batches() -> None:
+    for cat_file_batch in _cat_file_batches.values():
+        cat_file_batch.close()
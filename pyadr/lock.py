@@ -0,0 +1,93 @@
+"""Advisory lock of an ADR repository, shared by concurrent pyadr processes"""
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+from loguru import logger
+
+from pyadr.const import DEFAULT_LOCK_TIMEOUT, LOCK_POLL_INTERVAL, LOCK_TIMEOUT_ENV_VAR
+from pyadr.exceptions import (
+    PyadrInvalidLockTimeoutError,
+    PyadrRepositoryLockTimeoutError,
+)
+from pyadr.file_utils import make_runtime_dir
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+# locks held by the current process, by resolved path of their lock file
+_held_locks: Dict[str, bool] = {}
+
+
+def lock_timeout() -> float:
+    """Seconds to wait for the repository lock, from the environment."""
+    value = os.environ.get(LOCK_TIMEOUT_ENV_VAR)
+    if value is None:
+        return DEFAULT_LOCK_TIMEOUT
+    try:
+        timeout = float(value)
+    except ValueError:
+        timeout = -1.0
+    if not timeout >= 0:
+        logger.error(
+            f"Environment variable '{LOCK_TIMEOUT_ENV_VAR}' must be a non-negative "
+            f"number of seconds (got '{value}')."
+        )
+        raise PyadrInvalidLockTimeoutError(value)
+    return timeout
+
+
+@contextmanager
+def repository_lock(
+    lock_path: Path, exclusive: bool, timeout: float, create: bool = True
+) -> Iterator[None]:
+    """
+    Hold the advisory lock of a repository, shared or exclusive.
+
+    The lock is a `flock` on `lock_path`, polled until `timeout` seconds have
+    passed. Nested uses within a process reuse the lock already held. Where `fcntl`
+    is not available, or the lock file cannot be created (e.g. read-only checkout),
+    no lock is taken. With `create` False, the lock file is not created either: no
+    lock is taken if it does not exist yet.
+    """
+    key = str(lock_path.resolve())
+    if fcntl is None or key in _held_locks:
+        yield
+        return
+
+    try:
+        if create:
+            make_runtime_dir(lock_path.parent)
+        # append mode creates the lock file without truncating it
+        lock_file = lock_path.open("a" if create else "r")
+    except OSError as e:
+        logger.debug(f"Could not open lock file '{lock_path}', not locking: {e}")
+        yield
+        return
+
+    with lock_file:
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), operation | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    logger.error(
+                        f"Repository locked by another process for more than "
+                        f"{timeout:g}s (lock file '{lock_path}')."
+                    )
+                    raise PyadrRepositoryLockTimeoutError(lock_path)
+                time.sleep(LOCK_POLL_INTERVAL)
+
+        _held_locks[key] = exclusive
+        try:
+            yield
+        finally:
+            del _held_locks[key]
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
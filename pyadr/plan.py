@@ -0,0 +1,306 @@
+"""Plan of the changes of a command, computed without touching the disk or git"""
+import difflib
+import io
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set
+
+from pyadr.const import PLAN_FORMAT_JSON
+
+
+class ChangePlan(object):
+    """
+    In-memory overlay of the files of a repository, changed by a command run in
+    dry-run mode (see `planned_changes()`).
+
+    Files written, renamed or removed by the command only change in the overlay,
+    through which files are read and directories listed (see `open_file()`,
+    `list_files()`...): the command runs as usual, in a single pass, without a
+    single write. Other changes (e.g. to the git index) are recorded with
+    `record()`. The plan then lists the changes in the order they are first made,
+    each file once, with the diff of its final content.
+    """
+
+    def __init__(self, base_path: Optional[Path] = None):
+        self.base_path = base_path or Path.cwd()
+        # content of the files written (`None` for the ones removed), by path
+        self.files: Dict[str, Optional[bytes]] = {}
+        # path on disk of the (original) content of the files renamed, by path
+        self.origins: Dict[str, str] = {}
+        self.directories: Set[str] = set()
+        self.removed_directories: Set[str] = set()
+        self.operations: List[Dict[str, Any]] = []
+
+    ###########################################
+    # OVERLAY
+    ###########################################
+    def _disk_path(self, key: str) -> Optional[str]:
+        """Path on disk of the content of a file, `None` if it has none."""
+        if key in self.origins:
+            return self.origins[key]
+        if any(
+            key.startswith(directory + os.sep) for directory in self.removed_directories
+        ):
+            return None
+        return key
+
+    def exists(self, path: Path) -> bool:
+        key = os.path.abspath(path)
+        if key in self.files:
+            return self.files[key] is not None
+        if key in self.directories:
+            return True
+        disk_path = self._disk_path(key)
+        return (
+            disk_path is not None
+            and disk_path not in self.removed_directories
+            and os.path.exists(disk_path)
+        )
+
+    def open(self, path: Path) -> BinaryIO:
+        key = os.path.abspath(path)
+        if key in self.files:
+            content = self.files[key]
+            if content is None:
+                raise FileNotFoundError(2, "No such file (removed)", str(path))
+            return io.BytesIO(content)
+        disk_path = self._disk_path(key)
+        if disk_path is None:
+            raise FileNotFoundError(2, "No such file (removed)", str(path))
+        return open(disk_path, "rb")
+
+    def list_files(self, directory: Path) -> List[str]:
+        key = os.path.abspath(directory)
+        names: Set[str] = set()
+        disk_directory = self._disk_path(key)
+        if (
+            disk_directory is not None
+            and disk_directory not in self.removed_directories
+        ):
+            try:
+                with os.scandir(disk_directory) as entries:
+                    names.update(entry.name for entry in entries if entry.is_file())
+            except FileNotFoundError:
+                pass
+        for path in list(self.files) + list(self.origins):
+            if os.path.dirname(path) == key:
+                names.add(os.path.basename(path))
+        return [name for name in names if self.exists(Path(key, name))]
+
+    ###########################################
+    # CHANGES
+    ###########################################
+    def write(self, path: Path, content: bytes) -> None:
+        key = os.path.abspath(path)
+        self.files[key] = content
+        self.operations.append({"operation": "write", "path": key})
+
+    def rename(self, path: Path, renamed_path: Path) -> None:
+        key, renamed_key = os.path.abspath(path), os.path.abspath(renamed_path)
+        content = self.files.get(key)
+        self.files.pop(renamed_key, None)
+        self.origins[renamed_key] = self.origins.pop(key, key)
+        self.files[key] = None
+        self.operations.append(
+            {"operation": "rename", "path": key, "renamed_path": renamed_key}
+        )
+        if content is not None:
+            # content written by the command: planned as written to the new path
+            self.write(renamed_path, content)
+
+    def remove(self, path: Path) -> None:
+        key = os.path.abspath(path)
+        self.files[key] = None
+        self.origins.pop(key, None)
+        self.operations.append({"operation": "remove", "path": key})
+
+    def make_directory(self, path: Path) -> None:
+        key = os.path.abspath(path)
+        # the files of a directory removed beforehand stay removed
+        self.directories.add(key)
+        self.operations.append({"operation": "create-directory", "path": key})
+
+    def remove_directory(self, path: Path) -> None:
+        key = os.path.abspath(path)
+        for file_key in [k for k in self.files if k.startswith(key + os.sep)]:
+            del self.files[file_key]
+        self.directories.discard(key)
+        self.removed_directories.add(key)
+        self.operations.append({"operation": "remove-directory", "path": key})
+
+    def record(self, operation: str, **details: Any) -> None:
+        """Record a change other than to a file (e.g. `stage`, `commit`)."""
+        self.operations.append({"operation": operation, **details})
+
+    ###########################################
+    # PLAN
+    ###########################################
+    def changes(self) -> List[Dict[str, Any]]:
+        """
+        Changes in the order they are first made.
+
+        The successive writes of a file are merged into one change (`create` or
+        `update`), with the diff of its final content from its original one (the
+        content of the file it was renamed from, if any). Files written with their
+        original content are left out.
+        """
+        changes = []
+        written = set()
+        for operation in self.operations:
+            if operation["operation"] != "write":
+                changes.append(self._relative(operation))
+                continue
+
+            key = operation["path"]
+            if key in written or self.files.get(key) is None:
+                continue
+            written.add(key)
+            original = self._original_content(key)
+            if original == self.files[key]:
+                continue
+            changes.append(
+                {
+                    "operation": "create" if original is None else "update",
+                    "path": self._relative_path(key),
+                    "diff": self._diff(key, original, self.files[key]),  # type: ignore
+                }
+            )
+        return changes
+
+    def _original_content(self, key: str) -> Optional[bytes]:
+        disk_path = self.origins.get(key, key)
+        try:
+            with open(disk_path, "rb") as f:
+                return f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def _diff(self, key: str, original: Optional[bytes], content: bytes) -> str:
+        path = self._relative_path(key)
+        origin = self._relative_path(self.origins.get(key, key))
+        return "".join(
+            difflib.unified_diff(
+                (original or b"").decode("utf-8").splitlines(keepends=True),
+                content.decode("utf-8").splitlines(keepends=True),
+                fromfile="/dev/null" if original is None else f"a/{origin}",
+                tofile=f"b/{path}",
+            )
+        )
+
+    def _relative(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        relative = dict(operation)
+        for name in ("path", "renamed_path"):
+            if name in relative:
+                relative[name] = self._relative_path(relative[name])
+        if "paths" in relative:
+            relative["paths"] = [self._relative_path(p) for p in relative["paths"]]
+        return relative
+
+    def _relative_path(self, path: str) -> str:
+        return Path(os.path.relpath(path, self.base_path)).as_posix()
+
+    def render(self, plan_format: str) -> str:
+        changes = self.changes()
+        if plan_format == PLAN_FORMAT_JSON:
+            return json.dumps({"changes": changes}, indent=2) + "\n"
+
+        lines = []
+        for change in changes:
+            details = [
+                " ".join(value)
+                if isinstance(value, list)
+                else json.dumps(value)
+                if isinstance(value, str) and "\n" in value
+                else str(value)
+                for name, value in change.items()
+                if name not in ("operation", "diff")
+            ]
+            lines.append(" ".join([change["operation"], *details]) + "\n")
+            if change.get("diff"):
+                lines.append(change["diff"])
+        return "".join(lines) or "No change.\n"
+
+
+_current_plan: Optional[ChangePlan] = None
+
+
+@contextmanager
+def planned_changes() -> Iterator[ChangePlan]:
+    """Run commands in dry-run mode, their changes planned instead of made."""
+    global _current_plan
+    plan = _current_plan = ChangePlan()
+    try:
+        yield plan
+    finally:
+        _current_plan = None
+
+
+def current_plan() -> Optional[ChangePlan]:
+    """Plan of the current dry run (`None` if not in dry-run mode)."""
+    return _current_plan
+
+
+def open_file(path: Path) -> BinaryIO:
+    """Open a file for reading (in binary mode), as changed by the current dry run."""
+    if _current_plan is not None:
+        return _current_plan.open(path)
+    return path.open("rb")
+
+
+def file_exists(path: Path) -> bool:
+    if _current_plan is not None:
+        return _current_plan.exists(path)
+    return path.exists()
+
+
+def list_files(directory: Path) -> List[str]:
+    """Names of the files of a directory, in no particular order."""
+    if _current_plan is not None:
+        return _current_plan.list_files(directory)
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.is_file()]
+
+
+def rename_file(path: Path, renamed_path: Path) -> None:
+    if _current_plan is not None:
+        _current_plan.rename(path, renamed_path)
+        return
+    path.rename(renamed_path)
+
+
+def remove_file(path: Path) -> None:
+    if _current_plan is not None:
+        _current_plan.remove(path)
+        return
+    path.unlink()
+
+
+def make_directory(path: Path, parents: bool = False, exist_ok: bool = False) -> None:
+    if _current_plan is not None:
+        if not _current_plan.exists(path):
+            _current_plan.make_directory(path)
+        elif not exist_ok:
+            raise FileExistsError(17, "File exists", str(path))
+        return
+    path.mkdir(parents=parents, exist_ok=exist_ok)
+
+
+def remove_empty_directory(path: Path) -> None:
+    if _current_plan is not None:
+        if not _current_plan.exists(path):
+            raise FileNotFoundError(2, "No such directory", str(path))
+        if _current_plan.list_files(path):
+            raise OSError(39, "Directory not empty", str(path))
+        _current_plan.remove_directory(path)
+        return
+    path.rmdir()
+
+
+def remove_tree(path: Path) -> None:
+    if _current_plan is not None:
+        _current_plan.remove_directory(path)
+        return
+    shutil.rmtree(path)
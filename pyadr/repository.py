@@ -0,0 +1,339 @@
+"""In-memory index of the ADRs of a records directory"""
+import bisect
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from pyadr.cache import AdrHeaderCache, AdrIdCache
+from pyadr.const import (
+    ADR_ID_REGEX_WITH_SEPARATOR,
+    NON_ADR_FILE_NAMES,
+    TOC_HEADERS_BATCH_SIZE,
+)
+from pyadr.content_utils import (
+    NUMBER_PREFIX_REGEX,
+    AdrHeader,
+    adr_header_from_file,
+    adr_header_from_stream,
+    adr_sort_key,
+    format_adr_id,
+    parse_adrs,
+)
+from pyadr.exceptions import PyadrAdrFormatError, PyadrNoNumberedAdrError
+from pyadr.file_utils import max_adr_number
+from pyadr.plan import ChangePlan
+
+NUMBERED_ADR_FILENAME_REGEX = re.compile(r"^" + ADR_ID_REGEX_WITH_SEPARATOR)
+
+
+class AdrRepository(object):
+    """
+    Index of the ADRs of a records directory, built once per command.
+
+    The directory is scanned once, on first use, and each ADR is parsed at most once
+    (through the header cache if one is given). Files are indexed by id and by number,
+    and parsed records by status.
+
+    Changes made to the directory while the repository is in use must be recorded
+    with `record_rename()` and `record_change()` to keep it in sync.
+
+    Next ids are computed from the highest ADR number of the directory, taken from
+    the id cache if one is given and the directory has not changed since, without
+    listing the directory.
+    """
+
+    def __init__(
+        self,
+        records_path: Path,
+        paths: Optional[Iterable[Path]] = None,
+        header_cache: Optional[AdrHeaderCache] = None,
+        id_cache: Optional[AdrIdCache] = None,
+    ):
+        self.records_path = records_path
+        self.header_cache = header_cache
+        self.id_cache = id_cache
+        self._paths: Optional[List[Path]] = (
+            None if paths is None else sorted(paths, key=adr_sort_key)
+        )
+        self._headers: Dict[Path, Union[AdrHeader, PyadrAdrFormatError]] = {}
+        self._by_id: Optional[Dict[str, List[Path]]] = None
+        self._by_number: Optional[Dict[int, List[Path]]] = None
+        self._by_status: Optional[Dict[str, List[AdrHeader]]] = None
+        self._max_number: Optional[int] = None
+
+    ###########################################
+    # DIRECTORY LISTING
+    ###########################################
+    @property
+    def paths(self) -> List[Path]:
+        """All files of the records directory, sorted by number (see `adr_sort_key()`)."""
+        if self._paths is None:
+            self._paths = self._scan()
+        return self._paths
+
+    def exists(self) -> bool:
+        return self.records_path.exists()
+
+    def _scan(self) -> List[Path]:
+        try:
+            return sorted(
+                (self.records_path / name for name in self._list_files()),
+                key=adr_sort_key,
+            )
+        except FileNotFoundError:
+            return []
+
+    def _list_files(self) -> List[str]:
+        with os.scandir(self.records_path) as entries:
+            return [entry.name for entry in entries if entry.is_file()]
+
+    @property
+    def adr_files(self) -> List[Path]:
+        return [
+            path
+            for path in self.paths
+            if path.suffix == ".md" and path.name not in NON_ADR_FILE_NAMES
+        ]
+
+    @property
+    def numbered_files(self) -> List[Path]:
+        return [path for path in self.paths if self.is_numbered(path)]
+
+    @staticmethod
+    def is_numbered(path: Path) -> bool:
+        return bool(NUMBERED_ADR_FILENAME_REGEX.match(path.name))
+
+    ###########################################
+    # PARSING
+    ###########################################
+    def header(self, path: Path) -> AdrHeader:
+        """Header of one ADR, which does not need to be in the records directory."""
+        result = self._headers.get(path)
+        if result is None:
+            try:
+                result = self._parse_file(path)
+            except PyadrAdrFormatError as e:
+                result = e
+            self._headers[path] = result
+        if isinstance(result, PyadrAdrFormatError):
+            raise result
+        return result
+
+    def _parse_file(self, path: Path) -> AdrHeader:
+        return adr_header_from_file(path)
+
+    def parse(
+        self, paths: Sequence[Path], jobs: int = 1
+    ) -> List[Union[AdrHeader, PyadrAdrFormatError]]:
+        """
+        Parse the headers of ADRs not parsed yet, in one batch.
+
+        Returns: the header of each ADR, or its format error, in the order of `paths`
+
+        """
+        missing = [path for path in paths if path not in self._headers]
+        if missing:
+            self._headers.update(zip(missing, self._parse_files(missing, jobs)))
+        return [self._headers[path] for path in paths]
+
+    def _parse_files(
+        self, paths: Sequence[Path], jobs: int = 1
+    ) -> List[Union[AdrHeader, PyadrAdrFormatError]]:
+        if self.header_cache is not None:
+            return self.header_cache.adr_headers_from_files(paths, jobs)
+        return parse_adrs(paths, jobs, parser=self._parse_file)
+
+    def headers(self, paths: Sequence[Path], jobs: int = 1) -> List[AdrHeader]:
+        """Same as `parse()`, but raises the first format error found."""
+        headers = []
+        for result in self.parse(paths, jobs):
+            if isinstance(result, PyadrAdrFormatError):
+                raise result
+            headers.append(result)
+        return headers
+
+    def iter_headers(
+        self,
+        paths: Sequence[Path],
+        jobs: int = 1,
+        batch_size: int = TOC_HEADERS_BATCH_SIZE,
+    ) -> Iterator[AdrHeader]:
+        """
+        Same as `headers()`, but parses and yields the headers batch by batch.
+
+        The headers parsed are not kept by the repository: only `batch_size` of them
+        are held at a time (besides the entries of the header cache, if any).
+        """
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start : start + batch_size]
+            missing = [path for path in batch if path not in self._headers]
+            parsed = dict(zip(missing, self._parse_files(missing, jobs)))
+            for path in batch:
+                result = parsed[path] if path in parsed else self._headers[path]
+                if isinstance(result, PyadrAdrFormatError):
+                    raise result
+                yield result
+
+    ###########################################
+    # INDEXES
+    ###########################################
+    @property
+    def by_id(self) -> Dict[str, List[Path]]:
+        """Numbered files of the records directory, by id (from their filename)."""
+        if self._by_id is None:
+            self._by_id = {}
+            for path in self.numbered_files:
+                self._by_id.setdefault(path.name.split("-", 1)[0], []).append(path)
+        return self._by_id
+
+    @property
+    def by_number(self) -> Dict[int, List[Path]]:
+        """
+        ADR files by the number their filename starts with, whatever its format.
+
+        Files whose ids only differ by their padding (e.g. `0012-` and `012-`) end up
+        under the same number.
+        """
+        if self._by_number is None:
+            self._by_number = {}
+            for path in self.adr_files:
+                match = NUMBER_PREFIX_REGEX.match(path.name)
+                if match:
+                    self._by_number.setdefault(int(match.group(1)), []).append(path)
+        return self._by_number
+
+    @property
+    def by_status(self) -> Dict[str, List[AdrHeader]]:
+        """ADRs with a valid content format, by status."""
+        if self._by_status is None:
+            by_status: Dict[str, List[AdrHeader]] = {}
+            for result in self.parse(self.adr_files):
+                if isinstance(result, AdrHeader):
+                    by_status.setdefault(result.status, []).append(result)
+            self._by_status = by_status
+        return self._by_status
+
+    def next_ids(self, count: int) -> List[str]:
+        """Consecutive ids following the highest id of the records directory."""
+        max_number = self.max_number()
+        if max_number is None:
+            raise PyadrNoNumberedAdrError()
+        return [
+            format_adr_id(number)
+            for number in range(max_number + 1, max_number + 1 + count)
+        ]
+
+    def max_number(self) -> Optional[int]:
+        """
+        Highest number of the numbered ADRs of the records directory.
+
+        Taken from the files already listed (or listed now, without an id cache),
+        or else from the id cache if the directory has not changed since it was
+        recorded, or else from an unsorted scan of the directory.
+
+        Returns: the number, or `None` if there is no numbered ADR
+        """
+        if self._max_number is None:
+            if self._paths is not None or self.id_cache is None:
+                self._max_number = max(
+                    (int(adr_id) for adr_id in self.by_id), default=None
+                )
+            else:
+                self._max_number = self.id_cache.get(self.records_path)
+                if self._max_number is None:
+                    # stat before scanning, so that a change made while scanning is
+                    # caught at next run
+                    stat = os.stat(self.records_path)
+                    self._max_number = max_adr_number(self.records_path)
+                    if self._max_number is not None:
+                        self.id_cache.put(self.records_path, self._max_number, stat)
+        return self._max_number
+
+    def save_id_cache(self) -> None:
+        """
+        Record the highest ADR number in the id cache, once changes are all made.
+
+        The directory is stat-ed again, so that the mark stays valid after the
+        changes recorded with `record_rename()` and `record_change()`.
+        """
+        if self.id_cache is None or self._max_number is None:
+            return
+        try:
+            stat = os.stat(self.records_path)
+        except OSError:
+            return
+        self.id_cache.put(self.records_path, self._max_number, stat)
+        self.id_cache.save()
+
+    def save_header_cache(self) -> None:
+        if self.header_cache is not None:
+            self.header_cache.save()
+
+    ###########################################
+    # CHANGES
+    ###########################################
+    def _records_file(self, path: Path) -> Optional[Path]:
+        """Path of a file as listed in the records directory, if it is in it."""
+        if path.parent == self.records_path:
+            return path
+        if path.parent.resolve() == self.records_path.resolve():
+            return self.records_path / path.name
+        return None
+
+    def record_rename(self, path: Path, renamed_path: Path) -> None:
+        self._headers.pop(path, None)
+        records_file = self._records_file(path)
+        if self._paths is not None and records_file is not None:
+            try:
+                self._paths.remove(records_file)
+            except ValueError:
+                pass
+            self._headers.pop(records_file, None)
+        self.record_change(renamed_path)
+
+    def record_change(self, path: Path) -> None:
+        """Record that a file was created or modified, so it is parsed again."""
+        self._headers.pop(path, None)
+        records_file = self._records_file(path)
+        if records_file is not None:
+            self._headers.pop(records_file, None)
+            if self._paths is not None and records_file not in self._paths:
+                self._paths.insert(
+                    bisect.bisect(
+                        [adr_sort_key(path) for path in self._paths],
+                        adr_sort_key(records_file),
+                    ),
+                    records_file,
+                )
+            if self._max_number is not None and self.is_numbered(records_file):
+                self._max_number = max(
+                    self._max_number, int(records_file.name.split("-", 1)[0])
+                )
+        self._by_id = None
+        self._by_number = None
+        self._by_status = None
+
+
+class PlannedAdrRepository(AdrRepository):
+    """
+    Index of the ADRs of a records directory, as changed by the commands of a dry run.
+
+    Files are listed and read through the overlay of the plan of the dry run (see
+    `ChangePlan`). The caches are not used, as they are keyed by the stats of files
+    on disk.
+    """
+
+    def __init__(self, records_path: Path, plan: ChangePlan):
+        super().__init__(records_path)
+        self.plan = plan
+
+    def exists(self) -> bool:
+        return self.plan.exists(self.records_path)
+
+    def _list_files(self) -> List[str]:
+        return self.plan.list_files(self.records_path)
+
+    def _parse_file(self, path: Path) -> AdrHeader:
+        with self.plan.open(path) as f:
+            return adr_header_from_stream(f, path)
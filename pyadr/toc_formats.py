@@ -0,0 +1,127 @@
+"""Renderers of the table of content of ADRs, one per format.
+
+Each renderer makes a single pass over the parsed ADR headers and generates its
+output line by line (or record by record), so that it can be streamed to a file.
+"""
+import csv
+import html
+import io
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from pyadr.const import TOC_FORMAT_MARKDOWN, TOC_RECORD_FIELDS
+from pyadr.content_utils import (
+    AdrHeader,
+    iter_toc_content_from_adr_headers,
+    new_adrs_by_status,
+    spooled_toc_sections,
+)
+
+TocRenderer = Callable[[Path, Iterable[AdrHeader]], Iterator[str]]
+
+
+def toc_record(records_path: Path, header: AdrHeader) -> Dict[str, Any]:
+    return {
+        "id": header.id,
+        "title": header.title,
+        "status": header.status,
+        "status_phrase": header.status_phrase,
+        "date": header.date,
+        "path": str(header.path.relative_to(records_path)),
+    }
+
+
+def iter_json_toc(
+    records_path: Path, adr_headers: Iterable[AdrHeader]
+) -> Iterator[str]:
+    separator = "[\n"
+    for header in adr_headers:
+        yield separator
+        yield "  " + json.dumps(toc_record(records_path, header), ensure_ascii=False)
+        separator = ",\n"
+    yield "[]\n" if separator == "[\n" else "\n]\n"
+
+
+def iter_jsonl_toc(
+    records_path: Path, adr_headers: Iterable[AdrHeader]
+) -> Iterator[str]:
+    for header in adr_headers:
+        yield json.dumps(toc_record(records_path, header), ensure_ascii=False) + "\n"
+
+
+def iter_csv_toc(records_path: Path, adr_headers: Iterable[AdrHeader]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TOC_RECORD_FIELDS, lineterminator="\n")
+
+    def flush() -> str:
+        row = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return row
+
+    writer.writeheader()
+    yield flush()
+    for header in adr_headers:
+        writer.writerow(toc_record(records_path, header))
+        yield flush()
+
+
+def iter_html_toc(
+    records_path: Path, adr_headers: Iterable[AdrHeader]
+) -> Iterator[str]:
+    def build_entry(header: AdrHeader) -> str:
+        link = html.escape(str(header.path.relative_to(records_path)))
+        entry = (
+            f'<li><a href="{link}">'
+            f"{html.escape(header.id)} - {html.escape(header.title)}</a>"
+        )
+        if header.status_phrase:
+            entry += (
+                f": {html.escape(header.status)} {html.escape(header.status_phrase)}"
+            )
+        return entry + "</li>\n"
+
+    def iter_section(level: int, title: str, entries: Iterable[str]) -> Iterator[str]:
+        yield f"<h{level}>{title}</h{level}>\n"
+        yield "<ul>\n"
+        empty = True
+        for entry in entries:
+            empty = False
+            yield entry
+        if empty:
+            yield "<li>None</li>\n"
+        yield "</ul>\n"
+
+    yield "<!DOCTYPE html>\n"
+    yield (
+        "<!-- This file has been generated by `pyadr`. Manual changes will be "
+        "erased at next generation. -->\n"
+    )
+    yield '<html>\n<head>\n<meta charset="utf-8">\n'
+    yield "<title>Architecture Decision Records</title>\n</head>\n<body>\n"
+    yield "<h1>Architecture Decision Records</h1>\n"
+    with spooled_toc_sections(adr_headers, build_entry) as (
+        sections,
+        non_standard_sections,
+    ):
+        for title, entries in sections:
+            yield from iter_section(2, html.escape(title), entries)
+
+        yield f"<h2>{new_adrs_by_status()['non-standard']['status-title']}</h2>\n"
+        for status, entries in non_standard_sections:
+            yield from iter_section(
+                3, f"Status <code>{html.escape(status)}</code>", entries
+            )
+        if not non_standard_sections:
+            yield "<ul>\n<li>None</li>\n</ul>\n"
+    yield "</body>\n</html>\n"
+
+
+TOC_RENDERERS: Dict[str, TocRenderer] = {
+    TOC_FORMAT_MARKDOWN: iter_toc_content_from_adr_headers,
+    "json": iter_json_toc,
+    "jsonl": iter_jsonl_toc,
+    "csv": iter_csv_toc,
+    "html": iter_html_toc,
+}
@@ -0,0 +1,178 @@
+"""Table of content split into one page per status and one page per range of ids.
+
+The root table of content (`index.md`) only links to the pages (shards). A manifest
+keeps the hash of the records of each shard, so that only the shards whose records
+changed are generated again.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from loguru import logger
+from slugify import slugify
+
+from pyadr.const import (
+    TOC_FILE_NAME,
+    TOC_SHARD_ID_RANGE,
+    TOC_SHARDS_DIR_NAME,
+    TOC_SHARDS_FORMAT_VERSION,
+)
+from pyadr.content_utils import (
+    STANDARD_TOC_STATUSES,
+    AdrHeader,
+    build_toc_entry,
+    format_adr_id,
+    new_adrs_by_status,
+)
+from pyadr.plan import open_file
+
+
+class TocShard(object):
+    """Page of the sharded table of content, listing some of the ADRs."""
+
+    __slots__ = ("name", "title", "adr_headers")
+
+    def __init__(self, name: str, title: str):
+        self.name = name
+        self.title = title
+        self.adr_headers: List[AdrHeader] = []
+
+    def digest(self, records_path: Path) -> str:
+        """Hash of everything the shard is generated from."""
+        digest = hashlib.sha256(f"{TOC_SHARDS_FORMAT_VERSION}\n{self.title}\n".encode())
+        for header in self.adr_headers:
+            digest.update(
+                json.dumps(
+                    [
+                        str(header.path.relative_to(records_path)),
+                        header.title,
+                        header.status,
+                        header.status_phrase,
+                    ]
+                ).encode("utf-8")
+            )
+        return digest.hexdigest()
+
+    def iter_content(self, records_path: Path) -> Iterator[str]:
+        yield (
+            "<!-- This file has been generated by `pyadr`. Manual changes will be "
+            "erased at next generation. -->\n"
+        )
+        yield f"# {self.title}\n"
+        yield "\n"
+        yield f"[Back to the table of content](../{TOC_FILE_NAME})\n"
+        yield "\n"
+        for header in self.adr_headers:
+            yield build_toc_entry(
+                header, str(Path("..", header.path.relative_to(records_path)))
+            )
+        if not self.adr_headers:
+            yield "* None\n"
+
+
+def shard_adr_headers(adr_headers: Iterable[AdrHeader]) -> Dict[str, TocShard]:
+    """
+    Distribute ADRs in the shards of the table of content, in a single pass.
+
+    Returns: the shards by name, the ones of statuses first (standard statuses
+        always have one, and each other status has its own, see
+        `_unique_shard_name()`), then the ones of id ranges in ascending order
+
+    """
+    titles = new_adrs_by_status()
+    status_shards = {
+        status: TocShard(f"status-{slugify(status)}.md", titles[status]["status-title"])
+        for status in STANDARD_TOC_STATUSES
+    }
+    range_shards: Dict[int, TocShard] = {}
+
+    for header in adr_headers:
+        shard = status_shards.get(header.status)
+        if shard is None:
+            shard = status_shards[header.status] = TocShard(
+                _unique_shard_name(
+                    f"status-{slugify(header.status)}",
+                    {shard.name for shard in status_shards.values()},
+                ),
+                f"Status `{header.status}`",
+            )
+        shard.adr_headers.append(header)
+
+        start = int(header.id) // TOC_SHARD_ID_RANGE * TOC_SHARD_ID_RANGE
+        shard = range_shards.get(start)
+        if shard is None:
+            end = start + TOC_SHARD_ID_RANGE - 1
+            start_id, end_id = format_adr_id(start), format_adr_id(end)
+            shard = range_shards[start] = TocShard(
+                f"ids-{start_id}-{end_id}.md", f"Records {start_id} to {end_id}"
+            )
+        shard.adr_headers.append(header)
+
+    shards = {shard.name: shard for shard in status_shards.values()}
+    shards.update((shard.name, shard) for _, shard in sorted(range_shards.items()))
+    return shards
+
+
+def _unique_shard_name(stem: str, names: Set[str]) -> str:
+    """
+    Name of a new shard, suffixed with a number if already taken.
+
+    Statuses differing only by case or punctuation (e.g. `Accepted` and
+    `accepted`) have the same slug, but each gets its own shard.
+    """
+    name = f"{stem}.md"
+    suffix = 1
+    while name in names:
+        suffix += 1
+        name = f"{stem}-{suffix}.md"
+    return name
+
+
+def iter_sharded_toc_index(shards: Iterable[TocShard]) -> Iterator[str]:
+    """Generate the lines of the root table of content, linking to the shards."""
+    yield (
+        "<!-- This file has been generated by `pyadr`. Manual changes will be "
+        "erased at next generation. -->\n"
+    )
+    yield "# Architecture Decision Records\n"
+    section = None
+    for shard in shards:
+        shard_section = (
+            "Records by status" if shard.name.startswith("status-") else "Records by id"
+        )
+        if shard_section != section:
+            section = shard_section
+            yield "\n"
+            yield f"## {section}\n"
+            yield "\n"
+        yield (
+            f"* [{shard.title}]({TOC_SHARDS_DIR_NAME}/{shard.name}) "
+            f"({len(shard.adr_headers)})\n"
+        )
+
+
+def load_shards_manifest(manifest_path: Path) -> Dict[str, str]:
+    """Hashes of the shards by name, as of the last generation."""
+    try:
+        with open_file(manifest_path) as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.debug(f"Ignoring unreadable manifest '{manifest_path}'.")
+        return {}
+
+    if not isinstance(raw, dict) or raw.get("version") != TOC_SHARDS_FORMAT_VERSION:
+        return {}
+    shards: Optional[Dict[str, str]] = raw.get("shards")
+    return shards if isinstance(shards, dict) else {}
+
+
+def iter_shards_manifest(shard_digests: Dict[str, str]) -> Iterator[str]:
+    yield json.dumps(
+        {"version": TOC_SHARDS_FORMAT_VERSION, "shards": shard_digests},
+        indent=2,
+        sort_keys=True,
+    )
+    yield "\n"
@@ -235,6 +235,14 @@ def test(context):
     )
 
 
+@task
+def benchmark(context):
+    """
+    Run timing and memory benchmarks (not run with unit tests)
+    """
+    context.run("poetry run pytest -m benchmark tests")
+
+
 @task(aliases=["tox-test-default-version", "tox-py"])
 def tox_test(context):
     """
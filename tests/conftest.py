@@ -12,10 +12,24 @@ from pyadr.git.core import GitAdrCore
 LOGGING_VERBOSE = 18
 LOGGING_VERY_VERBOSE = 16
 
+ADR_CONTENT = """# {title}
+
+* Status: {status}
+* Date: 2020-03-26
+
+## Context and Problem Statement
+
+[..]
+"""
+
 logger.level("VERBOSE", LOGGING_VERBOSE, color="<bold>", icon="🔈️")
 logger.level("VERY_VERBOSE", LOGGING_VERY_VERBOSE, color="<bold>", icon="🔊")
 
 
+def write_adr(path, title, status="accepted"):
+    path.write_text(ADR_CONTENT.format(title=title, status=status))
+
+
 @pytest.fixture()
 def adr_tmp_path(tmp_path):
     path = tmp_path / DEFAULT_ADR_PATH
@@ -0,0 +1,110 @@
+import timeit
+import tracemalloc
+from functools import lru_cache
+from pathlib import Path
+
+import pytest
+from hamcrest import assert_that, calling, less_than, raises
+
+from pyadr import content_utils
+from pyadr.content_utils import AdrHeader, iter_toc_content_from_adr_headers
+from pyadr.exceptions import PyadrSomeAdrIdsNotUniqueError
+from pyadr.repository import AdrRepository
+
+RECORDS_PATH = Path("docs", "adr")
+
+
+@lru_cache()
+def synthetic_adr_files(count):
+    files = [
+        RECORDS_PATH / f"{number:04d}-adr-number-{number}.md" for number in range(count)
+    ]
+    # a few collisions, one of them between ids of different formats
+    files.append(RECORDS_PATH / "0012-another-adr-number-12.md")
+    files.append(RECORDS_PATH / "012-yet-another-adr-number-12.md")
+    files.append(RECORDS_PATH / "0500-another-adr-number-500.md")
+    return tuple(files)
+
+
+def time_check_adr_numbers_unique(adr_core, count):
+    files = synthetic_adr_files(count)
+
+    def build_repository():
+        adr_core._adr_repository = AdrRepository(RECORDS_PATH, files)
+
+    def run_check():
+        try:
+            adr_core._check_adr_numbers_unique()
+        except PyadrSomeAdrIdsNotUniqueError:
+            pass
+
+    return min(timeit.repeat(run_check, setup=build_repository, number=1, repeat=3))
+
+
+def test_check_adr_numbers_unique_reports_collisions_across_id_formats(adr_core):
+    # Given
+    adr_core._adr_repository = AdrRepository(
+        RECORDS_PATH,
+        [RECORDS_PATH / "0012-an-adr.md", RECORDS_PATH / "012-another-adr.md"],
+    )
+
+    # When
+    # Then
+    assert_that(
+        calling(adr_core._check_adr_numbers_unique),
+        raises(PyadrSomeAdrIdsNotUniqueError),
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [10_000, 100_000])
+def test_check_adr_numbers_unique_scales_linearly(adr_core, count):
+    # Given
+    time_per_file_1k = time_check_adr_numbers_unique(adr_core, 1_000) / 1_000
+
+    # When
+    time_per_file = time_check_adr_numbers_unique(adr_core, count) / count
+
+    # Then
+    # with a quadratic check, the time per file would grow 10x and 100x
+    assert_that(time_per_file, less_than(time_per_file_1k * 5))
+
+
+def peak_memory_generating_toc(count):
+    # `pathlib` interns the parts of all paths: only a thousand different ones are
+    # used, not to measure the growth of the table of interned strings
+    files = synthetic_adr_files(1_000)
+
+    def synthetic_adr_headers():
+        for number in range(count):
+            yield AdrHeader(
+                files[number % 1_000],
+                f"ADR number {number}",
+                "accepted" if number % 3 else f"status-{number % 4}",
+                None,
+                "2020-03-26",
+                0,
+            )
+
+    tracemalloc.start()
+    try:
+        for _ in iter_toc_content_from_adr_headers(
+            RECORDS_PATH, synthetic_adr_headers()
+        ):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark
+def test_toc_generation_memory_does_not_grow_with_adrs(monkeypatch):
+    # Given
+    monkeypatch.setattr(content_utils, "TOC_SPOOL_MAX_SIZE", 64 * 1024)
+    peak_memory_1k = peak_memory_generating_toc(1_000)
+
+    # When
+    peak_memory = peak_memory_generating_toc(100_000)
+
+    # Then
+    assert_that(peak_memory, less_than(max(peak_memory_1k, 4 * 64 * 1024) * 2))
@@ -0,0 +1,186 @@
+import os
+
+import pytest
+from hamcrest import assert_that, equal_to, has_length, none, not_none
+
+from pyadr import cache as cache_module
+from pyadr.cache import AdrHeaderCache, AdrIdCache
+from tests.conftest import write_adr
+
+
+@pytest.fixture(autouse=True)
+def no_racy_window(monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_RACY_WINDOW_NS", 0)
+
+
+@pytest.fixture()
+def cache_path(tmp_path):
+    yield tmp_path / ".adr-cache"
+
+
+def test_header_is_reused_from_persisted_cache(adr_tmp_path, cache_path, mocker):
+    # Given
+    adr_path = adr_tmp_path / "0001-an-adr.md"
+    write_adr(adr_path, "An ADR")
+    cache = AdrHeaderCache(cache_path)
+    cache.adr_header_from_file(adr_path)
+    cache.save()
+    parse = mocker.patch.object(cache_module, "adr_header_from_file")
+
+    # When
+    header = AdrHeaderCache(cache_path).adr_header_from_file(adr_path)
+
+    # Then
+    parse.assert_not_called()
+    assert_that(header.title, equal_to("An ADR"))
+    assert_that(header.slug, equal_to("an-adr"))
+
+
+def test_stale_entry_is_parsed_again(adr_tmp_path, cache_path):
+    # Given
+    adr_path = adr_tmp_path / "0001-an-adr.md"
+    write_adr(adr_path, "An ADR")
+    cache = AdrHeaderCache(cache_path)
+    cache.adr_header_from_file(adr_path)
+    cache.save()
+
+    write_adr(adr_path, "An ADR with a longer title")
+    stat = os.stat(adr_path)
+    os.utime(adr_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    # When
+    header = AdrHeaderCache(cache_path).adr_header_from_file(adr_path)
+
+    # Then
+    assert_that(header.title, equal_to("An ADR with a longer title"))
+
+
+def test_entries_of_deleted_files_are_evicted(adr_tmp_path, cache_path):
+    # Given
+    kept_path = adr_tmp_path / "0001-an-adr.md"
+    deleted_path = adr_tmp_path / "0002-another-adr.md"
+    write_adr(kept_path, "An ADR")
+    write_adr(deleted_path, "Another ADR")
+    cache = AdrHeaderCache(cache_path)
+    cache.adr_header_from_file(kept_path)
+    cache.adr_header_from_file(deleted_path)
+    cache.save()
+    deleted_path.unlink()
+
+    # When
+    cache = AdrHeaderCache(cache_path)
+    cache.adr_header_from_file(kept_path)
+    cache.save()
+
+    # Then
+    cache = AdrHeaderCache(cache_path)
+    assert_that(cache, has_length(1))
+    assert_that(cache.get(kept_path), not_none())
+    assert_that(cache.get(deleted_path), none())
+
+
+def test_number_of_persisted_entries_is_capped(adr_tmp_path, cache_path):
+    # Given
+    cache = AdrHeaderCache(cache_path, max_entries=2)
+    for number in range(1, 4):
+        adr_path = adr_tmp_path / f"000{number}-an-adr.md"
+        write_adr(adr_path, "An ADR")
+        cache.adr_header_from_file(adr_path)
+
+    # When
+    cache.save()
+
+    # Then
+    cache = AdrHeaderCache(cache_path)
+    assert_that(cache, has_length(2))
+    assert_that(cache.get(adr_tmp_path / "0001-an-adr.md"), none())
+
+
+def test_corrupted_cache_is_ignored(adr_tmp_path, cache_path):
+    # Given
+    cache_path.write_text("not json")
+    adr_path = adr_tmp_path / "0001-an-adr.md"
+    write_adr(adr_path, "An ADR")
+
+    # When
+    header = AdrHeaderCache(cache_path).adr_header_from_file(adr_path)
+
+    # Then
+    assert_that(header.title, equal_to("An ADR"))
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"version": 1}',
+        '{"version": 1, "entries": []}',
+        '{"version": 1, "entries": {"docs/adr/0001-an-adr.md": [1, 2]}}',
+    ],
+)
+def test_cache_of_unexpected_shape_is_ignored(adr_tmp_path, cache_path, content):
+    # Given
+    cache_path.write_text(content)
+    adr_path = adr_tmp_path / "0001-an-adr.md"
+    write_adr(adr_path, "An ADR")
+
+    # When
+    cache = AdrHeaderCache(cache_path)
+    header = cache.adr_header_from_file(adr_path)
+
+    # Then
+    assert_that(header.title, equal_to("An ADR"))
+    assert_that(cache, has_length(1))
+
+
+def test_id_high_water_mark_is_invalidated_by_directory_changes(adr_tmp_path, tmp_path):
+    # Given
+    id_cache_path = tmp_path / ".adr-id-cache"
+    cache = AdrIdCache(id_cache_path)
+    cache.put(adr_tmp_path, 12, os.stat(adr_tmp_path))
+    cache.save()
+    persisted_mark = AdrIdCache(id_cache_path).get(adr_tmp_path)
+
+    # When
+    write_adr(adr_tmp_path / "0013-an-adr.md", "An ADR")
+
+    # Then
+    assert_that(persisted_mark, equal_to(12))
+    assert_that(AdrIdCache(id_cache_path).get(adr_tmp_path), none())
+
+
+def test_id_high_water_mark_of_recently_changed_directory_is_not_persisted(
+    adr_tmp_path, tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.setattr(cache_module, "CACHE_RACY_WINDOW_NS", 60_000_000_000)
+    id_cache_path = tmp_path / ".adr-id-cache"
+    cache = AdrIdCache(id_cache_path)
+    write_adr(adr_tmp_path / "0012-an-adr.md", "An ADR")
+
+    # When
+    cache.put(adr_tmp_path, 12, os.stat(adr_tmp_path))
+    cache.save()
+
+    # Then
+    assert_that(cache.get(adr_tmp_path), equal_to(12))
+    assert_that(AdrIdCache(id_cache_path).get(adr_tmp_path), none())
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"version": 1}',
+        '{"version": 1, "marks": {"docs/adr": [1, 2]}}',
+        '{"version": 1, "marks": {"docs/adr": [[1, 2], "12"]}}',
+    ],
+)
+def test_id_cache_of_unexpected_shape_is_ignored(adr_tmp_path, tmp_path, content):
+    # Given
+    id_cache_path = tmp_path / ".adr-id-cache"
+    id_cache_path.write_text(content)
+
+    # When
+    mark = AdrIdCache(id_cache_path).get(adr_tmp_path)
+
+    # Then
+    assert_that(mark, none())
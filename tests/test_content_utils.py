@@ -1,13 +1,33 @@
 from datetime import datetime
 
 import pytest
-from hamcrest import assert_that, calling, contains_string, equal_to, none, not_, raises
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_string,
+    equal_to,
+    has_length,
+    instance_of,
+    none,
+    not_,
+    raises,
+)
 
 from pyadr import content_utils
 from pyadr.content_utils import (
+    AdrHeader,
+    add_toc_entry,
+    adr_header_from_file,
     adr_title_slug_from_file,
     adr_title_status_and_date_from_file,
     build_toc_content_from_adrs_by_status,
+    build_toc_entry,
+    insert_toc_entry,
+    iter_toc_content_from_adr_headers,
+    new_adrs_by_status,
+    parse_adrs,
+    parse_toc_content,
+    remove_toc_entry,
 )
 from pyadr.exceptions import (
     PyadrAdrDateNotFoundError,
@@ -152,6 +172,40 @@ def test_retrieve_title_status_and_date_from_madr_when_no_status_phrase(
     assert_that(date, equal_to("any_date"))
 
 
+def test_retrieve_header_from_madr(adr_tmp_path):
+    # Given
+    adr_header = """<!-- comment -->
+#  My ADR Updated Title
+
+* Status: any_status status phrase
+* Date: any_date
+"""
+    adr_content = (
+        adr_header
+        + """
+## Context and Problem Statement
+
+[..]
+"""
+    )
+    adr_path = adr_tmp_path / "0012-my-adr-updated-title.md"
+    with adr_path.open("w") as f:
+        f.write(adr_content)
+
+    # When
+    header = adr_header_from_file(adr_path)
+
+    # Then
+    assert_that(header.path, equal_to(adr_path))
+    assert_that(header.id, equal_to("0012"))
+    assert_that(header.title, equal_to("My ADR Updated Title"))
+    assert_that(header.slug, equal_to("my-adr-updated-title"))
+    assert_that(header.status, equal_to("any_status"))
+    assert_that(header.status_phrase, equal_to("status phrase"))
+    assert_that(header.date, equal_to("any_date"))
+    assert_that(header.header_end, equal_to(len(adr_header.encode())))
+
+
 def test_retrieve_title_status_and_date_from_madr_throws_error_when_no_title(
     adr_tmp_path,
 ):
@@ -342,3 +396,131 @@ def test_build_toc_content_from_adrs_by_status_no_adr():
         "* None\n",
     ]
     assert_that(toc_content, equal_to(expected))
+
+
+def test_parse_adrs_keeps_order_and_collects_format_errors(adr_tmp_path):
+    # Given
+    paths = []
+    for number in range(20):
+        path = adr_tmp_path / f"{number:04d}-an-adr.md"
+        if number % 7 == 3:
+            content = "* Status: accepted\n* Date: 2020-03-26\n"
+        else:
+            content = f"# ADR {number}\n\n* Status: accepted\n* Date: 2020-03-26\n"
+        with path.open("w") as f:
+            f.write(content)
+        paths.append(path)
+
+    # When
+    results = parse_adrs(paths, workers=4)
+
+    # Then
+    assert_that(results, has_length(20))
+    for number, result in enumerate(results):
+        if number % 7 == 3:
+            assert_that(result, instance_of(PyadrAdrTitleNotFoundError))
+        else:
+            assert_that(result.title, equal_to(f"ADR {number}"))
+            assert_that(result.path, equal_to(paths[number]))
+
+
+def test_parse_toc_content_round_trips_and_detects_hand_edits():
+    # Given
+    adrs_by_status = new_adrs_by_status()
+    add_toc_entry(adrs_by_status, "accepted", "* [0000 - First](0000-first.md)\n")
+    add_toc_entry(adrs_by_status, "foo", "* [0002 - Third](0002-third.md): foo x\n")
+    toc_content = "".join(build_toc_content_from_adrs_by_status(adrs_by_status))
+
+    # When
+    parsed = parse_toc_content(toc_content)
+    hand_edited = parse_toc_content(toc_content.replace("First", "First\n\nNote"))
+
+    # Then
+    assert_that(parsed, equal_to(adrs_by_status))
+    assert_that(hand_edited, none())
+
+
+def test_insert_and_remove_toc_entry_keep_sections_sorted():
+    # Given
+    adrs_by_status = new_adrs_by_status()
+    add_toc_entry(adrs_by_status, "accepted", "* [0000 - First](0000-first.md)\n")
+    add_toc_entry(adrs_by_status, "accepted", "* [0002 - Third](0002-third.md)\n")
+    add_toc_entry(adrs_by_status, "foo", "* [0003 - Fourth](0003-fourth.md)\n")
+
+    # When
+    removed = remove_toc_entry(adrs_by_status, "0003-fourth.md")
+    insert_toc_entry(adrs_by_status, "accepted", "* [0001 - Second](0001-second.md)\n")
+    insert_toc_entry(adrs_by_status, "bar", "* [0004 - Fifth](0004-fifth.md)\n")
+    insert_toc_entry(adrs_by_status, "foo", "* [0003 - Fourth](0003-fourth.md)\n")
+
+    # Then
+    assert_that(removed, equal_to(True))
+    assert_that(remove_toc_entry(adrs_by_status, "0005-missing.md"), equal_to(False))
+    assert_that(
+        adrs_by_status["accepted"]["adrs"],
+        equal_to(
+            [
+                "* [0000 - First](0000-first.md)\n",
+                "* [0001 - Second](0001-second.md)\n",
+                "* [0002 - Third](0002-third.md)\n",
+            ]
+        ),
+    )
+    assert_that(
+        list(adrs_by_status["non-standard"]["adrs-by-status"]), equal_to(["foo", "bar"])
+    )
+
+
+def test_toc_entries_sorted_by_number_above_9999():
+    # Given
+    adrs_by_status = new_adrs_by_status()
+    add_toc_entry(adrs_by_status, "accepted", "* [0002 - Second](0002-second.md)\n")
+    add_toc_entry(adrs_by_status, "accepted", "* [10000 - Fourth](10000-fourth.md)\n")
+
+    # When
+    insert_toc_entry(adrs_by_status, "accepted", "* [9999 - Third](9999-third.md)\n")
+    insert_toc_entry(adrs_by_status, "accepted", "* [10001 - Fifth](10001-fifth.md)\n")
+    toc_content = "".join(build_toc_content_from_adrs_by_status(adrs_by_status))
+
+    # Then
+    assert_that(
+        adrs_by_status["accepted"]["adrs"],
+        equal_to(
+            [
+                "* [0002 - Second](0002-second.md)\n",
+                "* [9999 - Third](9999-third.md)\n",
+                "* [10000 - Fourth](10000-fourth.md)\n",
+                "* [10001 - Fifth](10001-fifth.md)\n",
+            ]
+        ),
+    )
+    assert_that(parse_toc_content(toc_content), equal_to(adrs_by_status))
+
+
+def test_iter_toc_content_from_adr_headers_spools_entries(monkeypatch, adr_tmp_path):
+    # Given
+    monkeypatch.setattr(content_utils, "TOC_SPOOL_MAX_SIZE", 100)
+    headers = [
+        AdrHeader(
+            adr_tmp_path / f"{number:04d}-adr-number-{number}.md",
+            f"ADR number {number}",
+            ["accepted", "rejected", "foo", "bar"][number % 4],
+            "by [ADR-0000](0000-adr-number-0.md)" if number % 4 == 2 else None,
+            "2020-03-26",
+            0,
+        )
+        for number in range(50)
+    ]
+    adrs_by_status = new_adrs_by_status()
+    for header in headers:
+        add_toc_entry(
+            adrs_by_status, header.status, build_toc_entry(header, header.path.name)
+        )
+
+    # When
+    toc_content = list(iter_toc_content_from_adr_headers(adr_tmp_path, headers))
+
+    # Then
+    assert_that(
+        toc_content, equal_to(build_toc_content_from_adrs_by_status(adrs_by_status))
+    )
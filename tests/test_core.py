@@ -0,0 +1,345 @@
+import pytest
+from hamcrest import assert_that, contains_string, equal_to, has_item, has_length
+
+from pyadr import core, file_utils
+from pyadr.const import STATUS_ACCEPTED, TOC_FILE_NAME
+from pyadr.content_utils import AdrHeader
+from pyadr.core import AdrCore
+from pyadr.exceptions import PyadrAdrFormatError, PyadrAdrRenameConflictError
+from tests.conftest import write_adr
+
+
+def build_headers():
+    headers = []
+    for number in range(40):
+        if number % 5 == 0:
+            filename = f"{number:04d}-not-the-title.md"
+        elif number % 7 == 0:
+            filename = f"{number:03d}-adr-number-{number}.md"
+        else:
+            filename = f"{number:04d}-adr-number-{number}.md"
+        headers.append(
+            AdrHeader(
+                core.Path("docs/adr", filename),
+                f"ADR number {number}",
+                "accepted",
+                None,
+                "2020-03-26",
+                0,
+            )
+        )
+    # both a bad id prefix and a wrong title slug
+    headers.append(
+        AdrHeader(
+            core.Path("docs/adr/xx-wrong.md"),
+            "Some Title",
+            "accepted",
+            None,
+            "2020-03-26",
+            0,
+        )
+    )
+    return headers
+
+
+def test_verify_adr_filenames_sharded_across_processes(adr_core, monkeypatch):
+    # Given
+    monkeypatch.setattr(core, "PARALLEL_CHECKS_MIN_ADRS", 0)
+    expected_messages = adr_core._verify_adr_filenames(
+        build_headers(), log_and_raise=False
+    )
+    headers = build_headers()
+
+    # When
+    messages = adr_core._verify_adr_filenames(
+        list(reversed(headers)), log_and_raise=False, jobs=3
+    )
+
+    # Then
+    assert_that(messages, equal_to(expected_messages))
+    assert_that(messages, has_length(1 + 8 + 4 + 2))
+    assert_that(messages[1:], equal_to(sorted(messages[1:])))
+    assert_that(
+        messages[-2:],
+        equal_to(
+            [
+                "  => 'docs/adr/xx-wrong.md' does not have the correct title slug "
+                "('some-title').",
+                "  => 'docs/adr/xx-wrong.md' does not start with "
+                "'[0-9][0-9][0-9][0-9]-'.",
+            ]
+        ),
+    )
+    assert_that(
+        messages[1:3],
+        equal_to(
+            [
+                "  => 'docs/adr/0000-not-the-title.md' does not have the correct "
+                "title slug ('adr-number-0').",
+                "  => 'docs/adr/0005-not-the-title.md' does not have the correct "
+                "title slug ('adr-number-5').",
+            ]
+        ),
+    )
+    assert_that(
+        messages,
+        has_item(
+            "  => 'docs/adr/0005-not-the-title.md' does not have the correct title "
+            "slug ('adr-number-5')."
+        ),
+    )
+    assert_that(headers[1].as_tuple()[-1], equal_to("adr-number-1"))
+
+
+def test_accept_with_toc_updates_entry_as_full_generation(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "0001-second.md", "Second", "rejected")
+    write_adr(adr_tmp_path / "0002-third.md", "Third", "foo")
+    write_adr(adr_tmp_path / "0003-fourth.md", "Fourth", "bar")
+    adr_core.generate_toc()
+    write_adr(adr_tmp_path / "XXXX-fifth.md", "Fifth", "proposed")
+    monkeypatch.setattr(
+        adr_core, "generate_toc", lambda *args, **kwargs: pytest.fail("full rebuild")
+    )
+
+    # When
+    adr_core.accept_or_reject(
+        str(adr_tmp_path / "XXXX-fifth.md"), STATUS_ACCEPTED, toc=True
+    )
+
+    # Then
+    toc_path = adr_tmp_path / TOC_FILE_NAME
+    updated_toc = toc_path.read_text()
+    toc_path.unlink()
+    AdrCore().generate_toc()
+    assert_that(updated_toc, equal_to(toc_path.read_text()))
+    assert_that(updated_toc, contains_string("* [0004 - Fifth](0004-fifth.md)\n"))
+
+
+def test_accept_many_assigns_consecutive_ids_and_updates_toc_once(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "XXXX-second.md", "Second", "proposed")
+    write_adr(adr_tmp_path / "XXXX-third.md", "Third", "proposed")
+    write_adr(adr_tmp_path / "XXXX-fourth.md", "Fourth", "proposed")
+    adr_core.generate_toc()
+    toc_updates = []
+    update_toc_entries = adr_core.update_toc_entries
+    monkeypatch.setattr(
+        adr_core,
+        "update_toc_entries",
+        lambda changes: toc_updates.append(changes) or update_toc_entries(changes),
+    )
+
+    # When
+    processed_adrs = adr_core.accept_or_reject_many(
+        ["docs/adr/XXXX-third.md", "docs/adr/XXXX-*.md"], STATUS_ACCEPTED, toc=True
+    )
+
+    # Then
+    assert_that(
+        [path.name for path in processed_adrs],
+        equal_to(["0001-third.md", "0002-fourth.md", "0003-second.md"]),
+    )
+    assert_that(toc_updates, has_length(1))
+    assert_that(
+        (adr_tmp_path / TOC_FILE_NAME).read_text(),
+        contains_string(
+            "* [0000 - First](0000-first.md)\n"
+            "* [0001 - Third](0001-third.md)\n"
+            "* [0002 - Fourth](0002-fourth.md)\n"
+            "* [0003 - Second](0003-second.md)\n"
+        ),
+    )
+
+
+def test_accept_many_with_toc_syncs_journal_once(
+    adr_core, adr_tmp_path, monkeypatch, mocker
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "XXXX-second.md", "Second", "proposed")
+    write_adr(adr_tmp_path / "XXXX-third.md", "Third", "proposed")
+    adr_core.generate_toc()
+    fsync_directory = mocker.spy(file_utils, "_fsync_directory")
+    sync = mocker.patch.object(file_utils.os, "sync", create=True)
+
+    # When
+    adr_core.accept_or_reject_many(["docs/adr/XXXX-*.md"], STATUS_ACCEPTED, toc=True)
+
+    # Then
+    backup_dir_syncs = [
+        call
+        for call in fsync_directory.call_args_list
+        if call.args[0].name == "journal.d"
+    ]
+    assert_that(backup_dir_syncs, has_length(1))
+    sync.assert_not_called()
+
+
+def test_accept_many_keeps_no_change_when_one_fails(
+    adr_core, adr_tmp_path, monkeypatch, mocker
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "XXXX-second.md", "Second", "proposed")
+    write_adr(adr_tmp_path / "XXXX-third.md", "Third", "proposed")
+    adr_core.generate_toc()
+    files_before = {path.name: path.read_text() for path in adr_tmp_path.iterdir()}
+    mocker.patch.object(core, "update_adr", side_effect=[None, OSError("disk full")])
+
+    # When
+    with pytest.raises(OSError):
+        adr_core.accept_or_reject_many(
+            ["docs/adr/XXXX-*.md"], STATUS_ACCEPTED, toc=True
+        )
+
+    # Then
+    assert_that(
+        {path.name: path.read_text() for path in adr_tmp_path.iterdir()},
+        equal_to(files_before),
+    )
+    assert_that(
+        sorted(path.name for path in adr_tmp_path.parent.parent.iterdir()),
+        equal_to([".pyadr", "docs"]),
+    )
+
+
+def test_accept_with_toc_regenerates_hand_edited_toc(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "XXXX-second.md", "Second", "proposed")
+    (adr_tmp_path / TOC_FILE_NAME).write_text("# My own table of content\n")
+
+    # When
+    adr_core.accept_or_reject(
+        str(adr_tmp_path / "XXXX-second.md"), STATUS_ACCEPTED, toc=True
+    )
+
+    # Then
+    assert_that(
+        (adr_tmp_path / TOC_FILE_NAME).read_text(),
+        contains_string(
+            "* [0000 - First](0000-first.md)\n* [0001 - Second](0001-second.md)\n"
+        ),
+    )
+
+
+def test_sharded_toc_regenerates_only_changed_shards(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "1000-second.md", "Second", "rejected")
+    write_adr(adr_tmp_path / "XXXX-third.md", "Third", "proposed")
+    adr_core.generate_toc(sharded=True)
+
+    # When
+    adr_core.accept_or_reject(
+        str(adr_tmp_path / "XXXX-third.md"), STATUS_ACCEPTED, toc=True
+    )
+
+    # Then
+    shards_path = adr_tmp_path / "toc"
+    assert_that(
+        (shards_path / "ids-1000-1999.md").read_text(),
+        contains_string(
+            "* [1000 - Second](../1000-second.md)\n"
+            "* [1001 - Third](../1001-third.md)\n"
+        ),
+    )
+    assert_that(
+        AdrCore().generate_toc(sharded=True),
+        equal_to([]),
+    )
+    assert_that(
+        AdrCore().generate_toc(),
+        equal_to([adr_tmp_path.relative_to(adr_tmp_path.parent.parent) / "index.md"]),
+    )
+    assert_that(shards_path.exists(), equal_to(False))
+
+
+def test_toc_is_left_untouched_by_adr_of_invalid_format_met_while_writing(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "0001-second.md", "Second", "accepted")
+    adr_core.generate_toc(sharded=True)
+    index_content = (adr_tmp_path / "index.md").read_text()
+    (adr_tmp_path / "0001-second.md").write_text("No header\n")
+
+    # When
+    with pytest.raises(PyadrAdrFormatError):
+        AdrCore().generate_toc()
+
+    # Then
+    assert_that((adr_tmp_path / "index.md").read_text(), equal_to(index_content))
+    assert_that((adr_tmp_path / "toc" / "manifest.json").exists(), equal_to(True))
+
+
+def test_sync_all_filenames_fails_before_any_rename_on_conflict(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First Updated", "accepted")
+    write_adr(adr_tmp_path / "0001-second.md", "Third", "accepted")
+    write_adr(adr_tmp_path / "0001-third.md", "Third", "accepted")
+
+    # When
+    with pytest.raises(PyadrAdrRenameConflictError) as exc_info:
+        adr_core.sync_all_filenames()
+
+    # Then
+    assert_that(exc_info.value.args[0], equal_to(["docs/adr/0001-third.md"]))
+    assert_that(
+        sorted(path.name for path in adr_tmp_path.iterdir()),
+        equal_to(["0000-first.md", "0001-second.md", "0001-third.md"]),
+    )
+
+
+def test_renumber_adrs_canonicalises_ids_and_updates_links(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    (adr_tmp_path / "0001-first.md").write_text(
+        "# First\n\n* Status: accepted\n* Date: 2020-03-26\n\n"
+        "See [A](012-a.md), [C](./00013-c.md#context) and [B](0012-b.md).\n"
+    )
+    write_adr(adr_tmp_path / "012-a.md", "A", "accepted")
+    write_adr(adr_tmp_path / "0012-b.md", "B", "accepted")
+    write_adr(adr_tmp_path / "00013-c.md", "C", "accepted")
+
+    # When
+    renamed_adrs = adr_core.renumber_adrs()
+
+    # Then
+    assert_that(
+        [path.name for path in renamed_adrs], equal_to(["0014-a.md", "0013-c.md"])
+    )
+    assert_that(
+        sorted(path.name for path in adr_tmp_path.iterdir()),
+        equal_to(["0001-first.md", "0012-b.md", "0013-c.md", "0014-a.md"]),
+    )
+    assert_that(
+        (adr_tmp_path / "0001-first.md").read_text(),
+        contains_string(
+            "See [A](0014-a.md), [C](./0013-c.md#context) and [B](0012-b.md).\n"
+        ),
+    )
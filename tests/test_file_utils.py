@@ -1,8 +1,25 @@
-from hamcrest import assert_that, calling, equal_to, raises
+import os
+import stat
+import tracemalloc
+from datetime import datetime
 
+from hamcrest import assert_that, calling, equal_to, less_than, raises
+
+from pyadr import file_utils
 from pyadr.core import AdrCore
 from pyadr.exceptions import PyadrNoNumberedAdrError
-from pyadr.file_utils import calculate_next_adr_id
+from pyadr.file_utils import (
+    atomic_write,
+    atomic_write_batch,
+    calculate_next_adr_id,
+    file_transaction,
+    make_runtime_dir,
+    protect_files,
+    rollback_interrupted_transaction,
+    runtime_dir,
+    update_adr,
+    write_lines_if_changed,
+)
 
 
 def test_add_id_and_update_title_on_proposed_adr_file_name(adr_tmp_path):
@@ -42,6 +59,20 @@ def test_determine_next_id(adr_tmp_path):
     assert_that(next_id, equal_to("0003"))
 
 
+def test_determine_next_id_above_9999(adr_tmp_path):
+    # Given
+    (adr_tmp_path / "0002-an-accepted-or-rejected-adr.md").touch()
+    (adr_tmp_path / "9999-an-accepted-or-rejected-adr.md").touch()
+    (adr_tmp_path / "10000-an-accepted-or-rejected-adr.md").touch()
+    (adr_tmp_path / "012345-not-an-adr-id.md").touch()
+
+    # When
+    next_id = calculate_next_adr_id(adr_tmp_path)
+
+    # Then
+    assert_that(next_id, equal_to("10001"))
+
+
 def test_determine_next_id_fail_when_no_previous_adr(adr_tmp_path):
     # Given
     (adr_tmp_path / "XXXX-a-proposed-adr.md").touch()
@@ -53,3 +84,198 @@ def test_determine_next_id_fail_when_no_previous_adr(adr_tmp_path):
         calling(calculate_next_adr_id).with_args(adr_tmp_path),
         raises(PyadrNoNumberedAdrError),
     )
+
+
+def test_update_adr_rewrites_header_only(adr_tmp_path):
+    # Given
+    adr_file = adr_tmp_path / "XXXX-adr-title.md"
+    body = (
+        "\n## Context and Problem Statement\n\n" + "![diagram](data:image/png;base64,"
+    )
+    body += "A" * 16 * 1024 * 1024 + ")\n\n* Status: not the header\n"
+    with adr_file.open("w") as f:
+        f.write("# My ADR Title\n\n* Status: proposed\n* Date: 2020-03-26\n" + body)
+    adr_file.chmod(0o640)
+
+    # When
+    tracemalloc.start()
+    update_adr(adr_file, title="My New Title", status="accepted")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Then
+    today = datetime.today().strftime("%Y-%m-%d")
+    with adr_file.open() as f:
+        content = f.read()
+    assert_that(
+        content,
+        equal_to(f"# My New Title\n\n* Status: accepted\n* Date: {today}\n" + body),
+    )
+    assert_that(stat.S_IMODE(adr_file.stat().st_mode), equal_to(0o640))
+    assert_that(peak, less_than(4 * 1024 * 1024))
+    assert_that(list(adr_tmp_path.iterdir()), equal_to([adr_file]))
+
+
+def test_atomic_write_leaves_file_untouched_when_interrupted(tmp_path):
+    # Given
+    path = tmp_path / "index.md"
+    path.write_text("previous content\n")
+
+    # When
+    def interrupted_write():
+        with atomic_write(path) as f:
+            f.write("partial")
+            raise KeyboardInterrupt()
+
+    # Then
+    assert_that(calling(interrupted_write), raises(KeyboardInterrupt))
+    assert_that(path.read_text(), equal_to("previous content\n"))
+    assert_that(list(tmp_path.iterdir()), equal_to([path]))
+
+
+def test_atomic_write_creates_file_with_default_mode(tmp_path):
+    # Given
+    path = tmp_path / "index.md"
+    umask = os.umask(0o022)
+
+    # When
+    try:
+        with atomic_write(path) as f:
+            f.write("content\n")
+    finally:
+        os.umask(umask)
+
+    # Then
+    assert_that(path.read_text(), equal_to("content\n"))
+    assert_that(stat.S_IMODE(path.stat().st_mode), equal_to(0o644))
+
+
+def test_atomic_write_batch_syncs_each_file_once(tmp_path, mocker):
+    # Given
+    fsync = mocker.spy(file_utils.os, "fsync")
+    sync = mocker.patch.object(file_utils.os, "sync", create=True)
+
+    # When
+    with atomic_write_batch():
+        for number in [0, 1, 2, 3, 4, 0]:
+            with atomic_write(tmp_path / f"{number:04d}-an-adr.md") as f:
+                f.write("content\n")
+        assert_that(fsync.call_count, equal_to(0))
+
+    # Then
+    sync.assert_not_called()
+    # the 5 files, then their directory, each once
+    assert_that(fsync.call_count, equal_to(5 + 1))
+
+
+def test_write_lines_if_changed_skips_identical_content(tmp_path):
+    # Given
+    path = tmp_path / "index.md"
+    assert_that(write_lines_if_changed(path, ["con", "tent\n"]), equal_to(True))
+    previous_stat = path.stat()
+
+    # When
+    written = write_lines_if_changed(path, ["con", "tent\n"])
+
+    # Then
+    assert_that(written, equal_to(False))
+    assert_that(path.stat().st_ino, equal_to(previous_stat.st_ino))
+    assert_that(path.stat().st_mtime_ns, equal_to(previous_stat.st_mtime_ns))
+    assert_that(write_lines_if_changed(path, iter(["new content\n"])), equal_to(True))
+    assert_that(path.read_bytes(), equal_to(b"new content\n"))
+
+
+def change_files_in_transaction(tmp_path, journal_path):
+    with file_transaction(journal_path, [tmp_path / "XXXX-an-adr.md"]):
+        protect_files([tmp_path / "0001-an-adr.md"])
+        (tmp_path / "XXXX-an-adr.md").rename(tmp_path / "0001-an-adr.md")
+        with atomic_write(tmp_path / "0001-an-adr.md") as f:
+            f.write("accepted\n")
+        with atomic_write(tmp_path / "index.md") as f:
+            f.write("new toc\n")
+        raise KeyboardInterrupt()
+
+
+def test_file_transaction_restores_files_when_interrupted(tmp_path):
+    # Given
+    journal_path = tmp_path / ".adr-journal"
+    (tmp_path / "XXXX-an-adr.md").write_text("proposed\n")
+
+    # When
+    # Then
+    assert_that(
+        calling(change_files_in_transaction).with_args(tmp_path, journal_path),
+        raises(KeyboardInterrupt),
+    )
+    assert_that(
+        sorted(path.name for path in tmp_path.iterdir()),
+        equal_to(["XXXX-an-adr.md"]),
+    )
+    assert_that((tmp_path / "XXXX-an-adr.md").read_text(), equal_to("proposed\n"))
+
+
+def test_file_transaction_of_killed_process_is_rolled_back(tmp_path, mocker):
+    # Given
+    journal_path = tmp_path / ".adr-journal"
+    (tmp_path / "XXXX-an-adr.md").write_text("proposed\n")
+    (tmp_path / "index.md").write_text("toc\n")
+    # the process is killed: nothing is rolled back
+    mocker.patch.object(file_utils._FileTransaction, "rollback")
+    assert_that(
+        calling(change_files_in_transaction).with_args(tmp_path, journal_path),
+        raises(KeyboardInterrupt),
+    )
+    with journal_path.open("a") as f:
+        f.write('["partially written entr')
+    killed_state = sorted(path.name for path in tmp_path.iterdir())
+
+    # When
+    rolled_back = rollback_interrupted_transaction(journal_path)
+
+    # Then
+    assert_that(
+        killed_state,
+        equal_to([".adr-journal", ".adr-journal.d", "0001-an-adr.md", "index.md"]),
+    )
+    assert_that(rolled_back, equal_to(True))
+    assert_that(
+        sorted(path.name for path in tmp_path.iterdir()),
+        equal_to(["XXXX-an-adr.md", "index.md"]),
+    )
+    assert_that((tmp_path / "XXXX-an-adr.md").read_text(), equal_to("proposed\n"))
+    assert_that((tmp_path / "index.md").read_text(), equal_to("toc\n"))
+    assert_that(rollback_interrupted_transaction(journal_path), equal_to(False))
+
+
+def test_runtime_dir_is_in_the_git_directory_of_a_git_repository(tmp_path):
+    # Given
+    (tmp_path / "repo" / ".git").mkdir(parents=True)
+    (tmp_path / "worktree").mkdir()
+    (tmp_path / "worktree" / ".git").write_text(
+        f"gitdir: {tmp_path / 'repo' / '.git' / 'worktrees' / 'worktree'}\n"
+    )
+    (tmp_path / "repo" / ".git" / "worktrees" / "worktree").mkdir(parents=True)
+    (tmp_path / "other").mkdir()
+
+    # When
+    paths = [runtime_dir(tmp_path / name) for name in ["repo", "worktree", "other"]]
+
+    # Then
+    assert_that(
+        paths,
+        equal_to(
+            [
+                tmp_path / "repo" / ".git" / "pyadr",
+                tmp_path / "repo" / ".git" / "worktrees" / "worktree" / "pyadr",
+                tmp_path / "other" / ".pyadr",
+            ]
+        ),
+    )
+
+
+def test_runtime_dir_is_ignored_by_git(tmp_path):
+    # When
+    make_runtime_dir(tmp_path / ".pyadr")
+
+    # Then
+    assert_that((tmp_path / ".pyadr" / ".gitignore").read_text(), equal_to("*\n"))
@@ -1,3 +1,4 @@
+import pytest
 from hamcrest import assert_that, equal_to, not_
 
 
@@ -19,3 +20,27 @@ def test_adr_commit_msg_prefix_for_status_other_than_proposed(git_adr_core):
         git_adr_core._commit_message_prefix_for_status(""),
         not_(equal_to("chore(adr):")),
     )
+
+
+def test_batched_index_update_stages_nothing_if_it_fails(
+    git_adr_core, tmp_repo, tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(tmp_path)
+    never_created_path = tmp_path / "never-created.md"
+
+    # When
+    with pytest.raises(ValueError, match="failed batch"):
+        with git_adr_core._batched_index_update():
+            git_adr_core._stage([never_created_path])
+            raise ValueError("failed batch")
+    with git_adr_core.plan_changes() as plan:
+        with pytest.raises(ValueError, match="failed batch"):
+            with git_adr_core._batched_index_update():
+                git_adr_core._stage([never_created_path])
+                raise ValueError("failed batch")
+
+    # Then
+    assert_that(tmp_repo.is_dirty(), equal_to(False))
+    assert_that(plan.changes(), equal_to([]))
+    assert_that(git_adr_core._index_batch, equal_to(None))
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from hamcrest import assert_that, calling, equal_to, raises
+
+from pyadr.git.exceptions import PyadrGitRevisionNotFoundError
+from pyadr.git.repository import GitTreeAdrRepository
+from pyadr.git.utils import git_cat_file_batch
+
+RECORDS_PATH = Path("docs", "adr")
+
+
+def commit_adr(repo, filename, title, status):
+    path = Path(repo.working_dir, RECORDS_PATH, filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"# {title}\n\n* Status: {status}\n* Date: 2020-03-26\n\nBody\n")
+    repo.index.add([str(path)])
+    repo.index.commit(f"add {filename}")
+    return path
+
+
+def test_git_tree_adr_repository_reads_adrs_at_revision(tmp_repo):
+    # Given
+    commit_adr(tmp_repo, "0000-first.md", "First", "accepted")
+    path = commit_adr(tmp_repo, "0001-second.md", "Second", "proposed")
+    commit_adr(tmp_repo, "0001-second.md", "Second", "accepted")
+    path.write_text("# Not committed\n\n* Status: foo\n* Date: 2020-03-26\n")
+
+    # When
+    repository = GitTreeAdrRepository(
+        git_cat_file_batch(tmp_repo), "HEAD~1", RECORDS_PATH
+    )
+
+    # Then
+    assert_that(repository.exists(), equal_to(True))
+    assert_that(
+        repository.numbered_files,
+        equal_to([RECORDS_PATH / "0000-first.md", RECORDS_PATH / "0001-second.md"]),
+    )
+    headers = repository.headers(repository.numbered_files, jobs=4)
+    assert_that(
+        [(header.title, header.status) for header in headers],
+        equal_to([("First", "accepted"), ("Second", "proposed")]),
+    )
+    assert_that(
+        headers[1].header_end,
+        equal_to(len("# Second\n\n* Status: proposed\n* Date: 2020-03-26\n")),
+    )
+
+
+def test_git_tree_adr_repository_missing_records_dir_or_revision(tmp_repo):
+    # Given
+    # When
+    repository = GitTreeAdrRepository(
+        git_cat_file_batch(tmp_repo), "main", RECORDS_PATH
+    )
+    unknown_repository = GitTreeAdrRepository(
+        git_cat_file_batch(tmp_repo), "unknown", RECORDS_PATH
+    )
+
+    # Then
+    assert_that(repository.exists(), equal_to(False))
+    assert_that(repository.paths, equal_to([]))
+    assert_that(
+        calling(unknown_repository.exists), raises(PyadrGitRevisionNotFoundError)
+    )
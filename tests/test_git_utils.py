@@ -0,0 +1,266 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+from git import GitCommandError, Repo
+from hamcrest import assert_that, equal_to, instance_of, none
+
+from pyadr.exceptions import PyadrAdrFormatError
+from pyadr.git.const import (
+    TRACKED_STATE_COMMITTED,
+    TRACKED_STATE_STAGED,
+    TRACKED_STATE_UNTRACKED,
+)
+from pyadr.git.utils import (
+    GitCatFileBatch,
+    GitStagedChanges,
+    GitTrackedFiles,
+    create_ref,
+    delete_refs,
+    index_clean,
+    ref_tips,
+)
+
+
+def commit_files(repo, contents):
+    paths = []
+    for name, content in contents.items():
+        path = Path(repo.working_dir, name)
+        path.write_text(content)
+        paths.append(str(path))
+    repo.index.add(paths)
+    repo.index.commit("add files")
+
+
+def test_git_cat_file_batch_reads_many_objects_with_one_process(tmp_repo, monkeypatch):
+    # Given
+    contents = {
+        f"file-{number}.md": f"content {number}\n" * 50 for number in range(500)
+    }
+    commit_files(tmp_repo, contents)
+    popen_calls = []
+    popen = subprocess.Popen
+
+    def counting_popen(*args, **kwargs):
+        popen_calls.append(args)
+        return popen(*args, **kwargs)
+
+    monkeypatch.setattr(subprocess, "Popen", counting_popen)
+    cat_file = GitCatFileBatch(Path(tmp_repo.git_dir))
+
+    # When
+    objects = cat_file.read_objects([f"HEAD:{name}" for name in contents])
+    missing = cat_file.read_objects(["HEAD:not-a-file.md", "HEAD:not a.md"])
+    tree = cat_file.read_tree("HEAD^{tree}")
+    cat_file.close()
+
+    # Then
+    assert_that(
+        [content.decode() for _, _, content in objects],
+        equal_to(list(contents.values())),
+    )
+    assert_that(missing, equal_to([None, None]))
+    assert_that(
+        sorted(name for _, name, _ in tree),
+        equal_to(sorted(list(contents) + ["foo"])),
+    )
+    assert_that(len(popen_calls), equal_to(1))
+
+
+def test_git_cat_file_batch_caches_adr_headers(tmp_repo, monkeypatch):
+    # Given
+    commit_files(
+        tmp_repo,
+        {
+            "0001-an-adr.md": "# An ADR\n\n* Status: accepted\n* Date: 2020-03-26\n",
+            "0002-no-header.md": "Nothing\n",
+        },
+    )
+    cat_file = GitCatFileBatch(Path(tmp_repo.git_dir), header_cache_size=1)
+    blobs = [
+        (sha, Path("docs", name))
+        for _, name, sha in cat_file.read_tree("HEAD^{tree}")
+        if name.endswith(".md")
+    ]
+    first_results = cat_file.read_adr_headers(blobs, source_prefix="HEAD:")
+    read_objects_calls = []
+    read_objects = cat_file.read_objects
+
+    def counting_read_objects(names):
+        read_objects_calls.append(names)
+        return read_objects(names)
+
+    monkeypatch.setattr(cat_file, "read_objects", counting_read_objects)
+
+    # When
+    results = cat_file.read_adr_headers(blobs[:1])
+
+    # Then
+    assert_that(first_results[0].title, equal_to("An ADR"))
+    assert_that(first_results[1], instance_of(PyadrAdrFormatError))
+    assert_that(results[0], equal_to(first_results[0]))
+    assert_that(read_objects_calls, equal_to([]))
+    cat_file.close()
+
+
+def test_git_tracked_files_states(tmp_repo, tmp_path, monkeypatch):
+    # Given
+    commit_files(tmp_repo, {"committed-earlier.md": "earlier\n"})
+    commit_files(tmp_repo, {"committed-last.md": "last\n"})
+    Path(tmp_path, "staged.md").write_text("staged\n")
+    tmp_repo.index.add([str(tmp_path / "staged.md")])
+    Path(tmp_path, "untracked.md").write_text("untracked\n")
+    monkeypatch.chdir(tmp_path)
+
+    # When
+    tracked_files = GitTrackedFiles(tmp_repo)
+
+    # Then
+    assert_that(
+        [
+            tracked_files.state(Path(name))
+            for name in [
+                "committed-earlier.md",
+                "committed-last.md",
+                "staged.md",
+                "untracked.md",
+            ]
+        ],
+        equal_to(
+            [
+                TRACKED_STATE_COMMITTED,
+                TRACKED_STATE_COMMITTED,
+                TRACKED_STATE_STAGED,
+                TRACKED_STATE_UNTRACKED,
+            ]
+        ),
+    )
+    assert_that(
+        tracked_files.state(tmp_path / "committed-earlier.md"),
+        equal_to(TRACKED_STATE_COMMITTED),
+    )
+    assert_that(
+        tracked_files.state(tmp_path.parent / "outside.md"),
+        equal_to(TRACKED_STATE_UNTRACKED),
+    )
+
+
+def test_git_staged_changes(tmp_repo, tmp_path, monkeypatch):
+    # Given
+    commit_files(tmp_repo, {"modified.md": "before\n", "unchanged.md": "same\n"})
+    monkeypatch.chdir(tmp_path)
+    clean_before = index_clean(tmp_repo)
+    Path(tmp_path, "modified.md").write_text("after\n")
+    Path(tmp_path, "added.md").write_text("added\n")
+    tmp_repo.index.add([str(tmp_path / "modified.md"), str(tmp_path / "added.md")])
+    tmp_repo.index.remove([str(tmp_path / "foo")])
+
+    # When
+    staged_changes = GitStagedChanges(tmp_repo)
+
+    # Then
+    assert_that(clean_before, equal_to(True))
+    assert_that(index_clean(tmp_repo), equal_to(False))
+    assert_that(len(staged_changes), equal_to(3))
+    assert_that(
+        [
+            Path(name) in staged_changes
+            for name in ["modified.md", "added.md", "foo", "unchanged.md"]
+        ],
+        equal_to([True, True, True, False]),
+    )
+
+
+def test_git_staged_changes_in_empty_repo(tmp_path):
+    # Given
+    repo = Repo.init(tmp_path, initial_branch="main")
+    clean_before = index_clean(repo)
+    Path(tmp_path, "added.md").write_text("added\n")
+    repo.index.add([str(tmp_path / "added.md")])
+
+    # When
+    staged_changes = GitStagedChanges(repo)
+
+    # Then
+    assert_that(clean_before, equal_to(True))
+    assert_that(index_clean(repo), equal_to(False))
+    assert_that(tmp_path / "added.md" in staged_changes, equal_to(True))
+
+
+def test_git_cat_file_batch_max_adr_number_reads_each_tree_once(tmp_repo, monkeypatch):
+    # Given
+    Path(tmp_repo.working_dir, "docs").mkdir()
+    commit_files(tmp_repo, {"docs/0001-an-adr.md": "", "docs/index.md": ""})
+    for number in range(20):
+        tmp_repo.create_head(f"adr-propose-{number}")
+    tmp_repo.heads["adr-propose-3"].checkout()
+    commit_files(tmp_repo, {"docs/0012-another-adr.md": ""})
+    commits = list(ref_tips(tmp_repo, ["refs/heads"]).values())
+    cat_file = GitCatFileBatch(Path(tmp_repo.git_dir))
+    read_objects_calls = []
+    read_objects = cat_file.read_objects
+
+    def counting_read_objects(names):
+        read_objects_calls.append(names)
+        return read_objects(names)
+
+    monkeypatch.setattr(cat_file, "read_objects", counting_read_objects)
+
+    # When
+    max_number = cat_file.max_adr_number_in_trees(commits, "docs")
+    no_number = cat_file.max_adr_number_in_trees(commits, "not-a-dir")
+    cat_file.close()
+
+    # Then
+    assert_that(len(commits), equal_to(21))
+    assert_that(max_number, equal_to(12))
+    assert_that(no_number, none())
+    assert_that([len(names) for names in read_objects_calls], equal_to([2]))
+
+
+def test_create_ref_only_once(tmp_repo):
+    # Given
+    sha = tmp_repo.head.commit.hexsha
+
+    # When
+    created = create_ref(tmp_repo, "refs/adr/ids/0002", sha)
+    created_again = create_ref(tmp_repo, "refs/adr/ids/0002", sha)
+
+    # Then
+    assert_that(created, equal_to(True))
+    assert_that(created_again, equal_to(False))
+    assert_that(
+        ref_tips(tmp_repo, ["refs/adr/ids"]), equal_to({"refs/adr/ids/0002": sha})
+    )
+
+
+def test_delete_refs_at_once(tmp_repo):
+    # Given
+    sha = tmp_repo.head.commit.hexsha
+    for ref in ["refs/adr/ids/0002", "refs/adr/ids/0003", "refs/adr/ids/0004"]:
+        create_ref(tmp_repo, ref, sha)
+
+    # When
+    delete_refs(tmp_repo, {"refs/adr/ids/0002": sha, "refs/adr/ids/0003": sha})
+
+    # Then
+    assert_that(
+        ref_tips(tmp_repo, ["refs/adr/ids"]), equal_to({"refs/adr/ids/0004": sha})
+    )
+
+
+def test_delete_refs_deletes_none_if_one_was_updated(tmp_repo):
+    # Given
+    sha = tmp_repo.head.commit.hexsha
+    for ref in ["refs/adr/ids/0002", "refs/adr/ids/0003"]:
+        create_ref(tmp_repo, ref, sha)
+
+    # When
+    with pytest.raises(GitCommandError):
+        delete_refs(tmp_repo, {"refs/adr/ids/0002": sha, "refs/adr/ids/0003": "0" * 40})
+
+    # Then
+    assert_that(
+        ref_tips(tmp_repo, ["refs/adr/ids"]),
+        equal_to({"refs/adr/ids/0002": sha, "refs/adr/ids/0003": sha}),
+    )
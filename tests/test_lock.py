@@ -0,0 +1,101 @@
+import subprocess
+import sys
+
+import pytest
+from hamcrest import assert_that, calling, equal_to, raises
+
+from pyadr.exceptions import (
+    PyadrInvalidLockTimeoutError,
+    PyadrRepositoryLockTimeoutError,
+)
+from pyadr.lock import lock_timeout, repository_lock
+
+HOLD_SHARED_LOCK = """
+import fcntl, sys
+with open(sys.argv[1], "a") as f:
+    fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+    print("locked", flush=True)
+    sys.stdin.read()
+"""
+
+
+@pytest.fixture()
+def lock_path(tmp_path):
+    yield tmp_path / ".adr-lock"
+
+
+@pytest.fixture()
+def shared_lock_holder(lock_path):
+    process = subprocess.Popen(
+        [sys.executable, "-c", HOLD_SHARED_LOCK, str(lock_path)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert_that(process.stdout.readline(), equal_to("locked\n"))
+    yield process
+    process.communicate("")
+
+
+def test_shared_lock_is_shared_between_processes(lock_path, shared_lock_holder):
+    # Given
+    ran = []
+
+    # When
+    with repository_lock(lock_path, exclusive=False, timeout=0):
+        ran.append(True)
+
+    # Then
+    assert_that(ran, equal_to([True]))
+
+
+def test_exclusive_lock_waits_for_shared_lock_up_to_timeout(
+    lock_path, shared_lock_holder
+):
+    # Given
+    def lock_exclusively():
+        with repository_lock(lock_path, exclusive=True, timeout=0.2):
+            pass
+
+    # When
+    # Then
+    assert_that(calling(lock_exclusively), raises(PyadrRepositoryLockTimeoutError))
+
+
+def test_lock_is_reentrant_within_a_process(lock_path):
+    # Given
+    ran = []
+
+    # When
+    with repository_lock(lock_path, exclusive=True, timeout=0):
+        with repository_lock(lock_path, exclusive=True, timeout=0):
+            ran.append(True)
+
+    # Then
+    assert_that(ran, equal_to([True]))
+
+
+def test_lock_file_is_not_created_when_not_asked_to(lock_path):
+    # Given
+    ran = []
+
+    # When
+    with repository_lock(lock_path, exclusive=False, timeout=0, create=False):
+        ran.append(True)
+
+    # Then
+    assert_that(ran, equal_to([True]))
+    assert_that(lock_path.exists(), equal_to(False))
+
+
+def test_lock_timeout_from_environment(monkeypatch):
+    # Given
+    monkeypatch.setenv("PYADR_LOCK_TIMEOUT", "2.5")
+
+    # When
+    timeout = lock_timeout()
+
+    # Then
+    assert_that(timeout, equal_to(2.5))
+    monkeypatch.setenv("PYADR_LOCK_TIMEOUT", "soon")
+    assert_that(calling(lock_timeout), raises(PyadrInvalidLockTimeoutError))
@@ -0,0 +1,121 @@
+from pathlib import Path
+
+from hamcrest import assert_that, contains_string, equal_to
+
+from pyadr.const import STATUS_ACCEPTED, TOC_FILE_NAME
+from pyadr.plan import ChangePlan
+from tests.conftest import write_adr
+
+
+def snapshot(path):
+    return {file: file.read_bytes() for file in path.rglob("*") if file.is_file()}
+
+
+def test_accept_dry_run_plans_rename_header_and_toc_without_writing(
+    adr_core, adr_tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(adr_tmp_path.parent.parent)
+    write_adr(adr_tmp_path / "0000-first.md", "First", "accepted")
+    write_adr(adr_tmp_path / "XXXX-second.md", "Second", "proposed")
+    adr_core.generate_toc()
+    files_before = snapshot(adr_tmp_path.parent.parent)
+    adr_repository = adr_core.adr_repository
+
+    # When
+    with adr_core.plan_changes() as plan:
+        processed_adrs = adr_core.accept_or_reject_many(
+            ["docs/adr/XXXX-second.md"], STATUS_ACCEPTED, toc=True
+        )
+    changes = plan.changes()
+
+    # Then
+    assert_that(processed_adrs, equal_to([Path("docs/adr/0001-second.md")]))
+    assert_that(snapshot(adr_tmp_path.parent.parent), equal_to(files_before))
+    assert_that(adr_core.adr_repository, equal_to(adr_repository))
+    assert_that(
+        [(change["operation"], change["path"]) for change in changes],
+        equal_to(
+            [
+                ("rename", "docs/adr/XXXX-second.md"),
+                ("update", "docs/adr/0001-second.md"),
+                ("update", f"docs/adr/{TOC_FILE_NAME}"),
+            ]
+        ),
+    )
+    assert_that(changes[1]["diff"], contains_string("+* Status: accepted\n"))
+    assert_that(
+        changes[2]["diff"], contains_string("+* [0001 - Second](0001-second.md)\n")
+    )
+
+
+def test_git_accept_dry_run_plans_index_operations(
+    git_adr_core, tmp_repo, tmp_path, monkeypatch
+):
+    # Given
+    monkeypatch.chdir(tmp_path)
+    records_path = tmp_path / "docs" / "adr"
+    records_path.mkdir(parents=True)
+    write_adr(records_path / "0000-first.md", "First", "accepted")
+    write_adr(records_path / "XXXX-second.md", "Second", "proposed")
+    tmp_repo.index.add(
+        [str(records_path / "0000-first.md"), str(records_path / "XXXX-second.md")]
+    )
+    tmp_repo.index.commit("add ADRs")
+    head_before = tmp_repo.head.commit.hexsha
+
+    # When
+    with git_adr_core.plan_changes() as plan:
+        git_adr_core.git_accept_or_reject_many(
+            ["docs/adr/XXXX-second.md"], STATUS_ACCEPTED, commit=True
+        )
+    changes = plan.changes()
+
+    # Then
+    assert_that(tmp_repo.head.commit.hexsha, equal_to(head_before))
+    assert_that(tmp_repo.is_dirty(untracked_files=False), equal_to(False))
+    assert_that(
+        [change["operation"] for change in changes],
+        equal_to(["rename", "update", "stage", "commit"]),
+    )
+    assert_that(
+        changes[2]["paths"],
+        equal_to(["docs/adr/XXXX-second.md", "docs/adr/0001-second.md"]),
+    )
+    assert_that(changes[3]["message"], equal_to("docs(adr): [accepted] 0001-second"))
+
+
+def test_change_plan_merges_writes_of_a_file_and_follows_renames(tmp_path):
+    # Given
+    existing = tmp_path / "existing.md"
+    existing.write_text("a\n")
+    plan = ChangePlan(tmp_path)
+
+    # When
+    plan.write(tmp_path / "new.md", b"first\n")
+    plan.write(tmp_path / "new.md", b"second\n")
+    plan.rename(tmp_path / "new.md", tmp_path / "renamed.md")
+    plan.rename(existing, tmp_path / "moved.md")
+    plan.write(tmp_path / "moved.md", b"a\n")
+
+    # Then
+    assert_that(plan.exists(existing), equal_to(False))
+    assert_that(plan.open(tmp_path / "moved.md").read(), equal_to(b"a\n"))
+    assert_that(sorted(plan.list_files(tmp_path)), equal_to(["moved.md", "renamed.md"]))
+    assert_that(
+        [
+            (change["operation"], change["path"], change.get("diff", ""))
+            for change in plan.changes()
+        ],
+        equal_to(
+            [
+                ("rename", "new.md", ""),
+                (
+                    "create",
+                    "renamed.md",
+                    "--- /dev/null\n+++ b/renamed.md\n@@ -0,0 +1 @@\n+second\n",
+                ),
+                ("rename", "existing.md", ""),
+            ]
+        ),
+    )
@@ -0,0 +1,181 @@
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_exactly,
+    empty,
+    equal_to,
+    has_entries,
+    raises,
+)
+
+from pyadr import cache as cache_module
+from pyadr import repository as repository_module
+from pyadr.cache import AdrIdCache
+from pyadr.exceptions import PyadrNoNumberedAdrError
+from pyadr.plan import ChangePlan
+from pyadr.repository import AdrRepository, PlannedAdrRepository
+from tests.conftest import write_adr
+
+
+def test_repository_indexes_adrs_by_id_and_status(adr_tmp_path):
+    # Given
+    write_adr(adr_tmp_path / "0001-an-adr.md", "An ADR")
+    write_adr(adr_tmp_path / "0002-another-adr.md", "Another ADR", "rejected")
+    write_adr(adr_tmp_path / "0002-same-number.md", "An ADR")
+    write_adr(adr_tmp_path / "XXXX-a-proposed-adr.md", "A proposed ADR", "proposed")
+    (adr_tmp_path / "template.md").touch()
+    (adr_tmp_path / "index.md").touch()
+
+    # When
+    repository = AdrRepository(adr_tmp_path)
+
+    # Then
+    assert_that(
+        repository.by_id,
+        has_entries(
+            {
+                "0001": [adr_tmp_path / "0001-an-adr.md"],
+                "0002": [
+                    adr_tmp_path / "0002-another-adr.md",
+                    adr_tmp_path / "0002-same-number.md",
+                ],
+            }
+        ),
+    )
+    assert_that(
+        [header.path.name for header in repository.by_status["accepted"]],
+        contains_exactly("0001-an-adr.md", "0002-same-number.md"),
+    )
+    assert_that(
+        [header.path.name for header in repository.by_status["proposed"]],
+        contains_exactly("XXXX-a-proposed-adr.md"),
+    )
+    assert_that(repository.next_ids(1), equal_to(["0003"]))
+
+
+def test_repository_follows_recorded_renames(adr_tmp_path):
+    # Given
+    write_adr(adr_tmp_path / "0001-an-adr.md", "An ADR")
+    proposed_path = adr_tmp_path / "XXXX-a-proposed-adr.md"
+    write_adr(proposed_path, "A proposed ADR", "proposed")
+    repository = AdrRepository(adr_tmp_path)
+    assert_that(repository.next_ids(1), equal_to(["0002"]))
+
+    # When
+    renamed_path = adr_tmp_path / "0002-a-proposed-adr.md"
+    proposed_path.rename(renamed_path)
+    repository.record_rename(proposed_path, renamed_path)
+
+    # Then
+    assert_that(repository.next_ids(1), equal_to(["0003"]))
+    assert_that(
+        repository.numbered_files,
+        contains_exactly(adr_tmp_path / "0001-an-adr.md", renamed_path),
+    )
+
+
+def test_repository_of_missing_directory_is_empty(tmp_path):
+    # Given
+    repository = AdrRepository(tmp_path / "missing")
+
+    # When
+    # Then
+    assert_that(repository.paths, empty())
+    assert_that(
+        calling(repository.next_ids).with_args(1), raises(PyadrNoNumberedAdrError)
+    )
+
+
+def test_repository_sorts_and_allocates_ids_above_9999(adr_tmp_path):
+    # Given
+    write_adr(adr_tmp_path / "0002-an-adr.md", "An ADR")
+    write_adr(adr_tmp_path / "10000-another-adr.md", "Another ADR")
+    write_adr(adr_tmp_path / "9999-a-third-adr.md", "A third ADR")
+    write_adr(adr_tmp_path / "XXXX-a-proposed-adr.md", "A proposed ADR", "proposed")
+
+    # When
+    repository = AdrRepository(adr_tmp_path)
+
+    # Then
+    assert_that(
+        [path.name for path in repository.numbered_files],
+        contains_exactly(
+            "0002-an-adr.md", "9999-a-third-adr.md", "10000-another-adr.md"
+        ),
+    )
+    assert_that(repository.next_ids(2), equal_to(["10001", "10002"]))
+
+
+def test_repository_allocates_ids_from_high_water_mark(
+    adr_tmp_path, tmp_path, mocker, monkeypatch
+):
+    # Given
+    monkeypatch.setattr(cache_module, "CACHE_RACY_WINDOW_NS", 0)
+    write_adr(adr_tmp_path / "0001-an-adr.md", "An ADR")
+    write_adr(adr_tmp_path / "0007-another-adr.md", "Another ADR")
+    id_cache_path = tmp_path / ".adr-id-cache"
+    repository = AdrRepository(adr_tmp_path, id_cache=AdrIdCache(id_cache_path))
+    first_ids = repository.next_ids(1)
+    (adr_tmp_path / "0007-another-adr.md").rename(adr_tmp_path / "0008-another-adr.md")
+    repository.record_rename(
+        adr_tmp_path / "0007-another-adr.md", adr_tmp_path / "0008-another-adr.md"
+    )
+    repository.save_id_cache()
+    scan = mocker.spy(repository_module, "max_adr_number")
+
+    # When
+    repository = AdrRepository(adr_tmp_path, id_cache=AdrIdCache(id_cache_path))
+    next_ids = repository.next_ids(2)
+
+    # Then
+    assert_that(first_ids, equal_to(["0008"]))
+    assert_that(next_ids, equal_to(["0009", "0010"]))
+    scan.assert_not_called()
+
+
+def test_repository_iterates_headers_batch_by_batch(adr_tmp_path, mocker):
+    # Given
+    for number in range(5):
+        write_adr(adr_tmp_path / f"000{number}-adr-{number}.md", f"ADR {number}")
+    repository = AdrRepository(adr_tmp_path)
+    parse_files = mocker.spy(repository, "_parse_files")
+
+    # When
+    headers = repository.iter_headers(repository.numbered_files, batch_size=2)
+    first_header = next(headers)
+    calls_after_first_header = parse_files.call_count
+    titles = [first_header.title] + [header.title for header in headers]
+
+    # Then
+    assert_that(calls_after_first_header, equal_to(1))
+    assert_that(parse_files.call_count, equal_to(3))
+    assert_that(titles, equal_to([f"ADR {number}" for number in range(5)]))
+    assert_that(repository._headers, empty())
+
+
+def test_planned_repository_lists_and_reads_adrs_as_changed_by_the_plan(
+    adr_tmp_path,
+):
+    # Given
+    write_adr(adr_tmp_path / "0001-an-adr.md", "An ADR")
+    write_adr(adr_tmp_path / "XXXX-a-proposed-adr.md", "A proposed ADR", "proposed")
+    plan = ChangePlan(adr_tmp_path)
+    plan.rename(
+        adr_tmp_path / "XXXX-a-proposed-adr.md", adr_tmp_path / "0002-a-proposed-adr.md"
+    )
+    plan.write(adr_tmp_path / "0001-an-adr.md", b"No header\n")
+
+    # When
+    repository = PlannedAdrRepository(adr_tmp_path, plan)
+
+    # Then
+    assert_that(
+        [path.name for path in repository.paths],
+        contains_exactly("0001-an-adr.md", "0002-a-proposed-adr.md"),
+    )
+    assert_that(
+        [header.title for header in repository.by_status["proposed"]],
+        contains_exactly("A proposed ADR"),
+    )
+    assert_that(repository.by_status.get("accepted"), equal_to(None))
+    assert_that(repository.next_ids(1), equal_to(["0003"]))
@@ -0,0 +1,118 @@
+import csv
+import json
+
+import pytest
+from hamcrest import assert_that, contains_string, equal_to
+
+from pyadr.content_utils import AdrHeader
+from pyadr.toc_formats import (
+    TOC_RENDERERS,
+    iter_csv_toc,
+    iter_html_toc,
+    iter_json_toc,
+    iter_jsonl_toc,
+)
+
+
+@pytest.fixture()
+def adr_headers(adr_tmp_path):
+    yield [
+        AdrHeader(
+            adr_tmp_path / "0000-first-one.md",
+            'First, "one"',
+            "accepted",
+            None,
+            "2020-03-26",
+            0,
+        ),
+        AdrHeader(
+            adr_tmp_path / "0001-second.md",
+            "Second <b>",
+            "superseded",
+            "by [ADR-0000](0000-first-one.md)",
+            "2020-03-27",
+            0,
+        ),
+    ]
+
+
+def expected_records():
+    return [
+        {
+            "id": "0000",
+            "title": 'First, "one"',
+            "status": "accepted",
+            "status_phrase": None,
+            "date": "2020-03-26",
+            "path": "0000-first-one.md",
+        },
+        {
+            "id": "0001",
+            "title": "Second <b>",
+            "status": "superseded",
+            "status_phrase": "by [ADR-0000](0000-first-one.md)",
+            "date": "2020-03-27",
+            "path": "0001-second.md",
+        },
+    ]
+
+
+def test_iter_json_toc(adr_tmp_path, adr_headers):
+    # Given
+    # When
+    json_toc = "".join(iter_json_toc(adr_tmp_path, iter(adr_headers)))
+
+    # Then
+    assert_that(json.loads(json_toc), equal_to(expected_records()))
+    assert_that(json.loads("".join(iter_json_toc(adr_tmp_path, []))), equal_to([]))
+
+
+def test_iter_jsonl_toc(adr_tmp_path, adr_headers):
+    # Given
+    # When
+    lines = list(iter_jsonl_toc(adr_tmp_path, iter(adr_headers)))
+
+    # Then
+    assert_that([json.loads(line) for line in lines], equal_to(expected_records()))
+
+
+def test_iter_csv_toc(adr_tmp_path, adr_headers):
+    # Given
+    # When
+    rows = list(iter_csv_toc(adr_tmp_path, iter(adr_headers)))
+
+    # Then
+    records = [
+        {key: value or None for key, value in record.items()}
+        for record in csv.DictReader(rows)
+    ]
+    assert_that(records, equal_to(expected_records()))
+
+
+def test_iter_html_toc(adr_tmp_path, adr_headers):
+    # Given
+    # When
+    html_toc = "".join(iter_html_toc(adr_tmp_path, iter(adr_headers)))
+
+    # Then
+    assert_that(
+        html_toc,
+        contains_string(
+            "<h2>Accepted Records</h2>\n<ul>\n"
+            '<li><a href="0000-first-one.md">0000 - First, &quot;one&quot;</a></li>\n'
+            "</ul>\n<h2>Rejected Records</h2>\n<ul>\n<li>None</li>\n</ul>\n"
+        ),
+    )
+    assert_that(html_toc, contains_string("0001 - Second &lt;b&gt;</a>: superseded"))
+
+
+def test_toc_renderers_render_all_formats_from_an_iterator(adr_tmp_path, adr_headers):
+    # Given
+    # When
+    # Then
+    for toc_format, renderer in TOC_RENDERERS.items():
+        assert_that(
+            "".join(renderer(adr_tmp_path, iter(adr_headers))),
+            contains_string("0001"),
+            toc_format,
+        )
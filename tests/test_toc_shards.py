@@ -0,0 +1,116 @@
+from hamcrest import assert_that, contains_string, equal_to, not_
+
+from pyadr.content_utils import AdrHeader
+from pyadr.toc_shards import iter_sharded_toc_index, shard_adr_headers
+
+
+def build_header(records_path, number, status, title=None):
+    return AdrHeader(
+        records_path / f"{number:04d}-adr-{number}.md",
+        title or f"ADR {number}",
+        status,
+        None,
+        "2020-03-26",
+        0,
+    )
+
+
+def test_shard_adr_headers_by_status_and_id_range(adr_tmp_path):
+    # Given
+    headers = [
+        build_header(adr_tmp_path, 1, "accepted"),
+        build_header(adr_tmp_path, 999, "foo"),
+        build_header(adr_tmp_path, 2500, "accepted"),
+        build_header(adr_tmp_path, 1000, "rejected"),
+    ]
+
+    # When
+    shards = shard_adr_headers(headers)
+
+    # Then
+    assert_that(
+        list(shards),
+        equal_to(
+            [
+                "status-accepted.md",
+                "status-rejected.md",
+                "status-superseded.md",
+                "status-deprecated.md",
+                "status-foo.md",
+                "ids-0000-0999.md",
+                "ids-1000-1999.md",
+                "ids-2000-2999.md",
+            ]
+        ),
+    )
+    assert_that(
+        shards["ids-0000-0999.md"].adr_headers, equal_to([headers[0], headers[1]])
+    )
+    assert_that(
+        "".join(shards["status-accepted.md"].iter_content(adr_tmp_path)),
+        contains_string(
+            "* [0001 - ADR 1](../0001-adr-1.md)\n"
+            "* [2500 - ADR 2500](../2500-adr-2500.md)\n"
+        ),
+    )
+    assert_that(
+        "".join(iter_sharded_toc_index(shards.values())),
+        contains_string(
+            "* [Status `foo`](toc/status-foo.md) (1)\n\n## Records by id\n\n"
+            "* [Records 0000 to 0999](toc/ids-0000-0999.md) (2)\n"
+        ),
+    )
+
+
+def test_statuses_with_the_same_slug_get_their_own_shard(adr_tmp_path):
+    # Given
+    headers = [
+        build_header(adr_tmp_path, 1, "accepted"),
+        build_header(adr_tmp_path, 2, "Accepted"),
+        build_header(adr_tmp_path, 3, "on hold"),
+        build_header(adr_tmp_path, 4, "on-hold"),
+    ]
+
+    # When
+    shards = shard_adr_headers(headers)
+
+    # Then
+    status_shards = [name for name in shards if name.startswith("status-")]
+    assert_that(
+        status_shards[-3:],
+        equal_to(["status-accepted-2.md", "status-on-hold.md", "status-on-hold-2.md"]),
+    )
+    assert_that(
+        sum(len(shards[name].adr_headers) for name in status_shards), equal_to(4)
+    )
+    assert_that(shards["status-accepted-2.md"].adr_headers, equal_to([headers[1]]))
+
+
+def test_shard_digest_changes_only_with_its_records(adr_tmp_path):
+    # Given
+    shards = shard_adr_headers(
+        [
+            build_header(adr_tmp_path, 1, "accepted"),
+            build_header(adr_tmp_path, 1001, "rejected"),
+        ]
+    )
+
+    # When
+    changed_shards = shard_adr_headers(
+        [
+            build_header(adr_tmp_path, 1, "accepted", title="New title"),
+            build_header(adr_tmp_path, 1001, "rejected"),
+        ]
+    )
+
+    # Then
+    for name in ["status-rejected.md", "ids-1000-1999.md", "status-deprecated.md"]:
+        assert_that(
+            changed_shards[name].digest(adr_tmp_path),
+            equal_to(shards[name].digest(adr_tmp_path)),
+        )
+    for name in ["status-accepted.md", "ids-0000-0999.md"]:
+        assert_that(
+            changed_shards[name].digest(adr_tmp_path),
+            not_(equal_to(shards[name].digest(adr_tmp_path))),
+        )